@@ -0,0 +1,68 @@
+"""
+Array-backed trees vs DepTree objects: memory of the trees of a corpus,
+time of preprocess + binarize, and of the whole conversion (assign_lambda, compose_semantics).
+    python -m benchmarks.array_tree
+"""
+import tracemalloc
+from timeit import default_timer as timer
+
+from src.u_dep.array_tree import ArrayDepTree
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain, dep
+
+def merges(n: int):
+    """John picked up n compound nouns, to exercise the merges of preprocess"""
+    nouns = [dep("dobj", f"dog{i}", "NOUN", dep("compound", "hot", "NOUN", dep("compound", "very", "ADV")),
+                 dep("quantmod", "about", "ADV")) for i in range(n)]
+    return dep("ROOT", "picked", "VERB", dep("nsubj", "John", "PROPN"), dep("prt", "up", "ADP"),
+               dep("xcomp", "quickly", "ADV"), *nouns)
+
+def _memory(build) -> int:
+    tracemalloc.start()
+    trees = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del trees
+    return size
+
+def _time(f, trees, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = timer()
+        for t in trees:
+            f(t)
+        best = min(best, timer() - start)
+    return best
+
+def main():
+    tf = Transformer(RelationPriority(), Dep2Lambda(), nameless=True)
+    shapes = [build(n) for build in [coordination, quantifier_chain, merges] for n in [2, 4, 8, 16]]
+    deptrees = shapes * 100
+    arrays = [ArrayDepTree.from_deptree(t) for t in deptrees]
+    views = [a.node(a.root) for a in arrays]
+    nodes = sum(len(a) for a in arrays)
+    print(f"{len(deptrees)} trees, {nodes} nodes")
+
+    dep_mem = _memory(lambda: [build(n) for build in [coordination, quantifier_chain, merges] for n in [2, 4, 8, 16]
+                               for _ in range(100)])
+    arr_mem = _memory(lambda: [ArrayDepTree.from_deptree(t) for t in deptrees])
+    print(f"{'memory (bytes/node)':<32}{'DepTree':>10}{dep_mem / nodes:>8.0f}{'arrays':>10}{arr_mem / nodes:>8.0f}")
+
+    def convert(t):
+        b = tf.binarize(tf.preprocess(t))
+        tf.assign_lambda(b)
+        return tf.compose_semantics(b)
+    assert all(convert(d) is convert(v) for d, v in zip(shapes, views))
+    steps = [
+        ("preprocess", tf.preprocess),
+        ("preprocess + binarize", lambda t: tf.binarize(tf.preprocess(t))),
+        ("full conversion", convert),
+    ]
+    for name, f in steps:
+        dep, arr = _time(f, deptrees), _time(f, views)
+        print(f"{name + ' (trees/s)':<32}{'DepTree':>10}{len(deptrees) / dep:>8.0f}{'arrays':>10}{len(views) / arr:>8.0f}")
+
+if __name__ == "__main__":
+    main()
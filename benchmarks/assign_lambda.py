@@ -0,0 +1,44 @@
+"""
+Per-node cost of lambda assignment: converter output renamed with uniqueify_var_names
+vs compiled templates instantiated with fresh names.
+    python -m benchmarks.assign_lambda
+"""
+import sys
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_processor import uniqueify_var_names
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def _rebuild_and_rename(tf: Transformer, root, incrementer):
+    for node, _ in root.walk():
+        node.set_lambda_expr(uniqueify_var_names(tf._dep2lambda.get(node), incrementer))
+
+def _instantiate(tf: Transformer, root, incrementer):
+    tf._assign_lambda(root, incrementer)
+
+def _best(fn, tf, root, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = timer()
+        fn(tf, root, tf._incrementer_generator())
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    sys.setrecursionlimit(100000)
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    print(f"{'sentence':<22}{'nodes':>7}{'rename (us/node)':>18}{'template (us/node)':>20}{'speedup':>9}")
+    for name, build in [("coordination", coordination), ("quantifier_chain", quantifier_chain)]:
+        for n in [5, 40]:
+            root = tf.binarize(tf.preprocess(build(n)))
+            nodes = sum(1 for _ in root.walk())
+            old = _best(_rebuild_and_rename, tf, root) / nodes * 1e6
+            new = _best(_instantiate, tf, root) / nodes * 1e6
+            print(f"{f'{name}({n})':<22}{nodes:>7}{old:>18.1f}{new:>20.1f}{old / new:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Memory of composed sentences with hash-consed nodes.
+    python -m benchmarks.ast_memory
+"""
+import tracemalloc
+
+from src.lambda_calculus.lambda_ast import LambdaExpr, Var, Const, Abstr, Apply, AndOpr, ImpliesOpr, Exists, ForAll, Neg
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def tree_size(expr: LambdaExpr) -> int:
+    """Number of nodes if the expression was stored as a tree (no sharing)"""
+    if isinstance(expr, (Var, Const)):
+        return 1
+    children = []
+    if isinstance(expr, Abstr):
+        children = [*expr.parameters, expr.body]
+    elif isinstance(expr, Apply):
+        children = [expr.functor, *expr.arguments]
+    elif isinstance(expr, AndOpr):
+        children = expr.operands
+    elif isinstance(expr, ImpliesOpr):
+        children = [expr.lhs, expr.rhs]
+    elif isinstance(expr, (Exists, ForAll)):
+        children = [*expr.vars, expr.formula]
+    elif isinstance(expr, Neg):
+        children = [expr.formula]
+    return 1 + sum(tree_size(c) for c in children)
+
+def dag_size(expr: LambdaExpr, seen=None) -> int:
+    """Number of distinct node objects"""
+    seen = set() if seen is None else seen
+    if expr in seen:
+        return 0
+    seen.add(expr)
+    children = []
+    for f in type(expr)._fields:
+        v = getattr(expr, f)
+        children.extend(v if isinstance(v, tuple) else [v] if isinstance(v, LambdaExpr) else [])
+    return 1 + sum(dag_size(c, seen) for c in children)
+
+def main():
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    print(f"{'sentence':<22}{'tree nodes':>12}{'shared nodes':>14}{'peak (KiB)':>12}")
+    for name, build in [("coordination", coordination), ("quantifier_chain", quantifier_chain)]:
+        for n in [10, 40]:
+            tracemalloc.start()
+            binarized = tf.binarize(tf.preprocess(build(n)))
+            tf.assign_lambda(binarized)
+            result = tf.compose_semantics(binarized)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{f'{name}({n})':<22}{tree_size(result):>12}{dag_size(result):>14}{peak / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    main()
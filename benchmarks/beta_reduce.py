@@ -0,0 +1,42 @@
+"""
+Compare the single-pass beta_reduce against the stepwise reference implementation,
+and against reduction in locally nameless form.
+    python -m benchmarks.beta_reduce
+"""
+import sys
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_processor import _beta_reduce, _beta_reduce_stepwise
+from src.lambda_calculus.nameless import beta_reduce_nameless, alpha_equivalent
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def _time(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = timer()
+        res = fn(*args)
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return res, best
+
+def main():
+    sys.setrecursionlimit(100000)
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    print(f"{'sentence':<22}{'redexes':>8}{'passes(old)':>13}{'passes(new)':>13}{'old (ms)':>11}{'new (ms)':>11}{'speedup':>9}{'nameless (ms)':>15}")
+    for name, build in [("coordination", coordination), ("quantifier_chain", quantifier_chain)]:
+        for n in [5, 10, 20, 40]:
+            binarized = tf.binarize(tf.preprocess(build(n)))
+            tf.assign_lambda(binarized)
+            expr = tf.build_lambda_tree(binarized)
+            (old, old_steps), old_t = _time(_beta_reduce_stepwise, expr, 10 ** 6)
+            (new, new_steps), new_t = _time(_beta_reduce, expr, 10 ** 6)
+            nameless, nameless_t = _time(beta_reduce_nameless, expr, 10 ** 6)
+            assert repr(old) == repr(new) and old_steps == new_steps and alpha_equivalent(new, nameless)
+            print(f"{f'{name}({n})':<22}{new_steps:>8}{old_steps + 1:>13}{1:>13}"
+                  f"{old_t * 1000:>11.2f}{new_t * 1000:>11.2f}{old_t / new_t:>8.1f}x{nameless_t * 1000:>15.2f}")
+
+if __name__ == "__main__":
+    main()
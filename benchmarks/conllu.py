@@ -0,0 +1,46 @@
+"""
+Converting a parsed treebank (CoNLL-U) vs parsing the same sentences with spaCy
+(a pipeline component standing in for the trained model, see benchmarks.parallel).
+    python -m benchmarks.conllu
+"""
+import io
+from timeit import default_timer as timer
+
+import spacy
+
+from src.text2logic import Text2Logic
+from src.pipeline_utils import read_conllu
+from .corpus import coordination, quantifier_chain
+from .parallel import _sentence, _PARSES
+
+def _conllu(text: str) -> str:
+    heads, deps, pos = _PARSES[text]
+    rows = [f"# text = {text}"]
+    for i, (word, head, dep, p) in enumerate(zip(text.split(" "), heads, deps, pos)):
+        rows.append("\t".join([str(i + 1), word, "_", p, "_", "_", str(0 if head == i else head + 1), dep, "_", "_"]))
+    return "\n".join(rows) + "\n\n"
+
+def main():
+    texts = [_sentence(build(n)) for build in [coordination, quantifier_chain] for n in [2, 4, 8]] * 200
+    data = "".join(map(_conllu, texts))
+
+    start = timer()
+    trees = [s.deptree() for s in read_conllu(io.StringIO(data))]
+    read = timer() - start
+    print(f"{len(trees)} sentences, {len(data)} bytes of CoNLL-U")
+    print(f"{'read + build DepTrees':<28}{len(trees) / read:>10.0f} sentences/s")
+
+    start = timer()
+    results = list(Text2Logic(model=None).iter_conllu(io.StringIO(data)))
+    conllu = timer() - start
+    nlp = spacy.blank("en")
+    nlp.add_pipe("corpus_parse")
+    start = timer()
+    expected = Text2Logic(nlp=nlp).parse_many(texts)
+    parsed = timer() - start
+    assert all(r.formula is e.formula for r, e in zip(results, expected))
+    print(f"{'convert from CoNLL-U':<28}{len(results) / conllu:>10.0f} sentences/s")
+    print(f"{'parse with spaCy + convert':<28}{len(expected) / parsed:>10.0f} sentences/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Synthetic dependency trees for benchmarks. No spaCy model is needed:
+trees are built directly in the shape produced by build_deptree_from_spacy.
+"""
+from src.u_dep.dep_tree import DepTree
+
+def dep(label: str, word: str, pos: str, *children: DepTree) -> DepTree:
+    node = DepTree(label, is_dep=True)
+    node.add_child(DepTree(word, is_word=True, pos=pos))
+    node.add_children(*children)
+    return node
+
+def coordination(n: int) -> DepTree:
+    """John saw a red dog and a red dog and ... (n conjuncts) in the park."""
+    def np(label: str, i: int, *children: DepTree) -> DepTree:
+        return dep(label, f"dog{i}", "NOUN", 
+                   dep("det", "a", "DET"), 
+                   dep("amod", "red", "ADJ"), 
+                   *children)
+    conjuncts = None
+    for i in range(n - 1, 0, -1):
+        children = [dep("cc", "and", "CCONJ")]
+        if conjuncts is not None:
+            children.append(conjuncts)
+        conjuncts = np("conj", i, *children)
+    obj = np("dobj", 0, *([conjuncts] if conjuncts is not None else []))
+    return dep("ROOT", "saw", "VERB",
+               dep("nsubj", "John", "PROPN"),
+               obj,
+               dep("prep", "in", "ADP", dep("pobj", "park", "NOUN", dep("det", "the", "DET"))),
+               dep("punct", ".", "PUNCT"))
+
+def quantifier_chain(n: int) -> DepTree:
+    """John saw a dog near a dog near ... (n nested prepositional phrases)."""
+    inner = None
+    for i in range(n - 1, -1, -1):
+        children = [dep("det", "a", "DET")]
+        if inner is not None:
+            children.append(dep("prep", "near", "ADP", inner))
+        inner = dep("pobj", f"dog{i}", "NOUN", *children)
+    return dep("ROOT", "saw", "VERB",
+               dep("nsubj", "John", "PROPN"),
+               dep("dobj", "it", "PRON", dep("prep", "near", "ADP", inner)),
+               dep("punct", ".", "PUNCT"))
@@ -0,0 +1,52 @@
+"""
+Per-node cost of choosing a handler: isinstance ladder (in the order of the former free_vars ladder)
+vs a Dispatch table lookup.
+    python -m benchmarks.dispatch
+"""
+from timeit import repeat
+
+from src.lambda_calculus.lambda_ast import Var, Const, Abstr, Apply, AndOpr, ImpliesOpr, Exists, ForAll, Neg
+from src.lambda_calculus.dispatch import Dispatch
+
+def _handler(expr):
+    return expr
+
+def ladder(expr):
+    if isinstance(expr, Var):
+        return _handler(expr)
+    elif isinstance(expr, AndOpr):
+        return _handler(expr)
+    elif isinstance(expr, Abstr):
+        return _handler(expr)
+    elif isinstance(expr, Apply):
+        return _handler(expr)
+    elif isinstance(expr, Const):
+        return _handler(expr)
+    elif isinstance(expr, ForAll) or isinstance(expr, Exists):
+        return _handler(expr)
+    elif isinstance(expr, ImpliesOpr):
+        return _handler(expr)
+    elif isinstance(expr, Neg):
+        return _handler(expr)
+    raise Exception("unreachable")
+
+table = Dispatch({cls: _handler for cls in [Var, AndOpr, Abstr, Apply, Const, ForAll, Exists, ImpliesOpr, Neg]})
+
+def dispatch(expr):
+    return table[type(expr)](expr)
+
+def main():
+    x = Var('x')
+    nodes = [x, Const("P"), Abstr([x], x), Apply(x, x), AndOpr(x, x), ImpliesOpr(x, x),
+             Exists([x], x), ForAll([x], x), Neg(x)]
+    number = 200000
+    print(f"{'node':<12}{'ladder (ns)':>14}{'dispatch (ns)':>16}")
+    for node in nodes:
+        row = []
+        for fn in [ladder, dispatch]:
+            best = min(repeat(lambda: fn(node), number=number, repeat=5))
+            row.append(best / number * 1e9)
+        print(f"{type(node).__name__:<12}{row[0]:>14.1f}{row[1]:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+flatten on the composed expressions of long coordinations: time per node should stay about flat.
+    python -m benchmarks.flatten
+"""
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_processor import flatten, uniqueify_var_names
+from src.lambda_calculus.traversal import fold
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination
+
+def _names():
+    i = 0
+    while True:
+        i += 1
+        yield f"v{i}"
+
+def composed(n: int):
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    tree = tf.binarize(tf.preprocess(coordination(n)))
+    tf.assign_lambda(tree)
+    return uniqueify_var_names(tf.compose_semantics(tree), _names())
+
+def main():
+    print(f"{'conjuncts':>10}{'nodes':>8}{'flatten ms':>12}{'us/node':>9}{'prenex ms':>11}")
+    for n in [8, 32, 128, 512]:
+        expr = composed(n)
+        nodes = fold(expr, lambda e, results: 1 + sum(results))
+        repeat = max(1, 512 // n)
+        times = []
+        for prenex in [False, True]:
+            start = timer()
+            for _ in range(repeat):
+                flatten(expr, prenex)
+            times.append((timer() - start) / repeat)
+        print(f"{n:>10}{nodes:>8}{times[0] * 1000:>12.2f}{times[0] * 1e6 / nodes:>9.2f}{times[1] * 1000:>11.2f}")
+
+if __name__ == "__main__":
+    main()
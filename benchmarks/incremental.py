@@ -0,0 +1,49 @@
+"""
+Re-deriving a coordination with a CompositionCache after a change: a priority table that
+reorders the dependents of the root, and an edited word in the last conjunct.
+Composed nodes (cache misses) and time, against composing the whole tree.
+    python -m benchmarks.incremental
+"""
+from timeit import default_timer as timer
+
+from src.dep_priority.default import default
+from src.u_dep.dep_tree import DepTree
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from src.u_dep.composition_cache import CompositionCache
+from .corpus import coordination
+
+def _edit(root: DepTree, word: str, new_word: str) -> DepTree:
+    """root with the word node labeled word replaced (in place)"""
+    for node, _ in root.walk():
+        for i, c in enumerate(node.children):
+            if c.is_word() and c.label() == word:
+                node.set_child(i, DepTree(new_word, is_word=True, pos=c.pos()))
+                return root
+    raise Exception(f"No word {word}")
+
+def _derive(tf: Transformer, tree: DepTree):
+    binarized = tf.binarize(tree)
+    tf.assign_lambda(binarized)
+    start = timer()
+    tf.compose_semantics(binarized)
+    return timer() - start
+
+def main():
+    tweaked = RelationPriority(priority_dt={**default, "prep": 1})
+    print(f"{'conjuncts':>10}{'change':>10}{'full ms':>10}{'cached ms':>11}{'composed':>10}{'nodes':>7}")
+    for n in [8, 32, 128]:
+        tree = Transformer(RelationPriority(), Dep2Lambda()).preprocess(coordination(n))
+        nodes = sum(1 for _ in Transformer(RelationPriority(), Dep2Lambda()).binarize(tree).walk())
+        cache = CompositionCache()
+        _derive(Transformer(RelationPriority(), Dep2Lambda(), composition_cache=cache), tree)
+        edited = _edit(Transformer(RelationPriority(), Dep2Lambda()).preprocess(coordination(n)), f"dog{n - 1}", "cat")
+        for change, priority, t in [("priority", tweaked, tree), ("edit", RelationPriority(), edited)]:
+            full = _derive(Transformer(priority, Dep2Lambda(), nameless=True), t)
+            misses = cache.misses
+            cached = _derive(Transformer(priority, Dep2Lambda(), composition_cache=cache), t)
+            print(f"{n:>10}{change:>10}{full * 1000:>10.2f}{cached * 1000:>11.2f}{cache.misses - misses:>10}{nodes:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Composing long sentences: normalizing at every node (named, nameless) against building the
+application tree and normalizing it once, call-by-need (lazy). Time per derivation.
+    python -m benchmarks.lazy
+"""
+from timeit import default_timer as timer
+
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination
+
+def _derive(tf: Transformer, n: int, repeat: int) -> float:
+    tree = tf.binarize(tf.preprocess(coordination(n)))
+    tf.assign_lambda(tree)
+    start = timer()
+    for _ in range(repeat):
+        tf.compose_semantics(tree)
+    return (timer() - start) / repeat
+
+def main():
+    print(f"{'conjuncts':>10}{'named ms':>10}{'nameless ms':>13}{'lazy ms':>9}")
+    for n in [8, 32, 128]:
+        repeat = max(1, 128 // n)
+        times = [_derive(Transformer(RelationPriority(), Dep2Lambda(), **options), n, repeat)
+                 for options in [{}, {"nameless": True}, {"lazy": True}]]
+        print(f"{n:>10}" + "".join(f"{t * 1000:>{w}.2f}" for t, w in zip(times, [10, 13, 9])))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Load test of the server: clients in threads send the corpus sentences concurrently,
+throughput and client-side latency percentiles are reported with the server's stats.
+Without an address, a server with the given number of worker processes (default 0) is started
+in this process on a Unix socket, with a pipeline component standing in for the trained model
+(see benchmarks.parallel).
+    python -m benchmarks.load_test [ADDRESS | processes]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+
+import spacy
+
+from src.server import Server, percentiles
+from src.client import Client
+from .corpus import coordination, quantifier_chain
+from .parallel import _sentence
+
+def _start(server: Server, address: str) -> None:
+    """Serve in a daemon thread, return once listening"""
+    started = threading.Event()
+    async def main():
+        listener = await server.start(address)
+        started.set()
+        await listener.serve_forever()
+    threading.Thread(target=asyncio.run, args=(main(),), daemon=True).start()
+    started.wait()
+
+def _client_run(address: str, texts):
+    latencies = []
+    with Client(address) as client:
+        for text in texts:
+            start = timer()
+            client.parse(text)
+            latencies.append(timer() - start)
+    return latencies
+
+def main():
+    texts = [_sentence(build(n)) for build in [coordination, quantifier_chain] for n in [2, 4, 8]] * 20
+    tmp = None
+    arg = sys.argv[1] if len(sys.argv) > 1 else "0"
+    if not arg.isdigit():
+        address = arg
+    else:
+        processes = int(arg)
+        nlp = spacy.blank("en")
+        nlp.add_pipe("corpus_parse")
+        tmp = tempfile.TemporaryDirectory()
+        address = os.path.join(tmp.name, "t2l.sock")
+        _start(Server(nlp=nlp, processes=processes), address)
+
+    print(f"{'clients':<10}{'requests/s':>12}{'p50 (ms)':>10}{'p90 (ms)':>10}{'p99 (ms)':>10}")
+    for clients in [1, 4, 16]:
+        with ThreadPoolExecutor(clients) as pool:
+            start = timer()
+            runs = list(pool.map(_client_run, [address] * clients, [texts] * clients))
+            elapsed = timer() - start
+        latencies = percentiles(t * 1000 for run in runs for t in run)
+        total = clients * len(texts)
+        print(f"{clients:<10}{total / elapsed:>12.0f}{latencies['p50']:>10.1f}{latencies['p90']:>10.1f}{latencies['p99']:>10.1f}")
+    with Client(address) as client:
+        print("server:", client.stats())
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput of Text2Logic.parse_many vs parse_parallel with 1..N processes.
+No trained model is needed: texts are the words of the corpus trees, and a pipeline component
+sets the corresponding parse.
+    python -m benchmarks.parallel [max processes]
+"""
+import os
+import sys
+from timeit import default_timer as timer
+from typing import Dict, List, Tuple
+
+import spacy
+from spacy.language import Language
+
+from src.text2logic import Text2Logic
+from src.u_dep.dep_tree import DepTree
+from .corpus import coordination, quantifier_chain
+
+# text -> (heads, deps, pos) of its tokens
+_PARSES: Dict[str, Tuple[List[int], List[str], List[str]]] = {}
+
+@Language.component("corpus_parse")
+def corpus_parse(doc):
+    heads, deps, pos = _PARSES[doc.text]
+    for token, head, dep, p in zip(doc, heads, deps, pos):
+        token.head = doc[head]
+        token.dep_ = dep
+        token.pos_ = p
+    return doc
+
+def _sentence(tree: DepTree) -> str:
+    """Tokens of tree in pre-order (so that children keep their order), registered in _PARSES"""
+    words, heads, deps, pos = [], [], [], []
+    index = {}
+    for node, _ in tree.walk():
+        if node.is_word():
+            continue
+        index[node] = len(words)
+        word = node.nth_child(0)
+        words.append(word.label())
+        heads.append(index[node.parent] if node.parent is not None else index[node])
+        deps.append(node.label())
+        pos.append(word.pos())
+    text = " ".join(words)
+    _PARSES[text] = (heads, deps, pos)
+    return text
+
+def main():
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    nlp = spacy.blank("en")
+    nlp.add_pipe("corpus_parse")
+    shapes = [_sentence(build(n)) for build in [coordination, quantifier_chain] for n in [2, 4, 8]]
+    texts = shapes * 100
+    t2l = Text2Logic(nlp=nlp)
+
+    start = timer()
+    expected = t2l.parse_many(texts)
+    base = timer() - start
+    print(f"{'processes':<12}{'sentences/s':>14}{'speedup':>9}")
+    print(f"{'sequential':<12}{len(texts) / base:>14.0f}{1:>8.1f}x")
+    for processes in sorted(set([1, 2, max_processes])):
+        if processes > max_processes:
+            continue
+        start = timer()
+        results = list(t2l.parse_parallel(texts, processes=processes))
+        elapsed = timer() - start
+        assert all(r.formula is e.formula for r, e in zip(results, expected))
+        print(f"{processes:<12}{len(texts) / elapsed:>14.0f}{base / elapsed:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
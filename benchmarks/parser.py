@@ -0,0 +1,55 @@
+"""
+Parsing printed formulas back (parser.parse) for growing input sizes: time per byte stays flat.
+Also bulk loading a store of small formulas, one per line.
+    python -m benchmarks.parser
+"""
+import sys
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_ast import AndOpr
+from src.lambda_calculus.parser import parse
+from src.lambda_calculus.fresh import pretty
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def _formula(tf: Transformer, tree):
+    binarized = tf.binarize(tf.preprocess(tree))
+    tf.assign_lambda(binarized)
+    return pretty(tf.compose_semantics(binarized))
+
+def _best(fn, arg, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = timer()
+        res = fn(arg)
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return res, best
+
+def main():
+    sys.setrecursionlimit(100000) # for repr
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    print(f"{'input':<22}{'bytes':>10}{'parse (ms)':>12}{'MB/s':>8}")
+    for n in [16, 64, 256, 1024]:
+        expr = _formula(tf, coordination(n))
+        text = repr(expr)
+        res, elapsed = _best(parse, text)
+        assert res is expr
+        print(f"{f'{n} conjuncts':<22}{len(text):>10}{elapsed * 1000:>12.1f}{len(text) / elapsed / 1e6:>8.2f}")
+    # megabyte inputs: conjunction of k copies of the largest formula
+    for k in [4, 16, 64]:
+        text = f"AND( {', '.join([repr(expr)] * k)} )"
+        res, elapsed = _best(parse, text, repeat=2)
+        assert res is AndOpr(*[expr] * k)
+        print(f"{f'AND of {k} x 1024':<22}{len(text):>10}{elapsed * 1000:>12.1f}{len(text) / elapsed / 1e6:>8.2f}")
+
+    store = [repr(_formula(tf, build(n))) for build in [coordination, quantifier_chain] for n in [1, 2, 4, 8]] * 250
+    text = "\n".join(store)
+    res, elapsed = _best(lambda t: [parse(line) for line in t.splitlines()], text)
+    assert len(res) == len(store)
+    print(f"\n{len(store)} formulas, {len(text)} bytes: {elapsed * 1000:.1f} ms, {len(text) / elapsed / 1e6:.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+PostProcessor.process on conjunctions of growing size: time per atom should stay about flat.
+Each expression has n events with arg1 / arg2 and a prepositional phrase, and a chain of n coordinated nouns.
+    python -m benchmarks.postprocess
+"""
+from timeit import default_timer as timer
+
+from src.lambda_calculus.parser import parse
+from src.u_dep.postprocessor import PostProcessor
+
+def expression(n: int):
+    atoms, exists = [], []
+    for i in range(n):
+        e, s, o, p, q, c, d = [f"{v}{i}" for v in ["e", "s", "o", "p", "q", "c", "d"]]
+        exists += [e, s, o, p, q, c, d]
+        atoms += [f"(saw {e})", f"(John {s})", f"(arg1 {e} {s})", f"(arg2 {e} {o})", f"(dog {o})",
+                  f"(prep {e} {p})", f"(in {p})", f"(pobj {p} {q})", f"(park {q})",
+                  f"(conj {c} {d} c{i + 1})", f"(cat {d})"]
+    exists.append(f"c{n}")
+    atoms += ["(arg2 x c0)", f"(cat c{n})"]
+    return parse(f"(Lx.?{''.join(exists)}[AND( {', '.join(atoms)} )])")
+
+def main():
+    postprocessor = PostProcessor()
+    print(f"{'events':>8}{'atoms':>8}{'ms':>10}{'us/atom':>10}")
+    for n in [4, 16, 64, 256]:
+        expr = expression(n)
+        repeat = max(1, 256 // n)
+        start = timer()
+        for _ in range(repeat):
+            postprocessor.process(expr)
+        t = (timer() - start) / repeat
+        atoms = 11 * n + 2
+        print(f"{n:>8}{atoms:>8}{t * 1000:>10.2f}{t * 1e6 / atoms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Fused preprocessing (preprocesser.rewrite) vs one pass per rule (merge_rtl, merge_ltr,
+enrich_determiner, assign_ontology): DepTree nodes allocated and time.
+    python -m benchmarks.preprocess
+"""
+from timeit import default_timer as timer
+
+from src.u_dep.dep_tree import DepTree
+from src.u_dep.preprocesser import merge_rtl, merge_ltr, enrich_determiner, assign_ontology, rewrite, \
+    PREPROCESS_RULES, QUANTIFIER_RULES
+from .corpus import coordination, quantifier_chain
+from .array_tree import merges
+
+def passes(root: DepTree) -> DepTree:
+    for dep in ["compound", "quantmod"]:
+        root = merge_rtl(root, dep)
+    for dep in ["prt", "xcomp"]:
+        root = merge_ltr(root, dep)
+    return root
+
+def quantifier_passes(root: DepTree) -> DepTree:
+    root = enrich_determiner(root)
+    assign_ontology(root)
+    return root
+
+def _allocations(f, trees) -> int:
+    """DepTree nodes created by f over trees"""
+    count = 0
+    init = DepTree.__init__
+    def counting_init(self, *args, **kwargs):
+        nonlocal count
+        count += 1
+        init(self, *args, **kwargs)
+    DepTree.__init__ = counting_init
+    try:
+        for t in trees:
+            f(t)
+    finally:
+        DepTree.__init__ = init
+    return count
+
+def _time(f, trees, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = timer()
+        for t in trees:
+            f(t)
+        best = min(best, timer() - start)
+    return best
+
+def main():
+    trees = [build(n) for build in [coordination, quantifier_chain, merges] for n in [2, 4, 8, 16]] * 50
+    nodes = sum(1 for t in trees for _ in t.walk())
+    print(f"{len(trees)} trees, {nodes} nodes")
+    print(f"{'':<24}{'nodes allocated':>18}{'trees/s':>10}")
+    cases = [
+        ("preprocess", passes, lambda t: rewrite(t, PREPROCESS_RULES)),
+        ("preprocess_quantifier", quantifier_passes, lambda t: rewrite(t, QUANTIFIER_RULES, ontology=True)),
+    ]
+    for name, multi, fused in cases:
+        assert all(multi(t).to_compact() == fused(t).to_compact() for t in trees)
+        for kind, f in [("passes", multi), ("fused", fused)]:
+            print(f"{name + ' ' + kind:<32}{_allocations(f, trees):>10}{len(trees) / _time(f, trees):>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compose a corpus of recurring sentence shapes with and without a shared ReductionCache.
+    python -m benchmarks.reduction_cache
+"""
+import sys
+from timeit import default_timer as timer
+
+from src.lambda_calculus.reduction_cache import ReductionCache
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def _corpus(tf: Transformer, copies: int):
+    trees = []
+    for _ in range(copies):
+        for build in [coordination, quantifier_chain]:
+            for n in [2, 3, 5, 8]:
+                binarized = tf.binarize(tf.preprocess(build(n)))
+                tf.assign_lambda(binarized)
+                trees.append(binarized)
+    return trees
+
+def _compose_all(tf: Transformer, trees):
+    start = timer()
+    res = [tf.compose_semantics(t) for t in trees]
+    return res, timer() - start
+
+def main():
+    sys.setrecursionlimit(100000)
+    print(f"{'sentences':>10}{'nameless (ms)':>15}{'cached (ms)':>13}{'speedup':>9}{'hits':>8}{'misses':>8}{'hit rate':>10}")
+    for copies in [1, 5, 25]:
+        trees = _corpus(Transformer(RelationPriority(), Dep2Lambda()), copies)
+        plain, plain_t = _compose_all(Transformer(RelationPriority(), Dep2Lambda(), nameless=True), trees)
+        cache = ReductionCache()
+        cached, cached_t = _compose_all(Transformer(RelationPriority(), Dep2Lambda(), reduction_cache=cache), trees)
+        assert all(a is b for a, b in zip(plain, cached))
+        info = cache.info()
+        print(f"{len(trees):>10}{plain_t * 1000:>15.2f}{cached_t * 1000:>13.2f}{plain_t / cached_t:>8.1f}x"
+              f"{info.hits:>8}{info.misses:>8}{info.hits / (info.hits + info.misses):>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Cold vs warm run of Text2Logic over a corpus with a persistent ResultCache:
+the warm run (a new process reading the same file) neither parses nor composes.
+No trained model is needed (see benchmarks.parallel).
+    python -m benchmarks.result_cache
+"""
+import os
+import tempfile
+from timeit import default_timer as timer
+
+import spacy
+
+from src.text2logic import Text2Logic
+from src.result_cache import ResultCache
+from .corpus import coordination, quantifier_chain
+from .parallel import _sentence, _PARSES
+
+def _run(nlp, path, texts):
+    with ResultCache(path) as cache:
+        t2l = Text2Logic(nlp=nlp, cache=cache)
+        start = timer()
+        results = t2l.parse_many(texts)
+        return results, timer() - start, cache.info()
+
+def main():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("corpus_parse")
+    shapes = [_sentence(build(n)) for build in [coordination, quantifier_chain] for n in [2, 4, 8, 16]]
+    texts = shapes * 200
+
+    start = timer()
+    expected = Text2Logic(nlp=nlp).parse_many(texts)
+    base = timer() - start
+    print(f"{'run':<12}{'texts/s':>14}{'speedup':>9}{'hits':>7}{'misses':>8}")
+    print(f"{'no cache':<12}{len(texts) / base:>14.0f}{1:>8.1f}x")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "cache.sqlite")
+        for run in ["cold", "warm"]:
+            results, elapsed, info = _run(nlp, path, texts)
+            assert all(r.formula is e.formula for r, e in zip(results, expected))
+            print(f"{run:<12}{len(texts) / elapsed:>14.0f}{base / elapsed:>8.1f}x{info.hits:>7}{info.misses:>8}")
+        # all texts distinct (a number appended to each): every text is parsed once, then read once
+        distinct = []
+        for i, text in enumerate(texts):
+            heads, deps, pos = _PARSES[text]
+            distinct.append(f"{text} {i}")
+            _PARSES[distinct[-1]] = (heads + [len(heads) - 1], deps + ["dep"], pos + ["NUM"])
+        start = timer()
+        Text2Logic(nlp=nlp).parse_many(distinct)
+        base = timer() - start
+        print(f"{'no cache':<12}{len(texts) / base:>14.0f}{1:>8.1f}x{'distinct':>15}")
+        for run in ["cold", "warm"]:
+            results, elapsed, info = _run(nlp, path, distinct)
+            print(f"{run:<12}{len(texts) / elapsed:>14.0f}{base / elapsed:>8.1f}x{info.hits:>7}{info.misses:>8}")
+
+if __name__ == "__main__":
+    main()
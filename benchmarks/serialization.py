@@ -0,0 +1,49 @@
+"""
+Size and speed of storing composed formulas and dependency trees:
+repr text (write only, cannot be read back) vs pickle vs the binary format.
+The corpus repeats a few sentence shapes: pickle shares identical (interned) formulas between records,
+the binary format encodes every record on its own.
+    python -m benchmarks.serialization
+"""
+import pickle
+import sys
+from timeit import default_timer as timer
+
+from src.serialization import dumps, loads
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, quantifier_chain
+
+def _time(fn, *args):
+    start = timer()
+    res = fn(*args)
+    return res, timer() - start
+
+def main():
+    sys.setrecursionlimit(100000)
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    formulas, trees = [], []
+    for _ in range(50):
+        for build in [coordination, quantifier_chain]:
+            for n in [2, 4, 8, 16]:
+                preprocessed = tf.preprocess(build(n))
+                binarized = tf.binarize(preprocessed)
+                tf.assign_lambda(binarized)
+                trees.append(preprocessed)
+                formulas.append(tf.compose_semantics(binarized))
+
+    print(f"{'records':<22}{'format':<10}{'bytes':>10}{'write (ms)':>12}{'read (ms)':>11}")
+    for name, objs in [(f"{len(formulas)} formulas", formulas), (f"{len(trees)} trees", trees)]:
+        text, text_t = _time(lambda: "\n".join(map(repr, objs)).encode("utf-8"))
+        print(f"{name:<22}{'repr':<10}{len(text):>10}{text_t * 1000:>12.1f}{'-':>11}")
+        pickled, pickle_t = _time(pickle.dumps, objs)
+        _, unpickle_t = _time(pickle.loads, pickled)
+        print(f"{'':<22}{'pickle':<10}{len(pickled):>10}{pickle_t * 1000:>12.1f}{unpickle_t * 1000:>11.1f}")
+        binary, binary_t = _time(dumps, objs)
+        back, read_t = _time(loads, binary)
+        assert len(back) == len(objs)
+        print(f"{'':<22}{'binary':<10}{len(binary):>10}{binary_t * 1000:>12.1f}{read_t * 1000:>11.1f}")
+
+if __name__ == "__main__":
+    main()
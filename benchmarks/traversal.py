@@ -0,0 +1,107 @@
+"""
+Time of the expression and dependency tree passes, and the deepest input they accept
+under the default recursion limit.
+    python -m benchmarks.traversal
+"""
+import sys
+from itertools import count
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_ast import Var, Const, Abstr, Apply, AndOpr, Exists
+from src.lambda_calculus.lambda_processor import free_vars, used_vars, alpha_reduce, uniqueify_var_names, \
+    assert_unique_vars, flatten, beta_reduce, beta_reduce_stepwise
+from src.lambda_calculus.nameless import to_nameless, from_nameless
+from src.u_dep.dep_tree import DepTree
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from .corpus import coordination, dep
+
+_run = count()
+
+def chain(n: int):
+    """Lf.?x1[f(x1) & ?x2[f(x2) & ... ]], with names not shared with previous runs"""
+    tag = next(_run)
+    expr = Apply(Var('f'), Var(f"x{n}_{tag}"))
+    for i in range(n, 0, -1):
+        x = Var(f"x{i}_{tag}")
+        expr = Exists([x], AndOpr(Apply(Var('f'), x), expr))
+    return Abstr([Var('f')], expr)
+
+def _names():
+    i = 0
+    while True:
+        i += 1
+        yield f"v{i}"
+
+def _best(fn, make, repeat=15, batch=20):
+    """Best time of fn over a batch of fresh inputs"""
+    best = None
+    for _ in range(repeat):
+        args = [make() for _ in range(batch)]
+        start = timer()
+        try:
+            for arg in args:
+                fn(arg)
+        except RecursionError:
+            return None
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def _max_depth(fn, make, limit=1 << 13):
+    """Largest power of 2 depth (up to limit) that fn handles.
+    The limit is kept low: some passes cache a variable set on every node, which is quadratic in memory on chains"""
+    depth, ok = 16, 0
+    while depth <= limit:
+        try:
+            fn(make(depth))
+        except RecursionError:
+            break
+        ok = depth
+        depth *= 2
+    return f">={ok}" if ok == limit else str(ok)
+
+def deep_tree(n: int) -> DepTree:
+    """dog near dog near ... (n nested prep)"""
+    tree = dep("pobj", "dog", "NOUN")
+    for _ in range(n):
+        tree = dep("pobj", "dog", "NOUN", dep("prep", "near", "ADP", tree))
+    return tree
+
+def main():
+    tf = Transformer(RelationPriority(), Dep2Lambda())
+    binarized = tf.binarize(tf.preprocess(coordination(40)))
+    tf.assign_lambda(binarized)
+    sentence = tf.build_lambda_tree(binarized)
+    composed = tf.compose_semantics(binarized)
+    n = 100
+    passes = [
+        ("free_vars", lambda e: free_vars(e), lambda: chain(n)),
+        ("used_vars", lambda e: used_vars(e), lambda: chain(n)),
+        ("alpha_reduce", lambda e: alpha_reduce(e, 'f', 'g'), lambda: chain(n)),
+        ("uniqueify_var_names", lambda e: uniqueify_var_names(e, _names()), lambda: chain(n)),
+        ("assert_unique_vars", assert_unique_vars, lambda: chain(n)),
+        ("flatten", flatten, lambda: chain(n)),
+        ("to/from_nameless", lambda e: from_nameless(to_nameless(e)), lambda: chain(n)),
+        ("beta_reduce", lambda e: beta_reduce(e, max_iter=10 ** 6), lambda: sentence),
+        ("beta_reduce_stepwise", lambda e: beta_reduce_stepwise(e, max_iter=10 ** 6), lambda: sentence),
+        ("uniqueify (sentence)", lambda e: uniqueify_var_names(e, _names()), lambda: composed),
+        ("DepTree.__repr__", repr, lambda: deep_tree(n)),
+        ("DepTree.validate", DepTree.validate, lambda: deep_tree(n)),
+        ("Transformer.binarize", tf.binarize, lambda: deep_tree(n)),
+    ]
+    print(f"{'pass':<24}{'time (ms)':>16}{'max depth':>12}")
+    for name, fn, make in passes:
+        t = _best(fn, make, batch=1 if name.startswith("beta_reduce_stepwise") else 20)
+        if make().__class__ is DepTree:
+            depth = _max_depth(fn, deep_tree)
+        elif name.startswith(("beta", "uniqueify (")):
+            depth = ""
+        else:
+            depth = _max_depth(fn, chain)
+        t = "RecursionError" if t is None else f"{t:.2f}"
+        print(f"{name:<24}{t:>16}{depth:>12}")
+
+if __name__ == "__main__":
+    main()
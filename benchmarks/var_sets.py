@@ -0,0 +1,59 @@
+"""
+Cost of free/bound variable queries, capture checks and substitution on deep expressions.
+Time per node should stay flat as the depth doubles.
+    python -m benchmarks.var_sets
+"""
+import sys
+from itertools import count
+from timeit import default_timer as timer
+
+from src.lambda_calculus.lambda_ast import Var, Const, Abstr, Apply, AndOpr, Exists
+from src.lambda_calculus.lambda_processor import free_vars, bound_vars, assert_unique_vars, beta_reduce
+
+_run = count()
+
+def coordination(n: int):
+    """f(z) & c1(z) & (c2(z) & (... & cn(z))), nested to the right"""
+    tag = next(_run) # fresh names, so nothing is shared with previous runs
+    expr = Apply(Const(f"c{n}_{tag}"), Var('z'))
+    for i in range(n - 1, 0, -1):
+        expr = AndOpr(Apply(Const(f"c{i}_{tag}"), Var('z')), expr)
+    return Abstr([Var('f'), Var('z')], AndOpr(Apply(Var('f'), Var('z')), expr))
+
+def quantifier_chain(n: int):
+    """?x1[f(x1) & ?x2[f(x2) & ... ?xn[f(xn)]]]"""
+    tag = next(_run)
+    expr = Exists([Var(f"x{n}_{tag}")], Apply(Var('f'), Var(f"x{n}_{tag}")))
+    for i in range(n - 1, 0, -1):
+        x = Var(f"x{i}_{tag}")
+        expr = Exists([x], AndOpr(Apply(Var('f'), x), expr))
+    return Abstr([Var('f')], expr)
+
+def _per_node(fn, build, n, repeat=3):
+    best = None
+    for _ in range(repeat):
+        expr = build(n)
+        start = timer()
+        fn(expr)
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / n * 1e6
+
+def main():
+    sys.setrecursionlimit(100000)
+    passes = [
+        ("free_vars", free_vars),
+        ("bound_vars", bound_vars),
+        ("assert_unique_vars", assert_unique_vars),
+        ("beta_reduce", lambda e: beta_reduce(Apply(e, Abstr([Var('x')], Apply(Const('P'), Var('x')))), max_iter=10 ** 6)),
+    ]
+    sizes = [250, 500, 1000, 2000]
+    for name, build in [("coordination", coordination), ("quantifier_chain", quantifier_chain)]:
+        print(f"{name} (us per node)")
+        print(f"{'':<20}" + "".join(f"{n:>10}" for n in sizes))
+        for pass_name, fn in passes:
+            print(f"{pass_name:<20}" + "".join(f"{_per_node(fn, build, n):>10.2f}" for n in sizes))
+        print()
+
+if __name__ == "__main__":
+    main()
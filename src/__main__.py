@@ -1,157 +1,139 @@
-from .lambda_calculus.lambda_ast import Abstr, LambdaExpr, Apply, Var
-from .lambda_calculus.lambda_processor import uniqueify_var_names, flatten, beta_reduce
-from .lambda_calculus.utils import *
-
-from .u_dep.relation_priority import RelationPriority
-from .u_dep.dep2lambda import Dep2Lambda
-from .u_dep.transformer import Transformer
-from .pipeline_utils import build_deptree_from_spacy
-from .u_dep.dep_tree import DepTree
-from .u_dep.postprocessor import PostProcessor
-from .dep2lambda_converter.default import default_converter
-from .dep2lambda_converter.quantificational import quant_converter
-from .dep_priority.quantificational import quant_priority
+from .lambda_calculus.lambda_ast import LambdaExpr
+from .text2logic import Text2Logic, ParseResult
+from .result_cache import ResultCache
+from .server import serve
+from typing import Iterable, Iterator, List, TextIO
 import argparse
-
-import spacy
-from spacy import displacy
+import json
+import sys
 
 def print_section(txt): 
     print("_" * 5 + txt + "_" *5)
 
-def numeric_incrementer_gen(): 
-    id = 0
-    while True:
-        id += 1
-        yield f"<{id}>"
-def alphabet_incrementer_gen():
-    alphabet = [chr(ord('a') + i) for i in range(26)]
-    for x in alphabet: 
-        yield x
-
-def parse_with_quantifer(text: str, with_show=False):
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text)
-    sents = list(doc.sents)
-
-    print_section("Token Description")
-    for token in doc: 
-        print(token.text, token.dep_, token.pos_, token.ent_type_)
-    print()
-    # for now parsing single sentence
-    assert len(sents) == 1
-    root = sents[0].root
-
-    rel_priority = RelationPriority(priority_dt=quant_priority)
-    converter = quant_converter
-    d2lambda = Dep2Lambda(converter=converter)
-    tf = Transformer(relation_priority=rel_priority, dep2lambda=d2lambda)
-
-    deptree = build_deptree_from_spacy(root)
-    DepTree.validate(deptree)
-    print_section("Original DepTree")
-    print(tf.tree_repr_with_priority(deptree))
-    print()
-    
-    preprocesed_dt = tf.preprocess_quantifier(deptree)
-    DepTree.validate(preprocesed_dt)
-    binarized = tf.binarize(preprocesed_dt)
-
-    print_section("Preprocessed DepTree")
-    print(tf.tree_repr_with_priority(preprocesed_dt))
-    print()
-    print("Binarized DepTree")
-    print(tf.tree_repr_with_priority(binarized))
-    
-    print("\n")
-    tf.assign_lambda(binarized)
-    result = tf.compose_semantics(binarized)
-    result = uniqueify_var_names(result, alphabet_incrementer_gen())
-    result = beta_reduce(Apply( # existential closure
-        result, 
-        Abstr([Var('e')], TRUE)
-    ))
-    result = flatten(result)
-    print_section("Final Lambda")
-    print(LambdaExpr.colored_repr(result))
-    print()
-
-    # postprocessor = PostProcessor()
-    # result = postprocessor.process(result)
-    # print_section("Post-processed Lambda")
-    # print(result)    
-
-    if with_show: 
-        displacy.serve(doc)
-
-
-def parse(text: str, with_show=False):
+def parse(text: str, with_show=False, quantifier=False, exclude=()):
     # input in sentence --> tree, final lambda
     """Pipeline: 
         parse from spacy --> convert to internal repr --> preprocess
         --> binarize + assign_lambda + compose_semantics --> postprocess
+    quantifier: Quantificational Event Semantics, existential closure instead of postprocess
+    exclude: spaCy pipes not loaded
     """
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(text)
-    sents = list(doc.sents)
-
-    print_section("Token Description")
-    for token in doc: 
-        print(token.text, token.dep_, token.pos_, token.ent_type_)
-    print()
-    # for now parsing single sentence
-    assert len(sents) == 1
-    root = sents[0].root
-
-    rel_priority = RelationPriority()
-    converter = default_converter
-    d2lambda = Dep2Lambda(converter=converter)
-    tf = Transformer(relation_priority=rel_priority, dep2lambda=d2lambda)
-
-    deptree = build_deptree_from_spacy(root)
-    DepTree.validate(deptree)
-    print_section("Original DepTree")
-    print(tf.tree_repr_with_priority(deptree))
-    print()
-    
-    preprocesed_dt = tf.preprocess(deptree)
-    DepTree.validate(preprocesed_dt)
-    binarized = tf.binarize(preprocesed_dt)
-
-    print_section("Preprocessed DepTree")
-    print(tf.tree_repr_with_priority(preprocesed_dt))
-    print()
-    print("Binarized DepTree")
-    print(tf.tree_repr_with_priority(binarized))
-    
-    print("\n")
-    tf.assign_lambda(binarized)
-    result = tf.compose_semantics(binarized)
-    result = uniqueify_var_names(result, alphabet_incrementer_gen())
-    print_section("Final Lambda")
-    print(result)
-    print()
-
-    postprocessor = PostProcessor()
-    result = postprocessor.process(result)
-    print_section("Post-processed Lambda")
-    print(result)    
+    t2l = Text2Logic(quantifier=quantifier, exclude=exclude)
+    tf = t2l.transformer
+    for res in t2l.parse(text):
+        print_section("Token Description")
+        for token in res.tokens: 
+            print(*token)
+        print()
+        if res.deptree is not None:
+            print_section("Original DepTree")
+            print(tf.tree_repr_with_priority(res.deptree))
+            print()
+        if res.binarized is not None:
+            print_section("Preprocessed DepTree")
+            print(tf.tree_repr_with_priority(res.preprocessed))
+            print()
+            print("Binarized DepTree")
+            print(tf.tree_repr_with_priority(res.binarized))
+            print("\n")
+        if res.error is not None:
+            print_section("Error")
+            print(res.error)
+            continue
+        if quantifier:
+            print_section("Final Lambda")
+            print(LambdaExpr.colored_repr(res.formula))
+            print()
+        else:
+            print_section("Final Lambda")
+            print(res.lambda_expr)
+            print()
+            print_section("Post-processed Lambda")
+            print(res.formula)
 
     if with_show: 
-        displacy.serve(doc)
+        from spacy import displacy
+        displacy.serve(t2l.nlp(text))
+
+def parse_with_quantifer(text: str, with_show=False, exclude=()):
+    parse(text, with_show=with_show, quantifier=True, exclude=exclude)
+
+def read_lines(paths: List[str]) -> Iterator[str]:
+    """Lines of the files ('-' is stdin), read lazily"""
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            yield from f
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def read_texts(paths: List[str]) -> Iterator[str]:
+    """Non-empty lines of the files ('-' is stdin), read lazily"""
+    for line in read_lines(paths):
+        line = line.strip()
+        if line:
+            yield line
+
+def write_jsonl(results: Iterable[ParseResult], output: TextIO) -> None:
+    """One JSON record per sentence (see ParseResult.to_json)"""
+    for res in results:
+        output.write(json.dumps(res.to_json(), ensure_ascii=False))
+        output.write("\n")
+
+def stream(t2l: Text2Logic, texts: Iterable[str], output: TextIO, processes: int = 0) -> None:
+    """JSON lines of the sentences of texts, consumed lazily"""
+    write_jsonl(t2l.parse_parallel(texts, processes=processes) if processes else t2l.iter_parse(texts), output)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parse sentence to lambda, for now")
-    parser.add_argument("text", type=str, 
+    parser.add_argument("text", type=str, nargs="?",
                         help="Text to parse")
     parser.add_argument("--show", "-s", action="store_true",
                         help="Show dep graph with displaCy", dest="show")
     parser.add_argument("--quantifier", "-q", action="store_true", 
                         help="Experimental: Quantificational Event Semantics")
-    # TODO: file to input/output
+    parser.add_argument("--input", "-i", nargs="+", metavar="FILE",
+                        help="Stream texts (one per line) from files, '-' for stdin, and write JSON lines")
+    parser.add_argument("--output", "-o", default="-", metavar="FILE",
+                        help="JSON lines output with --input (default: stdout)")
+    parser.add_argument("--processes", "-p", type=int, default=0,
+                        help="Worker processes with --input (default: parse in this process)")
+    parser.add_argument("--cache", "-c", metavar="FILE",
+                        help="Persistent result cache (SQLite file) with --input")
+    parser.add_argument("--exclude", "-x", nargs="+", default=[], metavar="PIPE",
+                        help="spaCy pipes not to load, e.g. ner (formulas do not use it)")
+    parser.add_argument("--conllu", action="store_true",
+                        help="--input files are parsed treebanks (CoNLL-U): no model is loaded")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="Serve requests on HOST:PORT or a Unix socket path, with --processes workers")
 
     args = parser.parse_args()
-    if args.quantifier: 
-        parse_with_quantifer(args.text, with_show=args.show)
+    if args.serve:
+        serve(args.serve, processes=args.processes, exclude=args.exclude)
+    elif args.input: 
+        cache = ResultCache(args.cache) if args.cache and not args.conllu else None
+        if args.conllu:
+            t2l = Text2Logic(model=None, quantifier=args.quantifier)
+        else:
+            t2l = Text2Logic(quantifier=args.quantifier, cache=cache, exclude=args.exclude)
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            if args.conllu:
+                write_jsonl(t2l.iter_conllu(read_lines(args.input)), output)
+            else:
+                stream(t2l, read_texts(args.input), output, processes=args.processes)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            if cache is not None:
+                if not args.processes:
+                    info = cache.info()
+                    print(f"cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries", file=sys.stderr)
+                cache.close()
+    elif args.text is None: 
+        parser.error("either text, --input or --serve is required")
+    elif args.quantifier: 
+        parse_with_quantifer(args.text, with_show=args.show, exclude=args.exclude)
     else: 
-        parse(args.text, with_show=args.show)
\ No newline at end of file
+        parse(args.text, with_show=args.show, exclude=args.exclude)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Client of the text2logic server (see server.py), stdlib only: services do not import spaCy.
+    client = Client("localhost:8080")   # or Client("/tmp/text2logic.sock")
+    client.parse("Brutus stabs Caesar")[0]["formula"]["str"]
+A client keeps one connection open; use one client per thread.
+"""
+from http.client import HTTPConnection
+from typing import List
+import json
+import socket
+
+class _UnixConnection(HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+class Client:
+    """address: HOST:PORT, or the path of a Unix socket if it has no ':'"""
+    def __init__(self, address: str, timeout: float = 60) -> None:
+        if ":" in address:
+            host, port = address.rsplit(":", 1)
+            self._conn = HTTPConnection(host or "localhost", int(port), timeout=timeout)
+        else:
+            self._conn = _UnixConnection(address, timeout)
+
+    def _request(self, method: str, path: str, payload: dict = None) -> dict:
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {} if body is None else {"Content-Type": "application/json"}
+        self._conn.request(method, path, body, headers)
+        response = self._conn.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise Exception(f"Server error {response.status}: {data.get('error')}")
+        return data
+
+    def parse(self, text: str, quantifier: bool = False) -> List[dict]:
+        """One record per sentence (ParseResult.to_json)"""
+        return self._request("POST", "/parse", {"text": text, "quantifier": quantifier})["results"]
+
+    def stats(self) -> dict:
+        return self._request("GET", "/stats")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "Client":
+        return self
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,47 +1,31 @@
-from ..lambda_calculus.lambda_ast import Abstr, Var, AndOpr, Apply, Const, ImpliesOpr, Exists, ForAll
+from ..lambda_calculus.lambda_ast import LambdaExpr
+from ..lambda_calculus.template import Template
+from ..lambda_calculus.parser import parse
 from ..u_dep.dep_tree import DepTree
 from warnings import warn
 
 
+# templates are compiled once, converters fill in the word / relation
+_WORD = Template(parse("(Lx.(word x))"), slots=['word'])
+_COPY = Template(parse("(Lfgz.?x[AND( (f z), (g x), (rel z x) )])"), slots=['rel'])
+_INVERT = Template(parse("(Lfgz.?x[AND( (f z), (g x), (rel x z) )])"), slots=['rel'])
+_COORD = Template(parse("(Lfgz.?xy[AND( (f x), (g y), (rel z x y) )])"), slots=['rel'])
+_MERGE = Template(parse("(Lfgz.AND( (f z), (g z) ))"))
+_HEAD = Template(parse("(Lfgz.(f z))"))
+_NEG = Template(parse("(Lfgz.AND( (f z), (not z) ))"))
+
 def _word(word: str):
-    return Abstr([Var('x')], Apply(Const(word), Var('x')))
+    return _WORD.fill(word=word)
 def _copy(rel: str): 
-    return Abstr(
-        [Var('f'), Var('g'), Var('z')],
-        Exists([Var('x')], AndOpr(
-            Apply(Var('f'), Var('z')),
-            Apply(Var('g'), Var('x')), 
-            Apply(Const(rel), Var('z'), Var('x'))
-        ))
-    )
+    return _COPY.fill(rel=rel)
 def _invert(rel: str):
-    return Abstr(
-        [Var('f'), Var('g'), Var('z')],
-        Exists([Var('x')], AndOpr(
-            Apply(Var('f'), Var('z')),
-            Apply(Var('g'), Var('x')), 
-            Apply(Const(rel), Var('x'), Var('z'))
-        ))
-    )
+    return _INVERT.fill(rel=rel)
 def _coord(rel: str):
-    return Abstr(
-            [Var('f'), Var('g'), Var('z')],
-            Exists( [Var('x'), Var('y')], AndOpr(
-                Apply(Var('f'), Var('x')), 
-                Apply(Var('g'), Var('y')), 
-                Apply(Const(rel), Var('z'), Var('x'), Var('y'))
-            ))
-        )
+    return _COORD.fill(rel=rel)
 def _merge():
-    return Abstr(
-        [Var('f'), Var('g'), Var('z')],
-        AndOpr(Apply(Var('f'), Var('z')), Apply(Var('g'), Var('z')))
-    )
+    return _MERGE
 def _head():
-    return Abstr(
-        [Var('f'), Var('g'), Var('z')],
-        Apply(Var('f'), Var('z'))
-    )
+    return _HEAD
 
 # TODO: comment represents things needed to be done in the future
 n2l_common_dict = {
@@ -92,10 +76,8 @@ n2l_common_dict = {
     "intj": _head(),
     "mark": _head(),
 }
-def default_converter(node: DepTree):
-    """
-    NOTE: exists operation is implicit
-    """
+def _default_template(node: DepTree) -> Template:
+    """default_converter, compiled: used by Dep2Lambda"""
     if node.is_word():
         return _word(node.label())
     
@@ -106,13 +88,15 @@ def default_converter(node: DepTree):
         return lbl == node.label()
     
     if case('neg'): 
-        return Abstr(
-            [Var('f'), Var('g'), Var('z')], 
-            AndOpr(
-                Apply(Var('f'), Var('z')), Apply(Const("not"), Var('z'))
-            )
-        )
+        return _NEG
 
     # raise Exception("Label {} is not implemented".format(node.label()))
     warn(f"Label {node.label()} is not implemented. Defaults to ignore")
     return _head()
+
+def default_converter(node: DepTree) -> LambdaExpr:
+    """
+    NOTE: exists operation is implicit
+    """
+    return _default_template(node).instantiate()
+default_converter._template = _default_template
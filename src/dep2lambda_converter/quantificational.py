@@ -1,4 +1,6 @@
-from ..lambda_calculus.lambda_ast import Abstr, Var, AndOpr, Apply, Const, ImpliesOpr, Exists, ForAll, Neg
+from ..lambda_calculus.lambda_ast import LambdaExpr
+from ..lambda_calculus.template import Template
+from ..lambda_calculus.parser import parse
 from ..u_dep.dep_tree import DepTree
 from warnings import warn
 
@@ -6,66 +8,42 @@ from warnings import warn
 # Implements UD version 2
 
 
-def quant_converter(node: DepTree):
-    def case(label: str):
-        return node.label() == label
+# templates are compiled once, words are filled in
+_EVENT = Template(parse("(Lf.?e[AND( (word e), (f e) )])"), slots=['word'])
+_INDIVIDUAL = Template(parse("(Lf.(f word))"), slots=['word'])
+_PREDICATE = Template(parse("(Lx.(word x))"), slots=['word'])
+_ROLE = Template(parse("(LPQf.(Q (Lx.(P (Le.AND( (f e), (role e x) ))))))"), slots=['role'])
+
+def _role(role: str) -> Template:
+    return _ROLE.fill(role=role)
+_identity = Template(parse("(LPQ.P)"))
+_dep_templates = {
+    "det:univ": Template(parse("(Lf_P.@x[(f x) -> (P x)])")),
+    "det:exis": Template(parse("(Lf_P.?x[AND( (f x), (P x) )])")),
+    "nsubj": _role('ag'),
+    "obj": _role('th'),
+    "neg": Template(parse("(LP_f.-((P f)))")),
+    "advmod": Template(parse("(LPQf.(P (Le.AND( (Q e), (f e) ))))")),
+    "conj": Template(parse("(LPQf.AND( (P f), (Q f) ))")),
+    # identity
+    "aux": _identity,
+    "cc": _identity,
+    "cop": _identity,
+}
+
+def _quant_template(node: DepTree) -> Template:
+    """quant_converter, compiled: used by Dep2Lambda"""
     if node.is_word():
         if node.is_event():
-            return Abstr(
-                [Var('f')], 
-                Exists([Var('e')], 
-                       AndOpr(Apply(Const(node.label()), Var('e')), Apply(Var('f'), Var('e'))))
-            )
+            return _EVENT.fill(word=node.label())
         elif node.is_individual():
-            return Abstr([Var('f')], Apply(Var('f'), Const(node.label())))
-        return Abstr(
-            [Var('x')],
-                Apply(Const(node.label()), Var('x')), 
-        )
-        
-    if case("det:univ"):
-        return  Abstr([Var('f'), Var('_'), Var("P")], ForAll(
-            [Var('x')], ImpliesOpr(
-                Apply(Var('f'), Var('x')), Apply(Var('P'), Var('x'))
-            )
-        ))
-    elif case('det:exis'):
-        return  Abstr([Var('f'), Var('_'), Var("P")], Exists(
-            [Var('x')], AndOpr(
-                Apply(Var('f'), Var('x')), Apply(Var('P'), Var('x'))
-            )
-        ))
-    elif case("nsubj"):
-        return Abstr([Var('P'), Var('Q'), Var('f')], Apply(
-                    Var('Q'), Abstr([Var('x')], Apply(
-                        Var('P'), Abstr([Var('e')], AndOpr(
-                            Apply(Var('f'), Var('e')), Apply(Const('ag'), Var('e'), Var('x'))
-                        ))
-                    ))
-                ))
-    elif case("obj"):
-        return Abstr([Var('P'), Var('Q'), Var('f')], Apply(
-                    Var('Q'), Abstr([Var('x')], Apply(
-                        Var('P'), Abstr([Var('e')], AndOpr(
-                            Apply(Var('f'), Var('e')), Apply(Const('th'), Var('e'), Var('x'))
-                        ))
-                    ))
-                ))
-    elif case("neg"):
-        return Abstr([Var('P'), Var('_'), Var('f')], Neg(Apply(Var('P'), Var('f'))))
-    elif case("advmod"):
-        return Abstr([Var('P'), Var('Q'), Var('f')], Apply(
-            Var('P'), Abstr([Var('e')], AndOpr(
-                Apply(Var('Q'), Var('e')), 
-                Apply(Var('f'), Var('e'))
-            ))
-        ))
-    elif case("conj"):
-        return Abstr([Var('P'), Var('Q'), Var('f')], AndOpr(
-            Apply(Var('P'), Var('f')), 
-            Apply(Var('Q'), Var('f'))
-        ))
-    elif case("aux") or case("cc") or case('cop'):
-        # identity
-        return Abstr([Var('P'), Var('Q')], Var('P'))
-    raise Exception("Unimplemented dependency \'{}\'".format(node.label()))
+            return _INDIVIDUAL.fill(word=node.label())
+        return _PREDICATE.fill(word=node.label())
+    template = _dep_templates.get(node.label())
+    if template is None:
+        raise Exception("Unimplemented dependency \'{}\'".format(node.label()))
+    return template
+
+def quant_converter(node: DepTree) -> LambdaExpr:
+    return _quant_template(node).instantiate()
+quant_converter._template = _quant_template
@@ -0,0 +1,195 @@
+"""
+Normalization of locally nameless expressions by evaluation, with call-by-need sharing.
+A term is evaluated to weak head normal form by an abstract machine: arguments become thunks,
+each evaluated at most once however many times its parameter is used (no redex is duplicated),
+and bodies are not copied by substitution but evaluated in an environment of thunks.
+The value is then read back to a normal form, evaluating under binders with fresh variables (levels).
+Both the machine and the read back use explicit stacks, so the size of the expression is not limited
+by the recursion limit. Same normal form as nameless.normalize.
+"""
+from .lambda_ast import LambdaExpr, Var, Const, Apply, BoundVar, NamelessAbstr, NamelessBinder
+from .traversal import children, rebuild
+from typing import List, Optional, Tuple
+
+class _Thunk:
+    """term to evaluate in env, value once evaluated"""
+    __slots__ = ("term", "env", "value")
+    def __init__(self, term: LambdaExpr, env, value=None) -> None:
+        self.term = term
+        self.env = env
+        self.value = value
+
+class _Update:
+    """Marker on the machine stack: the value reached above it is the value of thunk"""
+    __slots__ = ("thunk",)
+    def __init__(self, thunk: _Thunk) -> None:
+        self.thunk = thunk
+
+class _Lam:
+    """Closure of an abstraction whose first parameters may already be bound in env"""
+    __slots__ = ("arity", "body", "env", "hints")
+    def __init__(self, arity: int, body: LambdaExpr, env, hints: Optional[Tuple[str, ...]]) -> None:
+        self.arity = arity
+        self.body = body
+        self.env = env
+        self.hints = hints
+
+class _Con:
+    """Connective or quantifier (not an abstraction): its parts are evaluated when read back"""
+    __slots__ = ("term", "env")
+    def __init__(self, term: LambdaExpr, env) -> None:
+        self.term = term
+        self.env = env
+
+class _Neutral:
+    """
+    head applied to groups of argument thunks (one group per application, as in the expression).
+    head: level of a bound variable, free Var / Const, or _Con
+    """
+    __slots__ = ("head", "args")
+    def __init__(self, head, args: tuple) -> None:
+        self.head = head
+        self.args = args
+
+# environments are linked lists (thunk, rest), index 0 first
+def _lookup(env, index: int) -> _Thunk:
+    i = index
+    while env is not None and i > 0:
+        env = env[1]
+        i -= 1
+    if env is None:
+        raise Exception(f"Loose De Bruijn index {index} cannot be evaluated.")
+    return env[0]
+
+def _bind_levels(env, arity: int, depth: int):
+    """env with the parameters of a binder bound to the levels depth, depth + 1, ... (outermost first)"""
+    for level in range(depth, depth + arity):
+        env = (_Thunk(None, None, _Neutral(level, ())), env)
+    return env
+
+_GROUP = object() # on the machine stack, below the arguments of an application
+
+class _Machine:
+    def __init__(self, expr: LambdaExpr, max_iter: int) -> None:
+        self.expr = expr
+        self.max_iter = max_iter
+        self.steps = 0
+
+    def _count(self, n: int) -> None:
+        self.steps += n
+        if self.steps >= self.max_iter:
+            raise Exception(f"Maximum iterations for beta-reduction reached for expression: {self.expr}")
+
+    def whnf(self, term: LambdaExpr, env):
+        """Weak head normal form of term in env"""
+        stack: List = [] # argument thunks, the next one on top, group and update markers
+        while True:
+            t = type(term)
+            if t is Apply:
+                stack.append(_GROUP)
+                for a in reversed(term.arguments):
+                    stack.append(_lookup(env, a.index) if type(a) is BoundVar else _Thunk(a, env))
+                term = term.functor
+                continue
+            if t is BoundVar:
+                thunk = _lookup(env, term.index)
+                if thunk.value is None:
+                    stack.append(_Update(thunk))
+                    term, env = thunk.term, thunk.env
+                    continue
+                value = thunk.value
+            elif t is NamelessAbstr:
+                value = _Lam(term.arity, term.body, env, term.hints)
+            elif t is Var or t is Const:
+                value = _Neutral(term, ())
+            else:
+                value = _Neutral(_Con(term, env), ())
+            # apply value to the arguments above the first update marker, then update the marked thunk
+            while True:
+                if stack and type(stack[-1]) is not _Update:
+                    if type(value) is _Lam:
+                        env, k = value.env, 0
+                        while k < value.arity and stack and type(stack[-1]) is not _Update:
+                            a = stack.pop()
+                            if a is not _GROUP:
+                                env = (a, env)
+                                k += 1
+                        self._count(k)
+                        if k == value.arity:
+                            term = value.body
+                            break
+                        value = _Lam(value.arity - k, value.body, env, value.hints and value.hints[k:])
+                    else:
+                        groups, group = [], []
+                        while stack and type(stack[-1]) is not _Update:
+                            a = stack.pop()
+                            if a is not _GROUP:
+                                group.append(a)
+                            elif group:
+                                groups.append(tuple(group))
+                                group = []
+                        value = _Neutral(value.head, value.args + tuple(groups))
+                elif stack:
+                    stack.pop().thunk.value = value
+                else:
+                    return value
+
+    def quote(self, value, depth: int) -> LambdaExpr:
+        """Normal form of a value, under depth binders"""
+        results: List[LambdaExpr] = []
+        # (value, depth), (thunk, depth), (term, env, depth) to read back, or (build, number of results)
+        tasks: List[tuple] = [(value, depth)]
+        while tasks:
+            task = tasks.pop()
+            if len(task) == 3:
+                term, env, depth = task
+                tasks.append((self.whnf(term, env), depth))
+                continue
+            v, depth = task
+            if type(v) is _Thunk:
+                if v.value is None:
+                    v.value = self.whnf(v.term, v.env)
+                tasks.append((v.value, depth))
+            elif type(v) is _Lam:
+                tasks.append((lambda kids, v=v: NamelessAbstr(v.arity, kids[0], v.hints), 1))
+                tasks.append((v.body, _bind_levels(v.env, v.arity, depth), depth + v.arity))
+            elif type(v) is _Neutral:
+                if v.args:
+                    tasks.append((lambda kids, v=v: _apply(kids, v.args), 1 + sum(map(len, v.args))))
+                    tasks.extend((a, depth) for group in reversed(v.args) for a in reversed(group))
+                head = v.head
+                if type(head) is int:
+                    results.append(BoundVar(depth - 1 - head))
+                elif type(head) is _Con:
+                    tasks.append((head, depth))
+                else:
+                    results.append(head)
+            elif type(v) is _Con:
+                term, env = v.term, v.env
+                if isinstance(term, NamelessBinder):
+                    tasks.append((lambda kids, term=term: type(term)(term.arity, kids[0], term.hints), 1))
+                    tasks.append((term.body, _bind_levels(env, term.arity, depth), depth + term.arity))
+                else:
+                    kids = children(term)
+                    tasks.append((lambda new, term=term: rebuild(term, new), len(kids)))
+                    tasks.extend((k, env, depth) for k in reversed(kids))
+            else:
+                build, n = v, depth
+                kids = results[len(results) - n:]
+                del results[len(results) - n:]
+                results.append(build(kids))
+        return results[0]
+
+def _apply(kids: List[LambdaExpr], groups: tuple) -> LambdaExpr:
+    """head (kids[0]) applied to the read back arguments (kids[1:]), one application per group"""
+    res, i = kids[0], 1
+    for group in groups:
+        res = Apply(res, *kids[i:i + len(group)])
+        i += len(group)
+    return res
+
+def normalize_by_need(expr: LambdaExpr, max_iter=100) -> LambdaExpr:
+    """Normal form of a closed locally nameless expression, see module docstring.
+    max_iter: maximum number of arguments bound"""
+    machine = _Machine(expr, max_iter)
+    return machine.quote(_Thunk(expr, None), 0)
@@ -0,0 +1,99 @@
+"""
+Compact form of lambda expressions: a flat tuple of (opcode, operand) pairs in post-order.
+It pickles without recursion and is much smaller than the pickled nodes,
+e.g. to send results between processes. Decoding rebuilds the (interned) nodes with a stack.
+    operand: symbol (Var, Const), index (BoundVar), number of children (Abstr / Exists / ForAll
+             parameters, Apply arguments, AndOpr operands), (arity, hints) (nameless binders)
+"""
+from .lambda_ast import LambdaExpr, Var, Const, Abstr, Apply, AndOpr, ImpliesOpr, Exists, ForAll, Neg, \
+    BoundVar, NamelessAbstr, NamelessExists, NamelessForAll
+from .traversal import fold
+from .dispatch import Dispatch
+from typing import Callable, List, Tuple
+
+VAR, CONST, BOUND_VAR, ABSTR, APPLY, AND, IMPLIES, EXISTS, FORALL, NEG, \
+    NAMELESS_ABSTR, NAMELESS_EXISTS, NAMELESS_FORALL = range(13)
+
+# expr -> (opcode, operand); other node types are rejected
+_ENCODE = Dispatch({
+    Var: lambda e: (VAR, e.symbol),
+    Const: lambda e: (CONST, e.symbol),
+    BoundVar: lambda e: (BOUND_VAR, e.index),
+    Abstr: lambda e: (ABSTR, len(e.parameters)),
+    Apply: lambda e: (APPLY, len(e.arguments)),
+    AndOpr: lambda e: (AND, len(e.operands)),
+    ImpliesOpr: lambda e: (IMPLIES, None),
+    Exists: lambda e: (EXISTS, len(e.vars)),
+    ForAll: lambda e: (FORALL, len(e.vars)),
+    Neg: lambda e: (NEG, None),
+    NamelessAbstr: lambda e: (NAMELESS_ABSTR, (e.arity, e.hints)),
+    NamelessExists: lambda e: (NAMELESS_EXISTS, (e.arity, e.hints)),
+    NamelessForAll: lambda e: (NAMELESS_FORALL, (e.arity, e.hints)),
+})
+
+def encode_node(expr: LambdaExpr) -> Tuple[int, object]:
+    """(opcode, operand) of one node"""
+    return _ENCODE[type(expr)](expr)
+
+def to_compact(expr: LambdaExpr) -> tuple:
+    """Flat (opcode, operand, opcode, operand, ...) tuple, children before their parent"""
+    out: list = []
+    def leave(expr: LambdaExpr, results: list):
+        out.extend(_ENCODE[type(expr)](expr))
+    fold(expr, leave)
+    return tuple(out)
+
+def _pop(stack: List[LambdaExpr], n: int) -> List[LambdaExpr]:
+    kids = stack[len(stack) - n:]
+    del stack[len(stack) - n:]
+    return kids
+
+def _binder(cls) -> Callable:
+    def decode(stack: List[LambdaExpr], n: int) -> LambdaExpr:
+        body = stack.pop()
+        return cls(_pop(stack, n), body)
+    return decode
+
+def _nameless(cls) -> Callable:
+    def decode(stack: List[LambdaExpr], operand: Tuple[int, tuple]) -> LambdaExpr:
+        arity, hints = operand
+        return cls(arity, stack.pop(), hints)
+    return decode
+
+def _apply(stack: List[LambdaExpr], n: int) -> LambdaExpr:
+    args = _pop(stack, n)
+    return Apply(stack.pop(), *args)
+
+def _implies(stack: List[LambdaExpr], _) -> LambdaExpr:
+    rhs = stack.pop()
+    return ImpliesOpr(stack.pop(), rhs)
+
+# opcode -> decode(stack, operand): node built from the operand and the children on top of stack
+_DECODE: List[Callable] = [
+    lambda stack, symbol: Var(symbol),
+    lambda stack, symbol: Const(symbol),
+    lambda stack, index: BoundVar(index),
+    _binder(Abstr),
+    _apply,
+    lambda stack, n: AndOpr(*_pop(stack, n)),
+    _implies,
+    _binder(Exists),
+    _binder(ForAll),
+    lambda stack, _: Neg(stack.pop()),
+    _nameless(NamelessAbstr),
+    _nameless(NamelessExists),
+    _nameless(NamelessForAll),
+]
+
+def build_node(opcode: int, operand, children: List[LambdaExpr]) -> LambdaExpr:
+    """Node from its opcode, operand and children (in order; the list is consumed)"""
+    return _DECODE[opcode](children, operand)
+
+def from_compact(data: tuple) -> LambdaExpr:
+    """Inverse of to_compact"""
+    stack: List[LambdaExpr] = []
+    for i in range(0, len(data), 2):
+        stack.append(_DECODE[data[i]](stack, data[i + 1]))
+    if len(stack) != 1:
+        raise Exception("Malformed compact expression.")
+    return stack[0]
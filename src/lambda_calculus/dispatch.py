@@ -0,0 +1,38 @@
+"""
+Type-dispatched handler tables, used instead of isinstance ladders.
+"""
+from typing import Callable, Dict, Optional
+
+invalid_expr_msg = "Unexpected expression type {} for {}"
+
+class Dispatch(dict):
+    """
+    type -> handler, looked up with table[type(expr)](expr, ...).
+    A handler registered for a class also handles its subclasses, other types get default.
+    Lookups for an unregistered type are resolved once (through the MRO) and then stored in the table.
+    Without a default, an unregistered type gets a handler that raises.
+    """
+    def __init__(self, handlers: Optional[Dict[type, Callable]] = None, default: Optional[Callable] = None) -> None:
+        super().__init__(handlers or {})
+        self._registered: Dict[type, Callable] = dict(self)
+        self._default = default
+
+    def register(self, cls: type, handler: Callable) -> None:
+        self._registered[cls] = handler
+        # drop resolved subclasses: they may now resolve to handler
+        self.clear()
+        self.update(self._registered)
+
+    def __missing__(self, cls: type) -> Callable:
+        for base in cls.__mro__:
+            if base in self._registered:
+                handler = self._registered[base]
+                break
+        else:
+            handler = self._default if self._default is not None else unexpected
+        self[cls] = handler
+        return handler
+
+def unexpected(expr, *args):
+    """Handler for expression types a pass does not accept"""
+    raise Exception(invalid_expr_msg.format(type(expr), expr))
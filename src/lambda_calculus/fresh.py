@@ -0,0 +1,86 @@
+"""
+Fresh variable allocation.
+Variables of a derivation are allocated by a VarArena as integer ids (named <id>),
+pretty names (a, b, ..., z, a1, ..., z1, a2, ...) are only given when the result is printed.
+"""
+from .lambda_ast import LambdaExpr, Var, Const
+from .traversal import rewrite, children, Done
+from typing import AbstractSet, Dict, Iterator, Set
+
+def pretty_name(i: int) -> str:
+    """i-th pretty name: a, b, ..., z, a1, ..., z1, a2, ..."""
+    letter, round = chr(ord('a') + i % 26), i // 26
+    return letter + str(round) if round else letter
+
+def pretty_names() -> Iterator[str]:
+    """a, b, ..., z, a1, ... never runs out"""
+    i = 0
+    while True:
+        yield pretty_name(i)
+        i += 1
+
+class VarArena:
+    """
+    Fresh variables of one derivation, allocated as consecutive integer ids and named <id>:
+    only the last id is stored, the Var of an id is built (interned) when asked for.
+    An arena is an iterator of fresh names, so it can be passed as an id incrementer
+    (uniqueify_var_names, Template.uniqueify).
+    """
+    def __init__(self) -> None:
+        self._last = 0
+
+    def fresh_id(self) -> int:
+        self._last += 1
+        return self._last
+
+    def var(self, i: int) -> Var:
+        if not 0 < i <= self._last:
+            raise Exception(f"Variable id {i} was not allocated.")
+        return Var(f"<{i}>")
+
+    def fresh(self) -> Var:
+        return self.var(self.fresh_id())
+
+    def fresh_avoiding(self, avoid: AbstractSet[str]) -> Var:
+        """Fresh variable whose name is not in avoid (names that do not come from this arena)"""
+        v = self.fresh()
+        while v.symbol in avoid:
+            v = self.fresh()
+        return v
+
+    def __iter__(self) -> "VarArena":
+        return self
+    def __next__(self) -> str:
+        return self.fresh().symbol
+    def __len__(self) -> int:
+        return self._last
+
+def _constants(expr: LambdaExpr) -> Set[str]:
+    res = set()
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if isinstance(e, Const):
+            res.add(e.symbol)
+        else:
+            stack.extend(children(e))
+    return res
+
+def pretty(expr: LambdaExpr) -> LambdaExpr:
+    """
+    Rename the variables of expr a, b, ..., z, a1, ... in order of first occurrence, for printing.
+    Names of constants of expr are skipped, so that variables and constants print differently
+    """
+    constants = _constants(expr)
+    names = (n for n in pretty_names() if n not in constants)
+    renamed: Dict[str, Var] = {}
+
+    def enter(expr: LambdaExpr):
+        if isinstance(expr, Var):
+            v = renamed.get(expr.symbol)
+            if v is None:
+                v = renamed[expr.symbol] = Var(next(names))
+            return Done(v)
+        return expr
+
+    return rewrite(expr, enter)
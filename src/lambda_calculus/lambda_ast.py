@@ -1,17 +1,68 @@
 """
 Abstract Syntax Definition for Lambda Calculus
 """
-from copy import deepcopy
 from typing import Tuple, List
-from termcolor import colored
+from weakref import WeakValueDictionary
+from threading import Lock
+import re
+
+# hash-consing table: (node class, *fields) -> live node; nodes are inserted under _intern_lock
+_interned: "WeakValueDictionary[tuple, LambdaExpr]" = WeakValueDictionary()
+_intern_lock = Lock()
 
 class LambdaExpr:
-    """Abstract class for Lambda Expression"""
-    def __init__(self):
-        pass 
+    """Abstract class for Lambda Expression
+
+    Nodes are immutable and hash-consed: building a node that is structurally identical
+    to a live one returns the existing object. Structural equality is therefore identity,
+    hashing is O(1), and nodes never need to be copied.
+    Subclasses list their fields in _fields and build themselves with _make.
+    Derived properties (free/bound/used variables) are memoized on the node in _cached slots.
+    Thread safety: nodes may be built from several threads, the same structure always gives
+    the same object (a missing node is looked up again and inserted under a lock).
+    Memoized properties may be computed twice concurrently, to the same value.
+    """
+    __slots__ = ("__weakref__", "_free_vars", "_bound_vars", "_used_vars", "_loose_indices", "_hint_free")
+    _fields: Tuple[str, ...] = ()
+    _cached: Tuple[str, ...] = ("_free_vars", "_bound_vars", "_used_vars", "_loose_indices", "_hint_free")
+
+    @classmethod
+    def _make(cls, *fields):
+        key = (cls, *fields)
+        node = _interned.get(key)
+        if node is not None:
+            return node
+        with _intern_lock:
+            node = _interned.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                for name, value in zip(cls._fields, fields):
+                    object.__setattr__(node, name, value)
+                for name in cls._cached:
+                    object.__setattr__(node, name, None)
+                _interned[key] = node
+        return node
+
+    def _cache(self, name: str, value):
+        """Memoize a derived property; safe because nodes are immutable"""
+        object.__setattr__(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+    def __copy__(self):
+        return self
+    def __deepcopy__(self, memo):
+        return self
+    def __reduce__(self):
+        # unpickling goes through the constructor, so nodes are re-interned
+        return (_rebuild, (type(self), tuple(getattr(self, f) for f in self._fields)))
 
     @staticmethod
     def colored_repr(expr: "LambdaExpr"): 
+        from termcolor import colored # display only
         # order inside out
         colors = ["red", "magenta", "blue", "cyan", "green", "yellow"]
         PARENS = ["(", ")", "[", "]", "{", "}"]
@@ -44,57 +95,55 @@ class LambdaExpr:
         return "".join(ret)
                 
 
+def _rebuild(cls, fields):
+    return cls._make(*fields)
+
 class Var(LambdaExpr):
-    def __init__(self, symbol: str):
-        self.symbol: str = symbol
+    __slots__ = _fields = ("symbol",)
+    def __new__(cls, symbol: str):
+        return cls._make(symbol)
     def __str__(self) -> str:
         return self.symbol
     def __repr__(self) -> str:
         return self.symbol
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, Var):
-            return self.symbol == other.symbol
-        return False
+
+# names of parameters and quantified variables, as the parser reads them in binders
+NAME_PATTERN = r"(?:<\d+>|[A-Za-z_]\d*)'*"
+# symbols printed as they are by repr; others are quoted: whitespace, delimiters, #..., "..., ->...,
+# and what the parser would read as a binder: L<names>. ?<names>[ @<names>[ L: ?: @:
+_PLAIN_SYMBOL = re.compile(rf'(?!->|[L?@]:|L(?:{NAME_PATTERN})+\.|[?@](?:{NAME_PATTERN})+\[)[^\s()\[\],#"][^\s()\[\],]*')
+
+def quote_symbol(symbol: str) -> str:
+    """symbol as repr prints it: as it is, or "..." with \\ and \" escaped when the parser could not read it back"""
+    if _PLAIN_SYMBOL.fullmatch(symbol):
+        return symbol
+    return '"' + symbol.replace("\\", "\\\\").replace('"', '\\"') + '"'
 
 class Const(LambdaExpr):
-    def __init__(self, symbol: str):
-        self.symbol: str = symbol
+    __slots__ = _fields = ("symbol",)
+    def __new__(cls, symbol: str):
+        return cls._make(symbol)
     def __str__(self) -> str:
         return self.symbol
     def __repr__(self) -> str:
-        return self.symbol
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, Const):
-            return self.symbol == other.symbol
-        return False
+        return quote_symbol(self.symbol)
 
 class Abstr(LambdaExpr):
     """
     Syntatic-sugar multi-parameters lambda
     Lxyz. xyz
     """
-    def __init__(self, parameters: List[Var], body):
-        if not isinstance(parameters, list):
+    __slots__ = _fields = ("parameters", "body")
+    def __new__(cls, parameters: List[Var], body):
+        if not isinstance(parameters, (list, tuple)):
             raise Exception("Abstraction's parameters are expected to be a list.")
         if len(parameters) == 0:
             raise Exception("Abstraction's parameters are empty.")
-        self.parameters = parameters
-        self.body = body
+        return cls._make(tuple(parameters), body)
     def __str__(self) -> str:
         return "L{}.{}".format("".join(list(map(str, self.parameters))), str(self.body))
     def __repr__(self) -> str:
         return "(L{}.{})".format("".join(list(map(repr, self.parameters))), repr(self.body))
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, Abstr):
-            is_eq = True
-            if len(self.parameters) != len(other.parameters):
-                return False
-            for i in range(len(self.parameters)):
-                is_eq = is_eq and self.parameters[i].__eq__(other.parameters[i])
-                if not is_eq:
-                    return False
-            return self.body.__eq__(other.body)
-        return False
 
     def split(self) -> Tuple[LambdaExpr, str]:       
         """
@@ -105,7 +154,7 @@ class Abstr(LambdaExpr):
         if len(self.parameters) == 0: 
             raise Exception("Attempting to split a Lambda abstraction with no parameters.")
         if len(self.parameters) > 1:
-            return Abstr(deepcopy(self.parameters[1:]), self.body), self.parameters[0].symbol
+            return Abstr(self.parameters[1:], self.body), self.parameters[0].symbol
         else: 
             return self.body, self.parameters[0].symbol
 
@@ -114,27 +163,14 @@ class Apply(LambdaExpr):
     Represents an Application expression
     (functor ..args) ~ (functor arg_1)arg2...
     """
-    def __init__(self, functor, *arguments):
-        self.functor = functor
-        self.arguments = list(arguments)
+    __slots__ = _fields = ("functor", "arguments")
+    def __new__(cls, functor, *arguments):
+        return cls._make(functor, arguments)
     def __repr__(self):
         return "({} {})".format(repr(self.functor), " ".join(list(map(repr, self.arguments))))
     def __str__(self): 
         """Predicate-style nice print"""
         return "{}({})".format(str(self.functor), ", ".join(list(map(str, self.arguments))))
-    def __eq__(self, other):
-        if isinstance(other, Apply):
-            is_eq = self.functor.__eq__(other.functor)
-            if not is_eq:
-                return False
-            if len(self.arguments) != len(other.arguments):
-                return False
-            for i in range(len(self.arguments)):
-                is_eq = is_eq and self.arguments[i].__eq__(other.arguments[i])
-                if not is_eq:
-                    return False
-            return True
-        return False
 
 
 """
@@ -148,104 +184,112 @@ class AndOpr(LambdaExpr):
     And operator
     (AND a1 a2 a3...) --> a1 & a2 & a3
     """
-    def __init__(self, *args):
-        self.operands = list(args)
-        if len(self.operands) < 2: 
+    __slots__ = _fields = ("operands",)
+    def __new__(cls, *args):
+        if len(args) < 2: 
             raise Exception("And-operator requires at least 2 operands.")
+        return cls._make(args)
     def __str__(self):
         return " & ".join(list(map(str, self.operands)))
     def __repr__(self):
         return f"AND( {', '.join(list(map(repr, self.operands))) } )"
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, AndOpr):
-            if len(self.operands) != len(other.operands): 
-                return False
-            for i in range(len(self.operands)):
-                if not self.operands[i].__eq__(other.operands[i]):
-                    return False
-            return True
-        return False
 
 
 class ImpliesOpr(LambdaExpr): 
-    def __init__(self, lhs: LambdaExpr, rhs: LambdaExpr):
-        self.lhs = lhs
-        self.rhs = rhs
-
-        # self._implies_unicode = u'\u2192'
-        self._implies_unicode = "->"
+    __slots__ = _fields = ("lhs", "rhs")
+    # _implies_unicode = u'\u2192'
+    _implies_unicode = "->"
+    def __new__(cls, lhs: LambdaExpr, rhs: LambdaExpr):
+        return cls._make(lhs, rhs)
     def __str__(self) -> str:
         return f"{str(self.lhs)} {self._implies_unicode} {str(self.rhs)}"
     def __repr__(self) -> str:
         return f"{repr(self.lhs)} {self._implies_unicode} {repr(self.rhs)}"
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, ImpliesOpr):
-            return self.lhs.__eq__(other.lhs) and self.rhs.__eq__(other.rhs)
-        return False
     
 class Exists(LambdaExpr): 
-    def __init__(self, vars: List[Var], formula: LambdaExpr):
-        self.vars = vars
-        self.formula = formula 
-        # self._exists_unicode = u'\u2203'
-        self._exists_unicode = "?"
+    __slots__ = _fields = ("vars", "formula")
+    # _exists_unicode = u'\u2203'
+    _exists_unicode = "?"
+    def __new__(cls, vars: List[Var], formula: LambdaExpr):
+        return cls._make(tuple(vars), formula)
     
     def __str__(self) -> str:
         return f"{self._exists_unicode}{''.join(list(map(str, self.vars)))}.{str(self.formula)}"
     
     def __repr__(self) -> str:
         return f"{self._exists_unicode}{''.join(list(map(repr, self.vars)))}[{repr(self.formula)}]"
-    
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, Exists):
-            is_eq = True
-            if len(self.vars) != len(other.vars):
-                return False
-            for i in range(len(self.vars)):
-                is_eq = is_eq and self.vars[i].__eq__(other.vars[i])
-                if not is_eq:
-                    return False
-            return self.formula.__eq__(other.formula)
-        return False
 
 
 class ForAll(LambdaExpr): 
     """
     should have the same attributes as Exists
     """
-    def __init__(self, vars: List[Var], formula: LambdaExpr):
-        self.vars = vars
-        self.formula = formula 
-        # self._forall_unicode = u'\u2200'
-        self._forall_unicode = "@"
+    __slots__ = _fields = ("vars", "formula")
+    # _forall_unicode = u'\u2200'
+    _forall_unicode = "@"
+    def __new__(cls, vars: List[Var], formula: LambdaExpr):
+        return cls._make(tuple(vars), formula)
     
     def __str__(self) -> str:
         return f"{self._forall_unicode}{''.join(list(map(str, self.vars)))}.{str(self.formula)}"
     
     def __repr__(self) -> str:
         return f"{self._forall_unicode}{''.join(list(map(repr, self.vars)))}[{repr(self.formula)}]"
-    
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, ForAll):
-            is_eq = True
-            if len(self.vars) != len(other.vars):
-                return False
-            for i in range(len(self.vars)):
-                is_eq = is_eq and self.vars[i].__eq__(other.vars[i])
-                if not is_eq:
-                    return False
-            return self.formula.__eq__(other.formula)
-        return False
 
 class Neg(LambdaExpr):
-    def __init__(self, formula: LambdaExpr):
-        self.formula = formula
-        self._neg_unicode = "-"
+    __slots__ = _fields = ("formula",)
+    _neg_unicode = "-"
+    def __new__(cls, formula: LambdaExpr):
+        return cls._make(formula)
     def __str__(self) -> str:
         return f"{self._neg_unicode}{str(self.formula)}"
     def __repr__(self) -> str:
         return f"{self._neg_unicode}({repr(self.formula)})"
-    def __eq__(self, other: object) -> bool:
-        if isinstance(other, Neg):
-            return self.formula.__eq__(other.formula)
-        return False
\ No newline at end of file
+
+
+"""
+Locally nameless form (see nameless.py): bound variables are De Bruijn indices,
+free variables stay named Var. Binders keep their arity; the original names are 
+only kept as hints for printing back, so alpha-equivalent terms built 
+without hints are the same object.
+"""
+
+class BoundVar(LambdaExpr):
+    """De Bruijn index: number of binder slots between the variable and its binder"""
+    __slots__ = _fields = ("index",)
+    def __new__(cls, index: int):
+        return cls._make(index)
+    def __str__(self) -> str:
+        return f"#{self.index}"
+    def __repr__(self) -> str:
+        return f"#{self.index}"
+
+class NamelessBinder(LambdaExpr):
+    """
+    Binder of arity slots. With parameters p0..pn-1, p(n-1) is index 0 inside body.
+    hints: original parameter names, or None
+    """
+    __slots__ = _fields = ("arity", "body", "hints")
+    _symbol = ""
+    def __new__(cls, arity: int, body: LambdaExpr, hints: Tuple[str, ...] = None):
+        if arity < 1:
+            raise Exception("Binder's arity must be positive.")
+        if hints is not None and len(hints) != arity:
+            raise Exception("Binder's hints {} do not match arity {}.".format(hints, arity))
+        return cls._make(arity, body, None if hints is None else tuple(hints))
+    def __str__(self) -> str:
+        return f"{self._symbol}:{self.arity}.{str(self.body)}"
+    def __repr__(self) -> str:
+        return f"({self._symbol}:{self.arity}.{repr(self.body)})"
+
+class NamelessAbstr(NamelessBinder):
+    __slots__ = ()
+    _symbol = "L"
+
+class NamelessExists(NamelessBinder):
+    __slots__ = ()
+    _symbol = "?"
+
+class NamelessForAll(NamelessBinder):
+    __slots__ = ()
+    _symbol = "@"
@@ -1,257 +1,185 @@
 """
 Functions to process and evaluate Lambda Expressions
 """
-from .lambda_ast import LambdaExpr, Var, Const, AndOpr, Abstr, Apply, ImpliesOpr, Exists, ForAll, Neg
+from .lambda_ast import LambdaExpr, Var, Const, AndOpr, Abstr, Apply, ImpliesOpr, Exists, ForAll, Neg, BoundVar, NamelessBinder
+from .traversal import rewrite, rebuild, children, fold, plug, Done, invalid_expr_msg
+from .dispatch import Dispatch
+from .fresh import VarArena
 from .utils import *
-from copy import deepcopy
-from typing import Union, List
+from typing import Union, List, NamedTuple, Tuple, FrozenSet
 
-invalid_expr_msg = "Unexpected expression type {} for {}"
+_EMPTY = frozenset()
 
-def free_vars(expr: LambdaExpr):
+# binder -> its parameters, None for other expressions
+_PARAMS = Dispatch({
+    Abstr: lambda e: e.parameters,
+    Exists: lambda e: e.vars,
+    ForAll: lambda e: e.vars,
+}, default=lambda e: None)
+
+def _union(expr: LambdaExpr, results: list) -> FrozenSet[str]:
+    return _EMPTY.union(*results)
+
+def _cached(slot: str, table: Dispatch):
+    """enter and leave callbacks for fold: 
+    value of a node computed by table from the values of its children (results), cached on the node in slot"""
+    def enter(expr: LambdaExpr):
+        res = getattr(expr, slot, None)
+        return expr if res is None else Done(res)
+    def leave(expr: LambdaExpr, results: list):
+        return expr._cache(slot, table[type(expr)](expr, results))
+    return enter, leave
+
+_FREE_VARS = Dispatch({
+    Var: lambda e, r: frozenset([e.symbol]),
+    Abstr: lambda e, r: r[-1].difference([p.symbol for p in e.parameters]),
+    Exists: lambda e, r: r[-1].difference([v.symbol for v in e.vars]),
+    ForAll: lambda e, r: r[-1].difference([v.symbol for v in e.vars]),
+}, default=_union)
+_enter_free_vars, _leave_free_vars = _cached("_free_vars", _FREE_VARS)
+
+_BOUND_VARS = Dispatch({
+    Abstr: lambda e, r: r[-1].union([p.symbol for p in e.parameters]),
+    Exists: lambda e, r: r[-1].union([v.symbol for v in e.vars]),
+    ForAll: lambda e, r: r[-1].union([v.symbol for v in e.vars]),
+}, default=_union)
+_enter_bound_vars, _leave_bound_vars = _cached("_bound_vars", _BOUND_VARS)
+
+_USED_VARS = Dispatch({
+    Var: lambda e, r: frozenset([e.symbol]),
+    Abstr: lambda e, r: r[-1],
+    Exists: lambda e, r: r[-1],
+    ForAll: lambda e, r: r[-1],
+}, default=_union)
+_enter_used_vars, _leave_used_vars = _cached("_used_vars", _USED_VARS)
+
+def free_vars(expr: LambdaExpr) -> FrozenSet[str]:
     """
     Get all free variables inside an expression
+    Computed once per node and cached on it
     """
-    if isinstance(expr, Var):
-        return {expr.symbol}
-    elif isinstance(expr, AndOpr):
-        res = set()
-        for o in expr.operands:
-            res = res | free_vars(o)
-        return res
-    elif isinstance(expr, Abstr):
-        return free_vars(expr.body) - set(list(map(str, expr.parameters)))
-    elif isinstance(expr, Apply):
-        res = free_vars(expr.functor)
-        for a in expr.arguments:
-            res = res | free_vars(a)
-        return res
-    elif isinstance(expr, Const):
-        return set()
-    elif isinstance(expr, ForAll) or isinstance(expr, Exists):
-        return free_vars(expr.formula) - set(list(map(str, expr.vars)))
-    elif isinstance(expr, ImpliesOpr): 
-        return free_vars(expr.lhs) | free_vars(expr.rhs)
-    elif isinstance(expr, Neg): 
-        return free_vars(expr.formula)
-    
-    raise Exception(invalid_expr_msg.format(type(expr), expr))
-    return None
+    res = getattr(expr, "_free_vars", None)
+    if res is None: 
+        res = fold(expr, _leave_free_vars, _enter_free_vars)
+    return res
 
-def bound_vars(expr: LambdaExpr):
+def bound_vars(expr: LambdaExpr) -> FrozenSet[str]:
     """
     Return all bound variables
+    Computed once per node and cached on it
     """
-    if isinstance(expr, Var) or isinstance(expr, Const):
-        return set()
-    elif isinstance(expr, AndOpr):
-        res = set()
-        for o in expr.operands:
-            res = res | bound_vars(o)
-        return res
-    elif isinstance(expr, Abstr):
-        return bound_vars(expr.body) | set(list(map(str, expr.parameters)))
-    elif isinstance(expr, Apply):
-        res = bound_vars(expr.functor)
-        for a in expr.arguments:
-            res = res | bound_vars(a)
-        return res
-    elif isinstance(expr, ForAll) or isinstance(expr, Exists):
-        return bound_vars(expr.formula) | set(list(map(str, expr.vars)))
-    elif isinstance(expr, ImpliesOpr): 
-        return bound_vars(expr.lhs) | bound_vars(expr.rhs)
-    elif isinstance(expr, Neg):
-        return bound_vars(expr.formula)
-    
-    raise Exception(invalid_expr_msg.format(type(expr), expr))
-    return None
+    res = getattr(expr, "_bound_vars", None)
+    if res is None: 
+        res = fold(expr, _leave_bound_vars, _enter_bound_vars)
+    return res
 
-def used_vars(expr: LambdaExpr):
+def used_vars(expr: LambdaExpr) -> FrozenSet[str]:
     """ Variable names that are actually used, 
         not including Exists/ForAll/Abstr var declarations
+        Computed once per node and cached on it
         TODO: bound + free = used. All = used + unused
     """
-    if isinstance(expr, Var):
-        return {expr.symbol}
-    elif isinstance(expr, AndOpr):
-        res = set()
-        for o in expr.operands:
-            res = res | used_vars(o)
-        return res
-    elif isinstance(expr, Abstr):
-        return used_vars(expr.body)
-    elif isinstance(expr, Apply):
-        res = used_vars(expr.functor)
-        for a in expr.arguments:
-            res = res | used_vars(a)
-        return res
-    elif isinstance(expr, Const):
-        return set()
-    elif isinstance(expr, ForAll) or isinstance(expr, Exists):
-        return used_vars(expr.formula)
-    elif isinstance(expr, ImpliesOpr): 
-        return used_vars(expr.lhs) | used_vars(expr.rhs)
-    elif isinstance(expr, Neg):
-        return used_vars(expr.formula)
-    
-    raise Exception(invalid_expr_msg.format(type(expr), expr))
-    return None
+    res = getattr(expr, "_used_vars", None)
+    if res is None: 
+        res = fold(expr, _leave_used_vars, _enter_used_vars)
+    return res
+
+def _binds(expr: LambdaExpr, name: str, *args):
+    """enter callback: skip the binders of name"""
+    if name in [p.symbol for p in _PARAMS[type(expr)](expr)]:
+        return Done(expr)
+    return expr
+
+def _descend(expr: LambdaExpr, *args):
+    return expr
+
+# enter callbacks of alpha_reduce: (expr, to_replace, replacement)
+_ALPHA_REDUCE = Dispatch({
+    Var: lambda e, old, new: Done(Var(new) if e.symbol == old else e),
+    Abstr: _binds, # TODO: requires more test here
+    Exists: _binds,
+    ForAll: _binds,
+}, default=_descend)
 
 def alpha_reduce(expr: LambdaExpr, to_replace: str, replacement: str) -> Union[Abstr, Exists, ForAll]: 
     """
     Replace all free occurrences of var to_replace inside expr
     """
-    def _alpha_reduce(expr: LambdaExpr, to_replace: str, replacement: str): 
-        """ Original Lambda split into Lx.expr : expr is body, x is lambda identity 
-        """
-        if isinstance(expr, Var):
-            if expr.symbol == to_replace: 
-                return Var(replacement)
-            else: 
-                return Var(expr.symbol)
-        elif isinstance(expr, Apply): 
-            return Apply(
-                _alpha_reduce(expr.functor, to_replace, replacement),
-                *[_alpha_reduce(arg, to_replace, replacement) for arg in expr.arguments]
-            )
-        elif isinstance(expr, Abstr):
-            if to_replace in list(map(str, expr.parameters)):  # TODO: requires more test here
-                # all occurrences of to_replace will be bound in expr -- skipped
-                return deepcopy(expr)
-            else:    
-                return Abstr(deepcopy(expr.parameters), _alpha_reduce(expr.body, to_replace, replacement))
-        elif isinstance(expr, Exists) or isinstance(expr, ForAll): # same as Abstr
-            if to_replace in list(map(str, expr.vars)):  
-                return deepcopy(expr)
-            else:    
-                cls = Exists if isinstance(expr, Exists) else ForAll
-                return cls(deepcopy(expr.vars), _alpha_reduce(expr.formula, to_replace, replacement))
-        elif isinstance(expr, Const):
-            return deepcopy(expr)
-        elif isinstance(expr, AndOpr):
-            return AndOpr(*[_alpha_reduce(o, to_replace, replacement) for o in expr.operands])
-        elif isinstance(expr, ImpliesOpr):
-            return ImpliesOpr(
-                _alpha_reduce(expr.lhs, to_replace, replacement),
-                _alpha_reduce(expr.rhs, to_replace, replacement)
-            )
-        elif isinstance(expr, Neg):
-            return Neg(_alpha_reduce(expr.formula, to_replace, replacement))
-        
-        raise Exception(invalid_expr_msg.format(type(expr), expr))
-        return None
-        
-    if isinstance(expr, Abstr):
-        params = deepcopy(expr.parameters)
-        param_names = list(map(str, params))
-        if to_replace not in param_names: 
-            raise Exception("Variable to_replace {} is not in expression parameters {}.".format(to_replace, expr))
-        
-        replace_idx = param_names.index(to_replace)
-        params[replace_idx] = Var(replacement)
-        return Abstr(params, _alpha_reduce(expr.body, to_replace, replacement))
-    elif isinstance(expr, Exists) or isinstance(expr, ForAll):
-        vars = deepcopy(expr.vars)
-        var_names = list(map(str, vars))
-        if to_replace not in var_names: 
-            raise Exception("Variable to_replace {} is not in expression parameters {}.".format(to_replace, expr))
-        replace_idx = var_names.index(to_replace)
-        var_names[replace_idx] = Var(replacement)
-        cls = Exists if isinstance(expr, Exists) else ForAll
-        return cls(var_names, _alpha_reduce(expr.formula, to_replace, replacement))
-
-    raise Exception("Invalid Expr Type {}. Expected Abstr/Exists/ForAll, but get {}".format(expr, type(format)))
-
-
-def _substitute(expr: LambdaExpr, to_replace: str, arg: LambdaExpr):
+    params = _PARAMS[type(expr)](expr)
+    if params is None:
+        raise Exception("Invalid Expr Type {}. Expected Abstr/Exists/ForAll, but get {}".format(expr, type(format)))
+    params = list(params)
+    param_names = [p.symbol for p in params]
+    if to_replace not in param_names: 
+        raise Exception("Variable to_replace {} is not in expression parameters {}.".format(to_replace, expr))
+    params[param_names.index(to_replace)] = Var(replacement)
+    # Original Lambda split into Lx.expr : expr is body, x is lambda identity 
+    # all occurrences of to_replace inside a binder of to_replace are bound -- skipped
+    body = rewrite(children(expr)[-1], lambda e: _ALPHA_REDUCE[type(e)](e, to_replace, replacement))
+    return rebuild(expr, [*params, body])
+
+
+def _substitute_binder(expr: LambdaExpr, to_replace: str, arg: LambdaExpr, arg_free: FrozenSet[str], params_left: list,
+                       arena: VarArena):
+    params = _PARAMS[type(expr)](expr)
+    if to_replace in [p.symbol for p in params]: # to_replace is bound. Skip substituting
+        return Done(expr)
+    params_left[0] = len(params)
+    for p in params:
+        if p.symbol in arg_free: # name conflict
+            expr = alpha_reduce(expr, p.symbol, arena.fresh_avoiding(arg_free | used_vars(expr) | bound_vars(expr)).symbol)
+    return expr
+
+# enter callbacks of _substitute: (expr, to_replace, arg, free vars of arg, params_left, arena)
+_SUBSTITUTE = Dispatch({
+    Var: lambda e, old, arg, *_: Done(arg if e.symbol == old else e),
+    Abstr: _substitute_binder,
+    Exists: _substitute_binder,
+    ForAll: _substitute_binder,
+}, default=_descend)
+
+def _substitute(expr: LambdaExpr, to_replace: str, arg: LambdaExpr, arena: VarArena):
     """
     Lx.expr) arg
-    Alpha conversion by priming variable_name x -> x'
+    Alpha conversion renames a binder to a fresh variable of arena
+    Subterms where to_replace is not free, and no binder clashes with a free variable of arg, 
+    are returned as they are.
     """
-    if isinstance(expr, Var): 
-        if expr.symbol == to_replace: 
-            return deepcopy(arg)
-        else: 
-            return deepcopy(expr)
-    elif isinstance(expr, Const):
-        return deepcopy(expr)
-    elif isinstance(expr, Abstr):
-        _, lambda_id = expr.split()
-        param_symbols = [e.symbol for e in expr.parameters]
-        if to_replace in param_symbols: # to_replace is bound. Skip substituting
-            return deepcopy(expr)
-        else: 
-            if lambda_id not in free_vars(arg):
-                return Abstr(deepcopy(expr.parameters), _substitute(expr.body, to_replace, arg)) 
-            else: # name conflict
-                reduced = alpha_reduce(expr, lambda_id, lambda_id + "\'")
-                return Abstr(reduced.parameters, _substitute(reduced.body, to_replace, arg))
-    elif isinstance(expr, Exists) or isinstance(expr, ForAll):
-        lambda_id = expr.vars[0].symbol
-        var_symbols = [e.symbol for e in expr.vars]
-        if to_replace in var_symbols: 
-            return deepcopy(expr)
-        else: 
-            cls = Exists if isinstance(expr, Exists) else ForAll
-            if lambda_id not in free_vars(arg):
-                return cls(deepcopy(expr.vars), _substitute(expr.formula, to_replace, arg))
-            else: 
-                reduced = alpha_reduce(expr, lambda_id,lambda_id + "\'")
-                return cls(reduced.vars, _substitute(reduced.formula, to_replace, arg))
-    elif isinstance(expr, AndOpr):
-        return AndOpr(*[_substitute(o, to_replace, arg) for o in expr.operands])
-    elif isinstance(expr, Apply):
-        return Apply(_substitute(expr.functor, to_replace, arg), *[_substitute(a,to_replace, arg) for a in expr.arguments])
-    elif isinstance(expr, ImpliesOpr):
-        return ImpliesOpr(
-            _substitute(expr.lhs, to_replace, arg),
-            _substitute(expr.rhs, to_replace, arg)
-        )
-    elif isinstance(expr, Neg):
-        return Neg(
-            _substitute(expr.formula, to_replace, arg)
-        )
-    
-    raise Exception(invalid_expr_msg.format(type(expr), expr))
-    return None
+    arg_free = free_vars(arg)
+    params_left = [0] # parameters of the binder just entered are visited next, and kept as they are
+
+    def enter(expr: LambdaExpr):
+        if params_left[0]:
+            params_left[0] -= 1
+            return Done(expr)
+        if to_replace not in free_vars(expr) and arg_free.isdisjoint(bound_vars(expr)):
+            return Done(expr)
+        return _SUBSTITUTE[type(expr)](expr, to_replace, arg, arg_free, params_left, arena)
+
+    return rewrite(expr, enter)
 
    
-def beta_reduce(expr: LambdaExpr, max_iter=100, show_step=False): 
-    """Beta reduction in normal order (leftmost-outermost order)""" 
+def beta_reduce_stepwise(expr: LambdaExpr, max_iter=100, show_step=False, arena: VarArena = None): 
+    """Beta reduction in normal order (leftmost-outermost order), one redex per pass over the expression.
+    Reference implementation for beta_reduce; every step rebuilds the whole expression.
+    """ 
+    return _beta_reduce_stepwise(expr, max_iter, show_step, arena)[0]
+
+def _beta_reduce_stepwise(expr: LambdaExpr, max_iter=100, show_step=False, arena: VarArena = None) -> Tuple[LambdaExpr, int]: 
+    """Return the normal form and the number of contracted redexes"""
+    if arena is None:
+        arena = VarArena()
 
     def _beta_reduce_step(expr: LambdaExpr, leftmost_outermost_reduced: list):
-        if isinstance(expr, Var) or isinstance(expr, Const):
-            return deepcopy(expr)
-        elif isinstance(expr, Abstr):
-            return Abstr(deepcopy(expr.parameters), _beta_reduce_step(expr.body, leftmost_outermost_reduced))
-        elif isinstance(expr, Apply):
-            if isinstance(expr.functor, Abstr) and not leftmost_outermost_reduced[0]:
+        def enter(expr: LambdaExpr):
+            if leftmost_outermost_reduced[0]:
+                return Done(expr)
+            if isinstance(expr, Apply) and isinstance(expr.functor, Abstr):
                 leftmost_outermost_reduced[0] = True
-                rest, lambda_id = expr.functor.split()
-                if len(expr.arguments) == 0:
-                    raise Exception("Expression is of type Application but with no arguments: {}".format(expr))
-                subs = _substitute(rest, lambda_id, expr.arguments[0])
-                if len(expr.arguments) <= 1:
-                    return subs
-                return Apply(subs, *expr.arguments[1:])
-            else: 
-                return Apply(_beta_reduce_step(expr.functor, leftmost_outermost_reduced),
-                              *[_beta_reduce_step(a, leftmost_outermost_reduced) for a in expr.arguments])
-        elif isinstance(expr, AndOpr):
-            return AndOpr(*[_beta_reduce_step(o, leftmost_outermost_reduced) for o in expr.operands])
-        elif isinstance(expr, ImpliesOpr):
-            return ImpliesOpr(
-                _beta_reduce_step(expr.lhs, leftmost_outermost_reduced),
-                _beta_reduce_step(expr.rhs, leftmost_outermost_reduced)
-            )
-        elif isinstance(expr, Exists) or isinstance(expr, ForAll):
-            cls = Exists if isinstance(expr, Exists) else ForAll
-            return cls(deepcopy(expr.vars), _beta_reduce_step(expr.formula, leftmost_outermost_reduced))
-        elif isinstance(expr, Neg):
-            return Neg(_beta_reduce_step(expr.formula, leftmost_outermost_reduced))
-        
-        raise Exception(invalid_expr_msg.format(type(expr), expr))
-        return None
+                return Done(_contract(expr, arena))
+            return expr
+
+        return rewrite(expr, enter)
     
     cur = expr
     normal_form = False
@@ -269,133 +197,224 @@ def beta_reduce(expr: LambdaExpr, max_iter=100, show_step=False):
     if not normal_form: 
         raise Exception(f"Maximum iterations for beta-reduction reached for expression: \
                          {expr}. Last executed reduction: {cur}")
-    return cur
+    return cur, cur_iter - 1
 
-from typing import Dict, Generator
-def uniqueify_var_names(expr: LambdaExpr, id_incrementer: Generator[str, None, None]):
+def _contract(redex: Apply, arena: VarArena) -> LambdaExpr:
+    """(Lx.body arg1 arg2...) --> (body[x := arg1] arg2...)"""
+    rest, lambda_id = redex.functor.split()
+    if len(redex.arguments) == 0:
+        raise Exception("Expression is of type Application but with no arguments: {}".format(redex))
+    subs = _substitute(rest, lambda_id, redex.arguments[0], arena)
+    if len(redex.arguments) <= 1:
+        return subs
+    return Apply(subs, *redex.arguments[1:])
+
+def beta_reduce(expr: LambdaExpr, max_iter=100, show_step=False, arena: VarArena = None): 
+    """Beta reduction in normal order (leftmost-outermost order).
+    arena: fresh variables of the derivation, for alpha-renaming (a new VarArena by default)""" 
+    return _beta_reduce(expr, max_iter, show_step, arena)[0]
+
+def _beta_reduce(expr: LambdaExpr, max_iter=100, show_step=False, arena: VarArena = None) -> Tuple[LambdaExpr, int]:
+    """
+    Single-pass normal order reduction. Return the normal form and the number of contracted redexes.
+    Redexes are contracted in the same order as beta_reduce_stepwise, but the expression is walked once:
+    the head of an application is reduced first (spine), and a subterm is only revisited 
+    when a contraction happens at its position.
+    The traversal frames give the whole expression around a redex; it is only built when show_step is set.
+    """
+    if arena is None:
+        arena = VarArena()
+    steps = [0]
+    frames = []
+    stuck = set() # applications whose head can never become an abstraction
+
+    def _step(redex: Apply, spine: list) -> LambdaExpr:
+        whole = None
+        if show_step: 
+            whole = redex
+            for args in reversed(spine):
+                whole = Apply(whole, *args)
+            whole = plug(frames, whole)
+            print(f"Step {steps[0]}: {LambdaExpr.colored_repr(whole)}")
+        steps[0] += 1
+        if steps[0] >= max_iter:
+            raise Exception(f"Maximum iterations for beta-reduction reached for expression: \
+                             {expr}. Last executed reduction: {whole if show_step else redex}")
+        return _contract(redex, arena)
+
+    def _head(expr: Apply) -> LambdaExpr:
+        """Reduce until expr is not an application, or its functor can never become an abstraction"""
+        spine = [] # arguments of the enclosing applications, innermost last
+        while True:
+            while isinstance(expr, Apply):
+                spine.append(expr.arguments)
+                expr = expr.functor
+            if not spine or not isinstance(expr, Abstr):
+                break
+            expr = _step(Apply(expr, *spine.pop()), spine)
+        while spine:
+            expr = Apply(expr, *spine.pop())
+            stuck.add(expr)
+        return expr
+
+    def enter(expr: LambdaExpr):
+        if isinstance(expr, Apply) and expr not in stuck:
+            return _head(expr)
+        return expr
+
+    result = rewrite(expr, enter, frames=frames)
+    if show_step: 
+        print(f"Step {steps[0]}: {LambdaExpr.colored_repr(result)}")
+    return result, steps[0]
+
+from typing import Dict, Iterator
+def uniqueify_var_names(expr: LambdaExpr, id_incrementer: Iterator[str] = None):
     """
     Helper function, assign var name inside lambda expr.
-    scoped_id_incrementer:
+    id_incrementer: fresh names, a new VarArena by default
     """
-    def _uniqueify_var_names(expr: LambdaExpr, vars_mp: Dict[str, str]):
+    if id_incrementer is None:
+        id_incrementer = VarArena()
+    vars_mp: Dict[str, str] = {}
+
+    def enter(expr: LambdaExpr):
         if isinstance(expr, Var): 
             name = expr.symbol
             if name not in vars_mp: 
                 id = next(id_incrementer)
                 vars_mp[name] = id
-            return Var(vars_mp[name])
-        elif isinstance(expr, AndOpr):
-            return AndOpr(*[_uniqueify_var_names(e, vars_mp) for e in expr.operands])
-        elif isinstance(expr, Apply):
-            return Apply(
-                _uniqueify_var_names(expr.functor, vars_mp), 
-                *[_uniqueify_var_names(a, vars_mp) for a in expr.arguments]
-            )
-        elif isinstance(expr, Abstr):
-            return Abstr([_uniqueify_var_names(p, vars_mp) for p in expr.parameters], 
-                         _uniqueify_var_names(expr.body, vars_mp))
-        elif isinstance(expr, Const):
-            return Const(expr.symbol)
-        elif isinstance(expr, ImpliesOpr):
-            return ImpliesOpr(_uniqueify_var_names(expr.lhs, vars_mp), _uniqueify_var_names(expr.rhs, vars_mp))
-        elif isinstance(expr, Exists) or isinstance(expr, ForAll):
-            cls = Exists if isinstance(expr, Exists) else ForAll
-            return cls(
-                [_uniqueify_var_names(v, vars_mp) for v in expr.vars],
-                _uniqueify_var_names(expr.formula, vars_mp)
-            )
-        elif isinstance(expr, Neg):
-            return Neg(_uniqueify_var_names(expr.formula, vars_mp))
-        
-        raise Exception(invalid_expr_msg.format(type(expr), expr))
-    
-    dt = {}
-    return _uniqueify_var_names(expr, dt)
+            return Done(Var(vars_mp[name]))
+        return expr
+
+    return rewrite(expr, enter)
 
 
 def assert_unique_vars(expr: LambdaExpr):
     """Assert that all variables are standardized (no var names are reused)
+    i.e. no binder re-binds a name that is already bound by an enclosing binder.
+    Single traversal keeping the names bound by enclosing binders in scope.
     """
-    if isinstance(expr, Abstr):
-        for a in expr.parameters: 
-            assert a.symbol not in bound_vars(expr.body)
-        assert_unique_vars(expr.body)
-    elif isinstance(expr, ForAll) or isinstance(expr, Exists):
-        for a in expr.vars: 
-            assert a.symbol not in bound_vars(expr.formula)
-        assert_unique_vars(expr.formula)
-    elif isinstance(expr, Apply):
-        assert_unique_vars(expr.functor)
-        for arg in expr.arguments: 
-            assert_unique_vars(arg)
-    elif isinstance(expr, AndOpr):
-        for opr in expr.operands: 
-            assert_unique_vars(opr)
-    elif isinstance(expr, ImpliesOpr): 
-        assert_unique_vars(expr.lhs)
-        assert_unique_vars(expr.rhs)
-    elif isinstance(expr, Const) or isinstance(expr, Var):
-        return 
-    elif isinstance(expr, Neg):
-        assert_unique_vars(expr.formula)
-    else: 
-        raise Exception(invalid_expr_msg.format(type(expr), expr))
-
-
-def _flatten_AND(expr: AndOpr) -> list:
-    ret = []
-    for op in expr.operands: 
-        if isinstance(op, AndOpr):
-            ret.extend(_flatten_AND(op))
-        elif op == TRUE: 
-            # TODO: separate this into evaluation of AndOpr
-            continue
-        else: 
-            ret.append(op)
-    return ret
-
-def _flatten(expr: LambdaExpr):
+    scope = set()
+    bound = [] # names bound by each enclosing binder
+
+    def enter(expr: LambdaExpr):
+        params = _PARAMS[type(expr)](expr)
+        if params is not None:
+            names = set(v.symbol for v in params)
+            assert scope.isdisjoint(names)
+            scope.update(names)
+            bound.append(names)
+        return expr
+
+    def leave(expr: LambdaExpr, results: list):
+        if _PARAMS[type(expr)](expr) is not None:
+            scope.difference_update(bound.pop())
+
+    fold(expr, leave, enter)
+
+
+# flatten: conjunctions and the quantifiers directly under them are not built when they are left,
+# but kept as ropes (results of their children) that the enclosing conjunction splices in.
+# Each conjunction is built once, at the top, so flattening is linear in the size of the expression.
+class _Conj(NamedTuple):
+    parts: list # results of the operands
+
+class _Prefix(NamedTuple):
+    quantifiers: list # (Exists or ForAll, var), outermost first
+    body: object # result of the quantified formula
+
+_FLIP = {Exists: ForAll, ForAll: Exists}
+
+def _collect(value) -> Tuple[list, list]:
+    """Quantifiers (in order) and operands (TRUE left out) of a rope"""
+    quantifiers, operands = [], []
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        if type(v) is _Conj:
+            stack.extend(reversed(v.parts))
+        elif type(v) is _Prefix:
+            quantifiers.extend(v.quantifiers)
+            stack.append(v.body)
+        elif v is not TRUE:
+            operands.append(v)
+    return quantifiers, operands
+
+def _quantify(quantifiers: list, matrix: LambdaExpr) -> LambdaExpr:
+    """Consecutive quantifiers of a kind make one Exists / ForAll"""
+    end = len(quantifiers)
+    while end > 0:
+        kind = quantifiers[end - 1][0]
+        start = end - 1
+        while start > 0 and quantifiers[start - 1][0] is kind:
+            start -= 1
+        matrix = kind([v for _, v in quantifiers[start:end]], matrix)
+        end = start
+    return matrix
+
+def _conjunction(operands: list) -> LambdaExpr:
+    if not operands:
+        return TRUE
+    return operands[0] if len(operands) == 1 else AndOpr(*operands)
+
+def _close(value, prenex: bool) -> LambdaExpr:
+    """Expression of a rope: its quantifiers in front of the merged conjunction.
+    Unless prenex, a quantifier that is not in a conjunction is kept as a separate binder"""
+    if type(value) is not _Conj and type(value) is not _Prefix:
+        return value
+    outer = []
+    while not prenex and type(value) is _Prefix:
+        outer.append(value.quantifiers)
+        value = value.body
+    quantifiers, operands = _collect(value)
+    res = _quantify(quantifiers, _conjunction(operands))
+    for q in reversed(outer):
+        res = _quantify(q, res)
+    return res
+
+def _flatten_connective(expr: LambdaExpr, results: list):
+    """Prenex form of a negation or an implication: quantifiers of the negated formula or of the premise
+    are flipped (variables are unique, so they cannot be captured)"""
+    quantifiers, matrices = [], []
+    for i, r in enumerate(results):
+        q, operands = _collect(r)
+        flip = isinstance(expr, Neg) or i == 0
+        quantifiers.extend((_FLIP[k], v) if flip else (k, v) for k, v in q)
+        matrices.append(_conjunction(operands))
+    matrix = rebuild(expr, matrices)
+    return _Prefix(quantifiers, matrix) if quantifiers else matrix
+
+def flatten(expr: LambdaExpr, prenex: bool = False) -> LambdaExpr:
     """
-    TODO: requires heavy testing on Prenex Normal Form
+    Merge nested conjunctions into one (n-ary) AND and move the quantifiers of the operands in front of it,
+    in order; TRUE operands are left out. Asserts that variables are standardized (see assert_unique_vars).
+    prenex: also move the quantifiers out of negations and implications, and merge nested quantifiers,
+        which gives the prenex normal form
+    Single traversal, linear in the size of the expression.
     """
-    if isinstance(expr, Abstr):
-        return Abstr(expr.parameters, _flatten(expr.body))
-    elif isinstance(expr, Apply):
-        return Apply(_flatten(expr.functor), *[_flatten(e) for e in expr.arguments])
-    elif isinstance(expr, Exists) or isinstance(expr, ForAll):
-        cls = Exists if isinstance(expr, Exists) else ForAll
-        return cls(expr.vars, _flatten(expr.formula))
-    elif isinstance(expr, ImpliesOpr):
-        return ImpliesOpr(_flatten(expr.lhs), _flatten(expr.rhs))
-    elif isinstance(expr, AndOpr):
-        forall_q = []
-        exists_q = []
-        operands = []
-        for op in expr.operands: 
-            o = _flatten(op)
-            while isinstance(o, Exists) or isinstance(o, ForAll):
-                if isinstance(o, Exists):
-                    exists_q.extend(o.vars)
-                else:   
-                    forall_q.extend(o.vars)
-                o = o.formula
-            if isinstance(o, AndOpr):
-                operands.extend(_flatten_AND(o))
-            else: 
-                operands.append(o)
-        ret = AndOpr(*operands)
-        if len(exists_q) > 0: 
-            ret = Exists(exists_q, ret)
-        if len(forall_q) > 0: 
-            ret = ForAll(forall_q, ret)
-        return ret
-    elif isinstance(expr, Const) or isinstance(expr, Var):
+    scope = set()
+    bound = [] # names bound by each enclosing binder
+
+    def enter(expr: LambdaExpr):
+        params = _PARAMS[type(expr)](expr)
+        if params is not None:
+            names = set(v.symbol for v in params)
+            assert scope.isdisjoint(names)
+            scope.update(names)
+            bound.append(names)
         return expr
-    elif isinstance(expr, Neg):
-        return Neg(_flatten(expr.formula))
-    
-    raise Exception(invalid_expr_msg.format(type(expr), expr))
 
-def flatten(expr: LambdaExpr):
-    assert_unique_vars(expr)
-    return _flatten(expr)
\ No newline at end of file
+    def leave(expr: LambdaExpr, results: list):
+        t = type(expr)
+        if t is AndOpr:
+            return _Conj(results)
+        if t is Exists or t is ForAll:
+            scope.difference_update(bound.pop())
+            return _Prefix([(t, v) for v in results[:-1]], results[-1])
+        if t is Abstr:
+            scope.difference_update(bound.pop())
+        if prenex and (t is Neg or t is ImpliesOpr):
+            return _flatten_connective(expr, results)
+        return rebuild(expr, [_close(r, prenex) for r in results])
+
+    return _close(rewrite(expr, enter, leave), prenex)
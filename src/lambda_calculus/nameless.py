@@ -0,0 +1,253 @@
+"""
+Locally nameless representation of Lambda Expressions:
+bound variables are De Bruijn indices (BoundVar), free variables stay named (Var).
+Substitution never captures, so it never needs alpha-renaming,
+and alpha-equivalent expressions converted without names are the same (interned) object.
+"""
+from .lambda_ast import LambdaExpr, Var, Const, AndOpr, Abstr, Apply, ImpliesOpr, Exists, ForAll, Neg, \
+    BoundVar, NamelessBinder, NamelessAbstr, NamelessExists, NamelessForAll
+from .lambda_processor import free_vars, invalid_expr_msg
+from .traversal import rewrite, rebuild, fold, Done
+from .dispatch import Dispatch, unexpected
+from typing import Dict, List, Tuple
+
+_to_nameless_binder = {Abstr: NamelessAbstr, Exists: NamelessExists, ForAll: NamelessForAll}
+_to_named_binder = {v: k for k, v in _to_nameless_binder.items()}
+
+def _descend(expr: LambdaExpr):
+    return expr
+
+def _binder_parts(expr: LambdaExpr) -> Tuple[tuple, LambdaExpr]:
+    if isinstance(expr, Abstr):
+        return expr.parameters, expr.body
+    return expr.vars, expr.formula
+
+def to_nameless(expr: LambdaExpr, keep_names=True) -> LambdaExpr:
+    """
+    Convert a named expression to locally nameless form.
+    keep_names: keep parameter names as hints, so that from_nameless gives back the same names.
+    Without hints, alpha-equivalent expressions give the same object.
+    """
+    levels: Dict[str, List[int]] = {} # name -> binder slots (absolute depth) that bind it, innermost last
+    depth = [0]
+
+    def enter_var(expr: Var):
+        slots = levels.get(expr.symbol)
+        if slots:
+            return Done(BoundVar(depth[0] - 1 - slots[-1]))
+        return Done(expr)
+
+    def enter_binder(expr: LambdaExpr):
+        for p in _binder_parts(expr)[0]:
+            levels.setdefault(p.symbol, []).append(depth[0])
+            depth[0] += 1
+        return expr
+
+    enter = Dispatch({
+        Var: enter_var, 
+        Abstr: enter_binder, 
+        Exists: enter_binder, 
+        ForAll: enter_binder,
+        BoundVar: unexpected,
+        NamelessBinder: unexpected,
+    }, default=_descend)
+
+    def leave(expr: LambdaExpr, results: list):
+        if type(expr) not in _to_nameless_binder:
+            return rebuild(expr, results)
+        params = _binder_parts(expr)[0]
+        for p in params:
+            levels[p.symbol].pop()
+        depth[0] -= len(params)
+        hints = tuple(p.symbol for p in params) if keep_names else None
+        return _to_nameless_binder[type(expr)](len(params), results[-1], hints)
+
+    return fold(expr, leave, lambda e: enter[type(e)](e))
+
+def from_nameless(expr: LambdaExpr, default_name="x") -> LambdaExpr:
+    """
+    Convert a locally nameless expression back to a named one.
+    Binders are named after their hints (default_name if none).
+    A hint is suffixed with a number only if it would capture a free variable
+    or shadow an enclosing binder.
+    """
+    names: List[str] = [] # names of enclosing binder slots, innermost last
+    in_scope: Dict[str, int] = {}
+    binder_params: List[List[str]] = [] # parameter names of the enclosing binders
+
+    def _fresh(hint: str, free, params: List[str]) -> str:
+        """hint, or hint1, hint2... avoiding free variables, enclosing binders and previous parameters"""
+        def taken(name: str) -> bool:
+            return name in free or name in in_scope or name in params
+        if not taken(hint):
+            return hint
+        i = 1
+        while taken(f"{hint}{i}"):
+            i += 1
+        return f"{hint}{i}"
+
+    def enter_bound_var(expr: BoundVar):
+        if expr.index >= len(names):
+            raise Exception(f"Loose De Bruijn index {expr.index} cannot be named.")
+        return Done(Var(names[-1 - expr.index]))
+
+    def enter_binder(expr: NamelessBinder):
+        hints = expr.hints or (default_name,) * expr.arity
+        free = free_vars(expr.body)
+        params = []
+        for h in hints:
+            name = _fresh(h, free, params)
+            params.append(name)
+            names.append(name)
+            in_scope[name] = in_scope.get(name, 0) + 1
+        binder_params.append(params)
+        return expr
+
+    enter = Dispatch({
+        BoundVar: enter_bound_var, 
+        NamelessBinder: enter_binder,
+        Abstr: unexpected,
+        Exists: unexpected,
+        ForAll: unexpected,
+    }, default=_descend)
+
+    def leave(expr: LambdaExpr, results: list):
+        if not isinstance(expr, NamelessBinder):
+            return rebuild(expr, results)
+        params = binder_params.pop()
+        for name in params:
+            names.pop()
+            in_scope[name] -= 1
+            if in_scope[name] == 0:
+                del in_scope[name]
+        return _to_named_binder[type(expr)]([Var(p) for p in params], results[0])
+
+    return fold(expr, leave, lambda e: enter[type(e)](e))
+
+def alpha_equivalent(e1: LambdaExpr, e2: LambdaExpr) -> bool:
+    return to_nameless(e1, keep_names=False) is to_nameless(e2, keep_names=False)
+
+def _enter_loose_indices(expr: LambdaExpr):
+    res = getattr(expr, "_loose_indices", None)
+    return expr if res is None else Done(res)
+
+def loose_indices(expr: LambdaExpr) -> int:
+    """
+    1 + the largest De Bruijn index pointing outside expr, 0 if there is none (locally closed).
+    Computed once per node and cached on it
+    """
+    res = getattr(expr, "_loose_indices", None)
+    if res is None:
+        res = fold(expr, _loose_indices, _enter_loose_indices)
+    return res
+
+_LOOSE_INDICES = Dispatch({
+    BoundVar: lambda e, r: e.index + 1,
+    NamelessBinder: lambda e, r: max(0, r[0] - e.arity),
+}, default=lambda e, r: max(r, default=0))
+
+def _loose_indices(expr: LambdaExpr, results: list) -> int:
+    """From the loose indices of the children (results)"""
+    return expr._cache("_loose_indices", _LOOSE_INDICES[type(expr)](expr, results))
+
+def _leave_binder(cutoffs: List[int]):
+    """leave callback for passes that track the binder depth in cutoffs"""
+    def leave(expr: LambdaExpr, results: list):
+        if isinstance(expr, NamelessBinder):
+            cutoffs.pop()
+        return rebuild(expr, results)
+    return leave
+
+def shift(expr: LambdaExpr, d: int, cutoff=0) -> LambdaExpr:
+    """Add d to every index >= cutoff (pointing outside of expr)"""
+    if d == 0:
+        return expr
+    cutoffs = [cutoff]
+
+    def enter(expr: LambdaExpr):
+        cutoff = cutoffs[-1]
+        if loose_indices(expr) <= cutoff:
+            return Done(expr)
+        if isinstance(expr, BoundVar):
+            return Done(BoundVar(expr.index + d))
+        elif isinstance(expr, NamelessBinder):
+            cutoffs.append(cutoff + expr.arity)
+        return expr
+
+    return rewrite(expr, enter, _leave_binder(cutoffs))
+
+def _instantiate(expr: LambdaExpr, j: int, arg: LambdaExpr, depth=0) -> LambdaExpr:
+    """
+    Replace index j (relative to depth) by arg and remove that slot:
+    indices below j are untouched, indices above j are decremented.
+    arg is placed under depth + j binder slots.
+    """
+    depths = [depth]
+
+    def enter(expr: LambdaExpr):
+        depth = depths[-1]
+        if loose_indices(expr) <= depth + j:
+            return Done(expr)
+        if isinstance(expr, BoundVar):
+            rel = expr.index - depth
+            if rel == j:
+                return Done(shift(arg, depth + j))
+            return Done(BoundVar(expr.index - 1))
+        elif isinstance(expr, NamelessBinder):
+            depths.append(depth + expr.arity)
+        return expr
+
+    return rewrite(expr, enter, _leave_binder(depths))
+
+def _contract(redex: Apply) -> LambdaExpr:
+    """(L:n.body arg1 arg2...) --> (L:n-1.body[outermost := arg1] arg2...)"""
+    functor: NamelessAbstr = redex.functor
+    if len(redex.arguments) == 0:
+        raise Exception("Expression is of type Application but with no arguments: {}".format(redex))
+    j = functor.arity - 1
+    body = _instantiate(functor.body, j, redex.arguments[0])
+    if j > 0:
+        body = NamelessAbstr(j, body, functor.hints and functor.hints[1:])
+    if len(redex.arguments) <= 1:
+        return body
+    return Apply(body, *redex.arguments[1:])
+
+def normalize(expr: LambdaExpr, max_iter=100) -> LambdaExpr:
+    """Normal order (leftmost-outermost) beta reduction of a locally nameless expression"""
+    steps = [0]
+    stuck = set() # applications whose head can never become an abstraction
+
+    def _step(redex: Apply) -> LambdaExpr:
+        steps[0] += 1
+        if steps[0] >= max_iter:
+            raise Exception(f"Maximum iterations for beta-reduction reached for expression: \
+                             {expr}. Last executed reduction: {redex}")
+        return _contract(redex)
+
+    def _head(expr: Apply) -> LambdaExpr:
+        spine = [] # arguments of the enclosing applications, innermost last
+        while True:
+            while isinstance(expr, Apply):
+                spine.append(expr.arguments)
+                expr = expr.functor
+            if not spine or not isinstance(expr, NamelessAbstr):
+                break
+            expr = _step(Apply(expr, *spine.pop()))
+        while spine:
+            expr = Apply(expr, *spine.pop())
+            stuck.add(expr)
+        return expr
+
+    def enter(expr: LambdaExpr):
+        if isinstance(expr, Apply) and expr not in stuck:
+            return _head(expr)
+        return expr
+
+    return rewrite(expr, enter)
+
+def beta_reduce_nameless(expr: LambdaExpr, max_iter=100) -> LambdaExpr:
+    """
+    Same as lambda_processor.beta_reduce, but reduces in locally nameless form:
+    no alpha-renaming during reduction; binders are named after their original names when read back.
+    """
+    return from_nameless(normalize(to_nameless(expr), max_iter))
@@ -0,0 +1,189 @@
+"""
+Parser for the printed (repr) syntax of lambda expressions, inverse of __repr__:
+    (Lxy.body)   (f a b)   AND( a, b )   lhs -> rhs   ?xy[body]   @x[body]   -(body)
+    (L:2.body)   (?:1.body)   (@:1.body)   #0          (nameless forms, hints are not printed)
+Parameters and quantified variables are written without separators, so their names are
+read as <id> or a letter / _ followed by digits, then primes (x, a1, <3>, x', ...): the names
+this package generates. Other symbols are maximal runs without whitespace, parentheses,
+brackets and commas, or are quoted "..." (with \\ and \" escapes) as repr prints the symbols
+that would not read back otherwise (lambda_ast.quote_symbol). #n is a De Bruijn index only inside
+a nameless binder, a symbol elsewhere.
+Bound symbols become Var, free ones Const (Var if listed in free_vars): a bound name shadows
+a constant of the same name, (Lx.(x x)) is read with two Var x even if one was printed from Const x.
+fresh.pretty does not give variables the names of constants, so its output reads back as printed.
+The repr does not parenthesize implications: a -> b -> c is read a -> (b -> c).
+
+The input is scanned once, left to right, with an explicit stack of open nodes (no recursion,
+no backtracking): time is linear in the length of the text and nesting depth is not limited.
+"""
+from .lambda_ast import LambdaExpr, Var, Const, Abstr, Apply, AndOpr, ImpliesOpr, Exists, ForAll, Neg, \
+    BoundVar, NamelessAbstr, NamelessExists, NamelessForAll, NAME_PATTERN
+from typing import Dict, Iterable, List
+import re
+
+_SPACE = re.compile(r"\s*")
+_NAME = NAME_PATTERN
+_NAMES = re.compile(f"(?:{_NAME})+")
+_NAME_SPLIT = re.compile(_NAME)
+_ARITY = re.compile(r"(\d+)\.")
+_INDEX = re.compile(r"#(\d+)")
+_SYMBOL = re.compile(r"[^\s()\[\],]+")
+_QUOTED = re.compile(r'"((?:[^"\\]|\\.)*)"')
+_ESCAPE = re.compile(r"\\(.)")
+
+# open nodes
+_ROOT, _APPLY, _ABSTR, _AND, _IMPLIES, _EXISTS, _FORALL, _NEG, _NAMELESS = range(9)
+_NAMELESS_BINDERS = {"L": NamelessAbstr, "?": NamelessExists, "@": NamelessForAll}
+
+class _Frame:
+    __slots__ = ("kind", "items", "vars", "commas")
+    def __init__(self, kind: int, vars=()) -> None:
+        self.kind = kind
+        self.items: List[LambdaExpr] = []
+        self.vars = vars # parameters, quantified variables, (binder class, arity) of nameless binders
+        self.commas = 0
+
+def parse(text: str, free_vars: Iterable[str] = ()) -> LambdaExpr:
+    """Expression printed as text (repr); symbols in free_vars are Var even when free"""
+    free_vars = set(free_vars)
+    bound: Dict[str, int] = {} # symbol -> number of enclosing binders of that name
+    stack = [_Frame(_ROOT)]
+    nameless = [0] # number of open nameless binders
+    pos, end = 0, len(text)
+
+    def error(msg: str):
+        return Exception(f"{msg} at offset {pos} of {text[max(0, pos - 20):pos + 20]!r}")
+
+    def settle():
+        """Close implications whose right-hand side is complete"""
+        while stack[-1].kind == _IMPLIES and len(stack[-1].items) == 2:
+            lhs, rhs = stack.pop().items
+            stack[-1].items.append(ImpliesOpr(lhs, rhs))
+
+    def bind(names: List[str]) -> List[Var]:
+        for n in names:
+            bound[n] = bound.get(n, 0) + 1
+        return [Var(n) for n in names]
+
+    def unbind(vars: List[Var]) -> None:
+        for v in vars:
+            bound[v.symbol] -= 1
+
+    def binder_names(start: int, close: str):
+        """Names written from start up to the close character, or None"""
+        m = _NAMES.match(text, start)
+        if m is None or m.end() >= end or text[m.end()] != close:
+            return None, start
+        return _NAME_SPLIT.findall(m.group()), m.end() + 1
+
+    def close(frame: _Frame) -> LambdaExpr:
+        kind, items = frame.kind, frame.items
+        if kind == _APPLY:
+            if not items:
+                raise error("Empty application")
+            return Apply(items[0], *items[1:])
+        if kind == _AND:
+            if len(items) != frame.commas + 1 or len(items) < 2:
+                raise error("Malformed AND")
+            return AndOpr(*items)
+        if len(items) != 1:
+            raise error("Expected one expression")
+        if kind == _ABSTR:
+            unbind(frame.vars)
+            return Abstr(frame.vars, items[0])
+        if kind in (_EXISTS, _FORALL):
+            unbind(frame.vars)
+            return (Exists if kind == _EXISTS else ForAll)(frame.vars, items[0])
+        if kind == _NEG:
+            return Neg(items[0])
+        cls, arity = frame.vars
+        nameless[0] -= 1
+        return cls(arity, items[0])
+
+    while True:
+        pos = _SPACE.match(text, pos).end()
+        if pos >= end:
+            break
+        c = text[pos]
+        if c == "-" and text.startswith("->", pos):
+            top = stack[-1]
+            if not top.items or top.kind == _AND and len(top.items) == top.commas:
+                raise error("Implication without left-hand side")
+            frame = _Frame(_IMPLIES)
+            frame.items.append(top.items.pop())
+            stack.append(frame)
+            pos += 2
+            continue
+        settle()
+        top = stack[-1]
+        if c in ")]":
+            if top.kind in (_ROOT, _IMPLIES) or (c == "]") != (top.kind in (_EXISTS, _FORALL)):
+                raise error(f"Unexpected '{c}'")
+            stack.pop()
+            stack[-1].items.append(close(top))
+            pos += 1
+            continue
+        if c == ",":
+            if top.kind != _AND or len(top.items) != top.commas + 1:
+                raise error("Unexpected ','")
+            top.commas += 1
+            pos += 1
+            continue
+        if c == "(":
+            binder = _NAMELESS_BINDERS.get(text[pos + 1:pos + 2])
+            if binder is not None and text.startswith(":", pos + 2):
+                m = _ARITY.match(text, pos + 3)
+                if m is None:
+                    raise error("Malformed nameless binder")
+                stack.append(_Frame(_NAMELESS, (binder, int(m.group(1)))))
+                nameless[0] += 1
+                pos = m.end()
+                continue
+            if binder is NamelessAbstr:
+                names, after = binder_names(pos + 2, ".")
+                if names is not None:
+                    stack.append(_Frame(_ABSTR, bind(names)))
+                    pos = after
+                    continue
+            stack.append(_Frame(_APPLY))
+            pos += 1
+            continue
+        if c in "?@":
+            names, after = binder_names(pos + 1, "[")
+            if names is not None:
+                stack.append(_Frame(_EXISTS if c == "?" else _FORALL, bind(names)))
+                pos = after
+                continue
+        elif c == "-" and text.startswith("(", pos + 1):
+            stack.append(_Frame(_NEG))
+            pos += 2
+            continue
+        elif c == "A" and text.startswith("AND(", pos):
+            stack.append(_Frame(_AND))
+            pos += 4
+            continue
+        elif c == "#" and nameless[0]:
+            m = _INDEX.match(text, pos)
+            if m is not None:
+                top.items.append(BoundVar(int(m.group(1))))
+                pos = m.end()
+                continue
+        if c == '"':
+            m = _QUOTED.match(text, pos)
+            if m is None:
+                raise error("Unterminated quoted symbol")
+            symbol = _ESCAPE.sub(r"\1", m.group(1))
+        else:
+            m = _SYMBOL.match(text, pos)
+            if m is None:
+                raise error(f"Unexpected '{c}'")
+            symbol = m.group()
+        top.items.append(Var(symbol) if bound.get(symbol) or symbol in free_vars else Const(symbol))
+        pos = m.end()
+
+    settle()
+    if len(stack) != 1:
+        raise error("Unexpected end of input")
+    if len(stack[0].items) != 1:
+        raise error("Expected one expression")
+    return stack[0].items[0]
@@ -0,0 +1,118 @@
+"""
+Bounded LRU cache of normal forms, shared by alpha-equivalent redexes.
+The key is the redex in locally nameless form without name hints, so redexes that differ only
+in bound variable names (e.g. the same template instantiated in different sentences) hit the same entry.
+Normal forms are stored with positional hints and named after the caller's own parameters on every hit.
+"""
+from .lambda_ast import LambdaExpr, NamelessBinder
+from .nameless import to_nameless, from_nameless, normalize
+from .traversal import rewrite, rebuild, fold, Done
+from collections import OrderedDict, namedtuple
+from typing import Optional, Tuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+def _enter_hint_free(expr: LambdaExpr):
+    res = expr._hint_free
+    return expr if res is None else Done(res)
+
+def _leave_hint_free(expr: LambdaExpr, results: list):
+    if not results:
+        res = (expr, ())
+    elif isinstance(expr, NamelessBinder):
+        body, names = results[0]
+        res = (type(expr)(expr.arity, body, None), (expr.hints or (None,) * expr.arity) + names)
+    else:
+        res = (rebuild(expr, [r[0] for r in results]), sum((r[1] for r in results), ()))
+    return expr._cache("_hint_free", res)
+
+def hint_free(expr: LambdaExpr) -> Tuple[LambdaExpr, Tuple[Optional[str], ...]]:
+    """
+    (expr without hints, hints of its parameters in pre-order), cached on the node.
+    Alpha-equivalent expressions have the same expr without hints.
+    """
+    res = expr._hint_free
+    if res is None:
+        res = fold(expr, _leave_hint_free, _enter_hint_free)
+    return res
+
+def _positional(expr: LambdaExpr) -> LambdaExpr:
+    """expr whose hints are the positions of its parameters, numbered in pre-order"""
+    starts = []
+    count = [0]
+
+    def enter(expr: LambdaExpr):
+        if isinstance(expr, NamelessBinder):
+            starts.append(count[0])
+            count[0] += expr.arity
+        return expr
+
+    def leave(expr: LambdaExpr, results: list):
+        if not isinstance(expr, NamelessBinder):
+            return rebuild(expr, results)
+        start = starts.pop()
+        return type(expr)(expr.arity, results[0], tuple(range(start, start + expr.arity)))
+
+    return rewrite(expr, enter, leave)
+
+def _name_positions(expr: LambdaExpr, names: Tuple[Optional[str], ...]) -> LambdaExpr:
+    """Replace positional hints by names[position]"""
+    def leave(expr: LambdaExpr, results: list):
+        if not isinstance(expr, NamelessBinder):
+            return rebuild(expr, results)
+        hints = expr.hints and tuple(names[i] for i in expr.hints)
+        if hints is not None and None in hints:
+            hints = None
+        return type(expr)(expr.arity, results[0], hints)
+
+    return rewrite(expr, leave=leave)
+
+class ReductionCache:
+    """
+    Normal forms of locally nameless redexes, least recently used entries are evicted beyond maxsize.
+    hits / misses / evictions count lookups since creation (or clear).
+    max_iter is not part of the key: a normal form found once is returned for any max_iter.
+    """
+    def __init__(self, maxsize: int = 1024) -> None:
+        if maxsize <= 0:
+            raise Exception("Cache size must be positive.")
+        self.maxsize = maxsize
+        # redex without hints -> (positional normal form, names of the first redex, its named normal form)
+        self._entries: "OrderedDict[LambdaExpr, Tuple[LambdaExpr, tuple, LambdaExpr]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def normalize(self, expr: LambdaExpr, max_iter=100) -> LambdaExpr:
+        """Same as nameless.normalize"""
+        key, names = hint_free(expr)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            positional = normalize(_positional(expr), max_iter)
+            entry = (positional, names, _name_positions(positional, names))
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry[2]
+        self.hits += 1
+        self._entries.move_to_end(key)
+        positional, first_names, normal_form = entry
+        if names == first_names:
+            return normal_form
+        return _name_positions(positional, names)
+
+    def beta_reduce(self, expr: LambdaExpr, max_iter=100) -> LambdaExpr:
+        """Same as nameless.beta_reduce_nameless"""
+        return from_nameless(self.normalize(to_nameless(expr), max_iter))
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,74 @@
+"""
+Lambda expression templates, compiled once and instantiated with fresh variable names.
+Converters return the same few expressions for every node, only variable names and
+some constants (the word, the relation) differ.
+A template numbers its variables (in the order uniqueify_var_names would rename them)
+and is compiled into a builder: instantiation builds the tree directly from a tuple of variables,
+without traversing and rebuilding the template.
+"""
+from .lambda_ast import LambdaExpr, Var, Const
+from .traversal import fold, rebuild, children
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# builder(variables, constants) -> expression
+Builder = Callable[[Tuple[Var, ...], Dict[str, str]], LambdaExpr]
+
+class Template:
+    """
+    expr with its variables numbered, Const nodes whose symbol is in slots are filled at instantiation.
+    Closed subtrees (no variables, no slots) are shared by all instances.
+    """
+    __slots__ = ("expr", "slots", "var_names", "_build", "_consts")
+
+    def __init__(self, expr: LambdaExpr, slots: Iterable[str] = ()) -> None:
+        self.expr = expr
+        self.slots = frozenset(slots)
+        index: Dict[str, int] = {}
+        def var_index(symbol: str) -> int:
+            return index.setdefault(symbol, len(index))
+
+        def leave(expr: LambdaExpr, results: list) -> Optional[Builder]:
+            """builder of expr, None if expr is closed"""
+            if isinstance(expr, Var):
+                i = var_index(expr.symbol)
+                return lambda v, c: v[i]
+            if isinstance(expr, Const) and expr.symbol in self.slots:
+                name = expr.symbol
+                return lambda v, c: Const(c[name])
+            if all(b is None for b in results):
+                return None
+            kids = [(lambda v, c, k=k: k) if b is None else b for b, k in zip(results, children(expr))]
+            return lambda v, c: rebuild(expr, [b(v, c) for b in kids])
+
+        # children are visited in the same order as in uniqueify_var_names, so variables are numbered alike
+        build = fold(expr, leave)
+        self._build: Builder = build if build is not None else (lambda v, c: expr)
+        self.var_names: Tuple[str, ...] = tuple(index)
+        self._consts: Dict[str, str] = {}
+
+    def fill(self, **consts: str) -> "Template":
+        """Same template with slots filled (compiled code is shared)"""
+        unknown = set(consts) - self.slots
+        if unknown:
+            raise Exception(f"Unknown template slots {sorted(unknown)}")
+        t = object.__new__(Template)
+        t.expr, t.slots, t.var_names, t._build = self.expr, self.slots, self.var_names, self._build
+        t._consts = {**self._consts, **consts}
+        return t
+
+    def instantiate(self, names: Optional[Sequence[str]] = None) -> LambdaExpr:
+        """expr with its i-th variable named names[i] (default: the original names)"""
+        if len(self._consts) != len(self.slots):
+            raise Exception(f"Template slots {sorted(self.slots - set(self._consts))} are not filled")
+        if names is None:
+            names = self.var_names
+        elif len(names) != len(self.var_names):
+            raise Exception(f"Template has {len(self.var_names)} variables, got {len(names)} names")
+        return self._build(tuple(Var(n) for n in names), self._consts)
+
+    def uniqueify(self, id_incrementer: Iterator[str]) -> LambdaExpr:
+        """Same as uniqueify_var_names(self.instantiate(), id_incrementer)"""
+        return self.instantiate([next(id_incrementer) for _ in self.var_names])
+
+    def __repr__(self) -> str:
+        return f"Template({self.expr!r}, {self._consts})"
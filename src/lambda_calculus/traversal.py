@@ -0,0 +1,119 @@
+"""
+Iterative (explicit stack) traversal of Lambda Expressions.
+Passes over expressions are built on rewrite, so expression size is not limited by the recursion limit.
+Dependency trees have the same two traversals as Tree.walk and Tree.fold.
+"""
+from .lambda_ast import LambdaExpr, Var, Const, AndOpr, Abstr, Apply, ImpliesOpr, Exists, ForAll, Neg, \
+    BoundVar, NamelessAbstr, NamelessExists, NamelessForAll
+from .dispatch import Dispatch, invalid_expr_msg
+from typing import Callable, List, Optional, Sequence, Tuple
+
+_NO_CHILDREN = ()
+
+_LEAVES = set()
+_CHILDREN = Dispatch() # type -> children of a node
+_REBUILD = Dispatch() # type -> node of that type with new children
+
+def register_node(cls: type, 
+                  children: Optional[Callable] = None, 
+                  rebuild: Optional[Callable] = None) -> None:
+    """
+    Register an expression type for all traversals (once per type).
+    children(expr): tuple of sub-expressions, in the order they are visited. None for leaves.
+    rebuild(expr, new_children): node of type cls with new children.
+    """
+    if children is None:
+        _LEAVES.add(cls)
+        children = lambda e: _NO_CHILDREN
+    _CHILDREN.register(cls, children)
+    if rebuild is not None:
+        _REBUILD.register(cls, rebuild)
+
+register_node(Var)
+register_node(Const)
+register_node(BoundVar)
+register_node(Abstr, lambda e: (*e.parameters, e.body), lambda e, c: Abstr(c[:-1], c[-1]))
+register_node(Apply, lambda e: (e.functor, *e.arguments), lambda e, c: Apply(c[0], *c[1:]))
+register_node(AndOpr, lambda e: e.operands, lambda e, c: AndOpr(*c))
+register_node(ImpliesOpr, lambda e: (e.lhs, e.rhs), lambda e, c: ImpliesOpr(c[0], c[1]))
+register_node(Exists, lambda e: (*e.vars, e.formula), lambda e, c: Exists(c[:-1], c[-1]))
+register_node(ForAll, lambda e: (*e.vars, e.formula), lambda e, c: ForAll(c[:-1], c[-1]))
+register_node(Neg, lambda e: (e.formula,), lambda e, c: Neg(c[0]))
+for _binder in [NamelessAbstr, NamelessExists, NamelessForAll]:
+    register_node(_binder, lambda e: (e.body,), lambda e, c: type(e)(e.arity, c[0], e.hints))
+
+def children(expr: LambdaExpr) -> Tuple[LambdaExpr, ...]:
+    """Sub-expressions in left-to-right order. Binder parameters come before the body."""
+    return _CHILDREN[type(expr)](expr)
+
+def rebuild(expr: LambdaExpr, kids: Sequence[LambdaExpr]) -> LambdaExpr:
+    """Node of the same type as expr with new children. expr itself if the children are unchanged."""
+    kids = tuple(kids)
+    if kids == children(expr): # identity comparison: nodes are interned
+        return expr
+    return _REBUILD[type(expr)](expr, kids)
+
+class Done:
+    """Returned by an enter callback: use value as the result for the node, without visiting its children"""
+    __slots__ = ("value",)
+    def __init__(self, value) -> None:
+        self.value = value
+
+Frame = Tuple # (node, children, results of the visited children)
+
+def rewrite(expr: LambdaExpr,
+            enter: Optional[Callable] = None,
+            leave: Optional[Callable] = None,
+            frames: Optional[List[Frame]] = None):
+    """
+    Depth-first, left-to-right traversal with an explicit stack.
+    enter(node) is called top-down. It returns the node whose children are visited
+        (usually node itself, or a replacement), or Done(value) to skip the children.
+    leave(node, results) is called bottom-up with the results of the children and returns the result for node.
+        Default: rebuild node with the rewritten children.
+    frames: stack of the nodes being visited (outermost first), see plug.
+    """
+    frames = [] if frames is None else frames
+    node = expr
+    while True:
+        # descend
+        if enter is not None:
+            node = enter(node)
+        if type(node) is Done:
+            value = node.value
+        elif type(node) in _LEAVES:
+            value = node if leave is None else leave(node, _NO_CHILDREN)
+        else:
+            kids = _CHILDREN[type(node)](node)
+            if kids:
+                frames.append((node, kids, []))
+                node = kids[0]
+                continue
+            value = node if leave is None else leave(node, _NO_CHILDREN)
+        # ascend
+        while frames:
+            parent, kids, results = frames[-1]
+            results.append(value)
+            if len(results) < len(kids):
+                node = kids[len(results)]
+                break
+            frames.pop()
+            if leave is not None:
+                value = leave(parent, results)
+            elif tuple(results) == kids: # identity comparison: nodes are interned
+                value = parent
+            else:
+                value = _REBUILD[type(parent)](parent, results)
+        else:
+            return value
+
+def plug(frames: List[Frame], hole: LambdaExpr) -> LambdaExpr:
+    """Whole expression being rewritten, with hole at the current position.
+    Visited children are rewritten, the others are unchanged."""
+    for node, kids, results in reversed(frames):
+        hole = rebuild(node, [*results, hole, *kids[len(results) + 1:]])
+    return hole
+
+def fold(expr: LambdaExpr, leave: Callable, enter: Optional[Callable] = None):
+    """Bottom-up computation: leave(node, results of children)"""
+    return rewrite(expr, enter, leave)
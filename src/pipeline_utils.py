@@ -1,39 +1,137 @@
-from spacy.tokens.token import Token
+"""
+Parser outputs --> DepTree: spaCy tokens, stanza words, or parses read from CoNLL-U files.
+spaCy is only imported when a model is loaded, so that the rest of the package
+(and the CLI startup) does not pay for it.
+"""
 from .u_dep.dep_tree import DepTree
-def build_deptree_from_spacy(node: Token):
-    deptree = DepTree(node.dep_, is_word=False, is_dep=True)
-    child = DepTree(node.text,  is_word=True, is_dep=False, pos=node.pos_, ent_type=node.ent_type_)
-    deptree.add_child(child)
-    for c in node.children:
-        deptree.add_child(build_deptree_from_spacy(c))
-    return deptree
-
-from typing import List
-def build_from_stanza(tokens):
-    # tokens = words of a sentence
-    nodes: List[DepTree] = [None for i in range(len(tokens))]
+from .u_dep.array_tree import ArrayDepTree, ArrayNode
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple, TYPE_CHECKING
+from itertools import chain
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens.token import Token
+
+# (model, excluded pipes) -> loaded pipeline
+_models: Dict[Tuple[str, Tuple[str, ...]], "Language"] = {}
+
+def load_model(name: str, exclude: Iterable[str] = ()) -> "Language":
+    """
+    spaCy pipeline, loaded once per process for each (name, exclude).
+    exclude: pipes that are not loaded at all, e.g. "ner": the ontology only needs
+        the tags and the parse (token ent_types are then empty)
+    """
+    key = (name, tuple(sorted(exclude)))
+    nlp = _models.get(key)
+    if nlp is None:
+        import spacy
+        nlp = _models[key] = spacy.load(name, exclude=list(key[1]))
+    return nlp
+
+def build_deptree_from_spacy(node: "Token"):
+    # explicit stack of (token, parent deptree), children are added in token order
+    root = None
+    stack = [(node, None)]
+    while stack:
+        node, parent = stack.pop()
+        deptree = DepTree(node.dep_, is_word=False, is_dep=True)
+        child = DepTree(node.text,  is_word=True, is_dep=False, pos=node.pos_, ent_type=node.ent_type_)
+        deptree.add_child(child)
+        if parent is None:
+            root = deptree
+        else:
+            parent.add_child(deptree)
+        stack.extend((c, deptree) for c in reversed(list(node.children)))
+    return root
+
+def build_array_tree_from_spacy(node: "Token") -> ArrayNode:
+    """Same tree as build_deptree_from_spacy, array-backed (see u_dep.array_tree)"""
+    # tokens in pre-order, so that children keep the token order
+    words = []
+    stack = [(node, 0)]
+    while stack:
+        node, head = stack.pop()
+        words.append((node.text, node.dep_, node.pos_, node.ent_type_, head))
+        stack.extend((c, len(words)) for c in reversed(list(node.children)))
+    tree = ArrayDepTree.from_heads(words)
+    return tree.node(tree.root)
+
+def build_from_heads(words: Sequence[Tuple[str, str, str, int]]) -> DepTree:
+    """
+    DepTree of a sentence given as (text, deprel, pos, head) words, head: 1-based index, 0 for the root.
+    Nodes are indexed, then linked to their heads: children keep the word order.
+    """
+    nodes: List[DepTree] = []
+    for text, deprel, pos, _ in words:
+        dt = DepTree(label=deprel, is_dep=True)
+        dt.add_child(DepTree(label=text, is_word=True, pos=pos, ent_type=""))
+        nodes.append(dt)
     root = None
-    for w in tokens:
-        idx = w.id - 1
-        dt = DepTree(
-            label=w.deprel, 
-            is_dep=True
-        )
-        dt2 = DepTree(
-            label=w.text,
-            is_word=True, 
-            pos=w.upos,
-            ent_type=""
-        )
-        dt.add_child(dt2)
-        nodes[idx] = dt
-    for w in tokens:
-        head = w.head - 1
-        idx = w.id - 1
-        if head >= 0:
-            nodes[head].add_child(nodes[idx])
-        else: 
-            assert root == None
-            root = nodes[idx] 
-    assert root != None
+    for idx, (text, _, _, head) in enumerate(words):
+        if head == 0:
+            if root is not None:
+                raise Exception(f"Several roots: {root.nth_child(0).label()}, {text}")
+            root = nodes[idx]
+        elif 0 < head <= len(nodes) and head != idx + 1:
+            nodes[head - 1].add_child(nodes[idx])
+        else:
+            raise Exception(f"Invalid head {head} of {text}")
+    if root is None:
+        raise Exception("No root.")
+    if sum(1 for _ in root.walk()) != 2 * len(nodes):
+        raise Exception("Words not attached to the root (cycle of heads).")
     return root
+
+def build_from_stanza(tokens):
+    # tokens = words of a sentence
+    return build_from_heads([(w.text, w.deprel, w.upos, w.head) for w in tokens])
+
+class ConlluSentence(NamedTuple):
+    """
+    A sentence of a CoNLL-U file. doc: index of the document (# newdoc), sent: index in the document
+    words: (form, deprel, upos, head) of the syntactic words (no multiword tokens, no empty nodes)
+    """
+    doc: int
+    sent: int
+    text: str
+    words: List[Tuple[str, str, str, int]]
+
+    def tokens(self) -> List[Tuple[str, str, str, str]]:
+        """(text, dep, pos, ent_type) as for spaCy tokens"""
+        return [(form, deprel, upos, "") for form, deprel, upos, _ in self.words]
+
+    def deptree(self) -> DepTree:
+        """The root's relation is named ROOT, as in spaCy parses (priority tables use it)"""
+        return build_from_heads([(form, "ROOT" if head == 0 else deprel, upos, head)
+                                 for form, deprel, upos, head in self.words])
+
+    def array_tree(self) -> ArrayNode:
+        """Same tree as deptree, array-backed"""
+        tree = ArrayDepTree.from_heads([(form, "ROOT" if head == 0 else deprel, upos, "", head)
+                                        for form, deprel, upos, head in self.words])
+        return tree.node(tree.root)
+
+def read_conllu(lines: Iterable[str]) -> Iterator[ConlluSentence]:
+    """Sentences of CoNLL-U lines, read lazily; no model is needed"""
+    doc, sent = 0, 0
+    text, words = None, []
+    for line in chain(lines, [""]):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            if words:
+                yield ConlluSentence(doc, sent, text if text is not None else " ".join(w[0] for w in words), words)
+                sent += 1
+            text, words = None, []
+        elif line.startswith("#"):
+            key, _, value = line[1:].partition("=")
+            key = key.strip()
+            if key == "text":
+                text = value.strip()
+            elif key.startswith("newdoc") and (doc, sent) != (0, 0):
+                doc, sent = doc + 1, 0
+        else:
+            cols = line.split("\t")
+            if len(cols) != 10:
+                raise Exception(f"Expected 10 columns in CoNLL-U line: {line!r}")
+            if not cols[0].isdigit(): # multiword token range (1-2) or empty node (1.1)
+                continue
+            words.append((cols[1], cols[7], cols[3], int(cols[6])))
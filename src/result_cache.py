@@ -0,0 +1,132 @@
+"""
+Persistent cache of conversion results in an SQLite file, so that recurring texts skip
+parsing and composition. Entries are keyed by the normalized text and a fingerprint of
+the configuration (spaCy model and version, converter, priority table). The dependency tree
+and expressions of each sentence are stored in the binary format of serialization.py.
+The cache is bounded: past maxsize entries, the least recently used ones are evicted.
+Several processes can share one file (SQLite locking, write-ahead log).
+"""
+from .lambda_calculus.lambda_ast import LambdaExpr
+from .u_dep.dep_tree import DepTree
+from .lambda_calculus.reduction_cache import CacheInfo
+from .serialization import dumps, loads
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import sqlite3
+
+# (sentence text, tokens, deptree, lambda_expr, formula, error) of each sentence of a text
+Record = Tuple[str, List[Tuple[str, str, str, str]], Optional[DepTree], Optional[LambdaExpr], Optional[LambdaExpr],
+               Optional[str]]
+
+FORMAT_VERSION = 2
+_LAMBDA, _FORMULA, _DEPTREE = 1, 2, 4 # which objects of a sentence are stored
+_FLUSH_EVERY = 256 # recency updates of hits are written in batches
+
+def normalize_text(text: str) -> str:
+    """Key of a text: whitespace runs collapsed"""
+    return " ".join(text.split())
+
+def fingerprint(config: dict) -> str:
+    """Digest of a JSON-serializable configuration (and of the cache format)"""
+    data = json.dumps([FORMAT_VERSION, config], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    path: SQLite file, created if needed
+    maxsize: maximum number of cached texts
+    hits / misses / evictions are counted for this instance
+    """
+    def __init__(self, path: str, maxsize: int = 100000) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries "
+                         "(config TEXT, text TEXT, sents TEXT, exprs BLOB, used INTEGER, PRIMARY KEY (config, text))")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self._db.commit()
+        self._clock = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM entries").fetchone()[0]
+        self._touched: Dict[Tuple[str, str], int] = {}
+        self._size = len(self) # estimate, exact after evictions
+
+    def __reduce__(self):
+        # a copy (e.g. sent to a worker process) opens its own connection
+        return (ResultCache, (self.path, self.maxsize))
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, text: str, config: str) -> Optional[List[Record]]:
+        """Records of the sentences of text (normalized), None on a miss"""
+        row = self._db.execute("SELECT sents, exprs FROM entries WHERE config = ? AND text = ?",
+                               (config, text)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched[(config, text)] = self._tick()
+        if len(self._touched) >= _FLUSH_EVERY:
+            self.flush()
+        objs = iter(loads(row[1]))
+        records = []
+        for sent, tokens, error, stored in json.loads(row[0]):
+            deptree = next(objs) if stored & _DEPTREE else None
+            lambda_expr = next(objs) if stored & _LAMBDA else None
+            formula = next(objs) if stored & _FORMULA else None
+            records.append((sent, [tuple(t) for t in tokens], deptree, lambda_expr, formula, error))
+        return records
+
+    def put(self, text: str, config: str, records: List[Record]) -> None:
+        sents, objs = [], []
+        for sent, tokens, deptree, lambda_expr, formula, error in records:
+            sents.append((sent, tokens, error, (deptree is not None) * _DEPTREE |
+                          (lambda_expr is not None) * _LAMBDA | (formula is not None) * _FORMULA))
+            objs.extend(o for o in (deptree, lambda_expr, formula) if o is not None)
+        self._size += self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (config, text, json.dumps(sents, ensure_ascii=False), dumps(objs), self._tick())).rowcount
+        self.flush()
+        if self._size > self.maxsize:
+            # other processes may have added or evicted entries
+            self._size = len(self)
+            excess = self._size - self.maxsize
+            if excess > 0:
+                self._db.execute("DELETE FROM entries WHERE rowid IN "
+                                 "(SELECT rowid FROM entries ORDER BY used LIMIT ?)", (excess,))
+                self.evictions += excess
+                self._size -= excess
+            self._db.commit()
+
+    def flush(self) -> None:
+        """Write the recency of the entries hit since the last flush"""
+        if self._touched:
+            self._db.executemany("UPDATE entries SET used = ? WHERE config = ? AND text = ?",
+                                 [(used, config, text) for (config, text), used in self._touched.items()])
+            self._touched.clear()
+        self._db.commit()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self))
+
+    def clear(self) -> None:
+        self._touched.clear()
+        self._db.execute("DELETE FROM entries")
+        self._db.commit()
+        self._size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
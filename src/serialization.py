@@ -0,0 +1,247 @@
+"""
+Compact binary format for LambdaExpr and DepTree (array-backed trees are written the same way).
+
+    file    := MAGIC record*
+    record  := EXPR expr | DEPTREE node
+    expr    := head child*                  (prefix order, opcodes of lambda_calculus.compact)
+    head    := byte(opcode | min(operand, 15) << 4) [varint(operand - 15)] [hints]
+    node    := flags label pos ent_type n_children [expr] node*   (pre-order)
+    symbol  := varint(id << 1) | varint(len << 1 | 1) utf-8 bytes
+
+Integers are unsigned LEB128 varints. The operand of a Var / Const is its symbol, 
+so most nodes take a single byte. Symbols (names, constants, labels) are interned:
+the first occurrence defines the next id and later occurrences only write the id,
+so the table is built while writing and reading and the stream never needs to be buffered.
+A nameless binder's operand is its arity, followed by a byte (hints or not) and the hints.
+Reading is done over a memoryview (e.g. of an mmap), only symbols are copied out.
+"""
+from .lambda_calculus.lambda_ast import LambdaExpr
+from .lambda_calculus.compact import VAR, CONST, ABSTR, APPLY, AND, IMPLIES, EXISTS, FORALL, NEG, \
+    NAMELESS_ABSTR, NAMELESS_EXISTS, NAMELESS_FORALL, encode_node, build_node
+from .lambda_calculus.traversal import children
+from .u_dep.dep_tree import DepTree, Ontology
+from .u_dep.array_tree import ArrayNode
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Union
+import io
+import mmap
+
+MAGIC = b"T2LB\x01"
+EXPR, DEPTREE = 1, 2
+
+_SYMBOL_OPS = (VAR, CONST)
+_NAMELESS_OPS = (NAMELESS_ABSTR, NAMELESS_EXISTS, NAMELESS_FORALL)
+_WORD, _HAS_EXPR = 1, 2 # DepTree node flags, bits 2.. hold the ontology (0: not assigned)
+
+def _num_children(op: int, operand) -> int:
+    if op in (ABSTR, EXISTS, FORALL, APPLY):
+        return operand + 1
+    if op == AND:
+        return operand
+    if op == IMPLIES:
+        return 2
+    if op == NEG or op in _NAMELESS_OPS:
+        return 1
+    return 0
+
+class BinaryWriter:
+    """Writes records to a binary file object, starting with MAGIC"""
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._symbols: Dict[str, int] = {}
+        f.write(MAGIC)
+
+    def write(self, obj: Union[LambdaExpr, DepTree, ArrayNode]) -> None:
+        out = bytearray()
+        if isinstance(obj, LambdaExpr):
+            out.append(EXPR)
+            self._expr(out, obj)
+        elif isinstance(obj, (DepTree, ArrayNode)):
+            out.append(DEPTREE)
+            self._deptree(out, obj)
+        else:
+            raise Exception(f"Cannot serialize {type(obj)}")
+        self._f.write(out)
+
+    def _uint(self, out: bytearray, n: int) -> None:
+        while n >= 0x80:
+            out.append((n & 0x7f) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def _symbol_code(self, out: bytearray, s: str) -> int:
+        """Symbol reference; the utf-8 bytes of a new symbol are appended to out (written after the reference)"""
+        i = self._symbols.get(s)
+        if i is not None:
+            return i << 1
+        self._symbols[s] = len(self._symbols)
+        data = s.encode("utf-8")
+        out += data
+        return len(data) << 1 | 1
+
+    def _symbol(self, out: bytearray, s: str) -> None:
+        data = bytearray()
+        self._uint(out, self._symbol_code(data, s))
+        out += data
+
+    def _expr(self, out: bytearray, expr: LambdaExpr) -> None:
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            op, operand = encode_node(node)
+            data = None
+            hints = None
+            if op in _SYMBOL_OPS:
+                data = bytearray()
+                operand = self._symbol_code(data, operand)
+            elif op in _NAMELESS_OPS:
+                operand, hints = operand
+            elif operand is None:
+                operand = 0
+            if operand < 15:
+                out.append(op | operand << 4)
+            else:
+                out.append(op | 0xf0)
+                self._uint(out, operand - 15)
+            if data:
+                out += data
+            if op in _NAMELESS_OPS:
+                out.append(hints is not None)
+                for h in hints or ():
+                    self._symbol(out, h)
+            stack.extend(reversed(children(node)))
+
+    def _deptree(self, out: bytearray, root: DepTree) -> None:
+        for node, _ in root.walk():
+            expr = node._lambda_expr
+            ontology = 0 if node._ontology is None else node._ontology.value + 1
+            out.append(node.is_word() * _WORD | (expr is not None) * _HAS_EXPR | ontology << 2)
+            self._symbol(out, node.label())
+            self._symbol(out, node.pos())
+            self._symbol(out, node.ent_type())
+            self._uint(out, node.num_children())
+            if expr is not None:
+                self._expr(out, expr)
+
+class BinaryReader:
+    """Iterates over the records of a buffer (bytes, memoryview, mmap) without copying it"""
+    def __init__(self, buffer) -> None:
+        self._buf = memoryview(buffer)
+        if bytes(self._buf[:len(MAGIC)]) != MAGIC:
+            raise Exception("Not a text2logic binary stream.")
+        self._pos = len(MAGIC)
+        self._symbols: List[str] = []
+
+    @staticmethod
+    def open(path: str) -> Iterator[Union[LambdaExpr, DepTree]]:
+        """Records of a file, read through mmap"""
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                reader = BinaryReader(m)
+                try:
+                    yield from reader
+                finally:
+                    reader._buf.release()
+
+    def __iter__(self) -> Iterator[Union[LambdaExpr, DepTree]]:
+        buf = self._buf
+        while self._pos < len(buf):
+            tag = buf[self._pos]
+            self._pos += 1
+            if tag == EXPR:
+                yield self._expr()
+            elif tag == DEPTREE:
+                yield self._deptree()
+            else:
+                raise Exception(f"Unknown record tag {tag} at offset {self._pos - 1}")
+
+    def _uint(self) -> int:
+        buf, pos = self._buf, self._pos
+        n = shift = 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            n |= (b & 0x7f) << shift
+            if b < 0x80:
+                self._pos = pos
+                return n
+            shift += 7
+
+    def _symbol(self, v: int = None) -> str:
+        """Symbol of reference v (read from the stream if None)"""
+        if v is None:
+            v = self._uint()
+        if not v & 1:
+            return self._symbols[v >> 1]
+        end = self._pos + (v >> 1)
+        s = str(self._buf[self._pos:end], "utf-8")
+        self._pos = end
+        self._symbols.append(s)
+        return s
+
+    def _expr(self) -> LambdaExpr:
+        buf = self._buf
+        frames = [] # [opcode, operand, number of children, children]
+        while True:
+            head = buf[self._pos]
+            self._pos += 1
+            op, operand = head & 0xf, head >> 4
+            if operand == 15:
+                operand += self._uint()
+            if op in _SYMBOL_OPS:
+                operand = self._symbol(operand)
+            elif op in _NAMELESS_OPS:
+                has_hints = buf[self._pos]
+                self._pos += 1
+                operand = (operand, tuple(self._symbol() for _ in range(operand)) if has_hints else None)
+            elif op in (IMPLIES, NEG):
+                operand = None
+            n = _num_children(op, operand)
+            if n:
+                frames.append((op, operand, n, []))
+                continue
+            node = build_node(op, operand, [])
+            while frames:
+                parent_op, parent_operand, n, kids = frames[-1]
+                kids.append(node)
+                if len(kids) < n:
+                    break
+                frames.pop()
+                node = build_node(parent_op, parent_operand, kids)
+            else:
+                return node
+
+    def _deptree(self) -> DepTree:
+        root = None
+        stack: List[List] = [] # [node, children still to add]
+        while True:
+            flags = self._buf[self._pos]
+            self._pos += 1
+            is_word = bool(flags & _WORD)
+            label, pos, ent_type = self._symbol(), self._symbol(), self._symbol()
+            node = DepTree(label, is_word=is_word, is_dep=not is_word, pos=pos, ent_type=ent_type)
+            num_children = self._uint()
+            if flags >> 2:
+                node._ontology = Ontology((flags >> 2) - 1)
+            if flags & _HAS_EXPR:
+                node.set_lambda_expr(self._expr())
+            if stack:
+                stack[-1][0].add_child(node)
+                stack[-1][1] -= 1
+            else:
+                root = node
+            if num_children:
+                stack.append([node, num_children])
+            while stack and stack[-1][1] == 0:
+                stack.pop()
+            if not stack:
+                return root
+
+def dumps(objs: Iterable[Union[LambdaExpr, DepTree]]) -> bytes:
+    f = io.BytesIO()
+    writer = BinaryWriter(f)
+    for obj in objs:
+        writer.write(obj)
+    return f.getvalue()
+
+def loads(data) -> List[Union[LambdaExpr, DepTree]]:
+    return list(BinaryReader(data))
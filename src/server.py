@@ -0,0 +1,166 @@
+"""
+Long-running server: the model and Transformers stay loaded between requests.
+HTTP/1.1 (keep-alive) over TCP (HOST:PORT) or a Unix socket (path), stdlib asyncio only.
+    POST /parse   {"text": ..., "quantifier": false}  -->  {"results": [ParseResult.to_json(), ...]}
+    GET  /stats   request count, errors and latency percentiles (ms)
+Conversions run in a bounded pool: one worker thread (processes=0) or a process pool,
+each worker keeping its own Text2Logic per mode; at most max_pending requests are
+submitted to the pool, the others wait.
+"""
+from .text2logic import Text2Logic
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from timeit import default_timer as timer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import json
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+_MAX_BODY = 1 << 20
+
+def percentiles(values: Iterable[float], ps: Sequence[int] = (50, 90, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles (and max) of values, 0 if there are none"""
+    values = sorted(values)
+    res = {}
+    for p in ps:
+        res[f"p{p}"] = values[max(0, -(-p * len(values) // 100) - 1)] if values else 0.0
+    res["max"] = values[-1] if values else 0.0
+    return res
+
+def _convert(workers: Dict[bool, Text2Logic], config: dict, text: str, quantifier: bool) -> List[dict]:
+    """workers: Text2Logic for each mode (quantifier or not), built on first use"""
+    t2l = workers.get(quantifier)
+    if t2l is None:
+        t2l = workers[quantifier] = Text2Logic(**config, quantifier=quantifier)
+    return [res.to_json() for res in t2l.parse(text)]
+
+# state of a worker process
+_config: dict = {}
+_workers: Dict[bool, Text2Logic] = {}
+
+def _init_worker(config: dict) -> None:
+    global _config
+    _config = config
+
+def _parse(text: str, quantifier: bool) -> List[dict]:
+    return _convert(_workers, _config, text, quantifier)
+
+class Server:
+    """
+    processes: worker processes, 0 to convert in a thread of this process
+    max_pending: requests submitted to the workers at once (default: 2 per worker)
+    window: number of recent requests the latency percentiles are computed over
+    The other arguments are given to Text2Logic.
+    """
+    def __init__(self, model: str = "en_core_web_sm", nlp=None, exclude: Iterable[str] = (),
+                 processes: int = 0, max_pending: int = None, window: int = 10000) -> None:
+        config = dict(model=model, nlp=nlp, exclude=tuple(exclude))
+        if processes:
+            self._executor: Executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(config,))
+            self._parse = _parse
+        else:
+            self._executor = ThreadPoolExecutor(1)
+            self._parse = partial(_convert, {}, config)
+        self._pending = asyncio.Semaphore(max_pending or 2 * max(processes, 1))
+        self._latencies: deque = deque(maxlen=window)
+        self.requests = self.errors = 0
+
+    async def start(self, address: str) -> asyncio.AbstractServer:
+        """Listen on HOST:PORT, or on a Unix socket if address has no ':'"""
+        if ":" in address:
+            host, port = address.rsplit(":", 1)
+            return await asyncio.start_server(self._handle, host or None, int(port))
+        return await asyncio.start_unix_server(self._handle, address)
+
+    async def serve(self, address: str) -> None:
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors,
+                "latency_ms": percentiles(t * 1000 for t in self._latencies)}
+
+    async def parse(self, text: str, quantifier: bool = False) -> List[dict]:
+        start = timer()
+        try:
+            async with self._pending:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, self._parse, text, quantifier)
+        finally:
+            self._latencies.append(timer() - start)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._respond(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                              f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/stats":
+            return (200, self.stats()) if method == "GET" else (405, {"error": "use GET"})
+        if path != "/parse":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        self.requests += 1
+        try:
+            request = json.loads(body)
+            text, quantifier = request["text"], bool(request.get("quantifier", False))
+            if not isinstance(text, str):
+                raise ValueError("text must be a string")
+        except (ValueError, KeyError, TypeError) as e:
+            self.errors += 1
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        try:
+            return 200, {"results": await self.parse(text, quantifier)}
+        except Exception as e:
+            self.errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """(method, path, headers, body) of the next request, None when the client is done"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > _MAX_BODY:
+        raise ValueError("request too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+def serve(address: str, **kwargs) -> None:
+    """Run a Server on address until interrupted"""
+    server = Server(**kwargs)
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
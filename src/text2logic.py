@@ -0,0 +1,258 @@
+"""
+Library entry point: text --> logical form, for many texts at once.
+The spaCy model is loaded once and documents are parsed in batches with nlp.pipe;
+every sentence of every document is converted. Nothing is printed.
+parse_parallel spreads the texts over a process pool; each worker loads the model once.
+With a ResultCache, texts converted before (with the same configuration) are neither parsed nor composed.
+Treebanks already parsed (CoNLL-U) are converted with iter_conllu, without any model.
+"""
+from .lambda_calculus.lambda_ast import Abstr, LambdaExpr, Apply, Var
+from .lambda_calculus.lambda_processor import flatten, beta_reduce
+from .lambda_calculus.fresh import pretty
+from .lambda_calculus.utils import TRUE
+from .lambda_calculus import compact
+from .u_dep.relation_priority import RelationPriority
+from .u_dep.dep2lambda import Dep2Lambda
+from .u_dep.transformer import Transformer
+from .u_dep.dep_tree import DepTree
+from .u_dep.postprocessor import PostProcessor
+from .pipeline_utils import build_deptree_from_spacy, build_array_tree_from_spacy, load_model, read_conllu, ConlluSentence
+from .result_cache import ResultCache, normalize_text, fingerprint
+from .dep2lambda_converter.default import default_converter
+from .dep2lambda_converter.quantificational import quant_converter
+from .dep_priority.quantificational import quant_priority
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+from collections import deque
+from itertools import islice
+import multiprocessing
+import os
+if TYPE_CHECKING:
+    import spacy
+
+class ParseResult(NamedTuple):
+    """
+    Result for one sentence.
+    doc / sent: index of the text in the batch and of the sentence in the text
+    tokens: (text, dep, pos, ent_type) of each token
+    lambda_expr: composed semantics (variables named a, b, ...), formula: final logical form
+    error: why the conversion failed (the later fields are then None)
+    Results read from a ResultCache have the deptree, but not the preprocessed and binarized trees.
+    """
+    doc: int
+    sent: int
+    text: str
+    tokens: List[Tuple[str, str, str, str]]
+    deptree: Optional[DepTree] = None
+    preprocessed: Optional[DepTree] = None
+    binarized: Optional[DepTree] = None
+    lambda_expr: Optional[LambdaExpr] = None
+    formula: Optional[LambdaExpr] = None
+    error: Optional[str] = None
+
+    def to_compact(self) -> tuple:
+        """Picklable flat form (see DepTree.to_compact, lambda_calculus.compact)"""
+        return (self.doc, self.sent, self.text, self.tokens,
+                *[None if t is None else t.to_compact() for t in (self.deptree, self.preprocessed, self.binarized)],
+                *[None if e is None else compact.to_compact(e) for e in (self.lambda_expr, self.formula)],
+                self.error)
+
+    def to_json(self) -> dict:
+        """
+        JSON-serializable record: tokens, the original deptree as a flat list of nodes in pre-order 
+        (parent: index of the parent node, -1 for the root), final formula in repr and str form
+        """
+        nodes = []
+        if self.deptree is not None:
+            index = {}
+            for node, _ in self.deptree.walk():
+                index[node] = len(nodes)
+                nodes.append({
+                    "label": node.label(), "is_word": node.is_word(), "pos": node.pos(), "ent_type": node.ent_type(),
+                    "parent": index[node.parent] if node.parent is not None and node is not self.deptree else -1,
+                })
+        return {
+            "doc": self.doc, "sent": self.sent, "text": self.text,
+            "tokens": [dict(zip(("text", "dep", "pos", "ent_type"), t)) for t in self.tokens],
+            "deptree": nodes,
+            "formula": None if self.formula is None else {"repr": repr(self.formula), "str": str(self.formula)},
+            "error": self.error,
+        }
+
+    @staticmethod
+    def from_compact(data: tuple) -> "ParseResult":
+        doc, sent, text, tokens, deptree, preprocessed, binarized, lambda_expr, formula, error = data
+        return ParseResult(doc, sent, text, tokens,
+                           *[None if t is None else DepTree.from_compact(t) for t in (deptree, preprocessed, binarized)],
+                           *[None if e is None else compact.from_compact(e) for e in (lambda_expr, formula)],
+                           error)
+
+class Text2Logic:
+    """
+    quantifier: quantificational event semantics (experimental), otherwise the default converter
+        followed by post-processing
+    nlp: an already loaded spaCy pipeline, instead of loading model
+        (no model at all if both are None: only iter_conllu can be used)
+    exclude: pipes of model that are not loaded (see pipeline_utils.load_model)
+    cache: persistent results, shared by the parse_parallel workers
+    array_trees: array-backed trees (u_dep.array_tree) instead of DepTree objects, same results
+    """
+    def __init__(self, model: str = "en_core_web_sm", quantifier: bool = False,
+                 batch_size: int = 64, nlp: "spacy.language.Language" = None, cache: ResultCache = None,
+                 exclude: Iterable[str] = (), array_trees: bool = False) -> None:
+        # arguments for the Text2Logic of each parse_parallel worker
+        self._config = dict(model=model, quantifier=quantifier, batch_size=batch_size, nlp=nlp, cache=cache,
+                            exclude=tuple(exclude), array_trees=array_trees)
+        self.nlp = nlp if nlp is not None or model is None else load_model(model, exclude)
+        self.quantifier = quantifier
+        self.batch_size = batch_size
+        self.array_trees = array_trees
+        if quantifier:
+            priority = RelationPriority(priority_dt=quant_priority)
+            self.transformer = Transformer(priority, Dep2Lambda(quant_converter))
+        else:
+            priority = RelationPriority()
+            self.transformer = Transformer(priority, Dep2Lambda(default_converter))
+        self.postprocessor = PostProcessor()
+        self.cache = cache
+        # cached results are only valid for the same model, converter and priorities
+        model_config = {}
+        if self.nlp is not None:
+            import spacy # already loaded with the pipeline
+            model_config = dict(
+                spacy=spacy.__version__, lang=self.nlp.meta.get("lang"), model=self.nlp.meta.get("name"),
+                version=self.nlp.meta.get("version"), pipeline=self.nlp.pipe_names,
+            )
+        self._cache_config = fingerprint(dict(
+            model_config, quantifier=quantifier, priority=sorted(priority.priority_dt.items()),
+        ))
+
+    def parse(self, text: str) -> List[ParseResult]:
+        """Results for the sentences of one text"""
+        return self.parse_many([text])
+
+    def parse_many(self, texts: Iterable[str]) -> List[ParseResult]:
+        """Results for every sentence of every text, in order"""
+        return list(self.iter_parse(texts))
+
+    def iter_parse(self, texts: Iterable[str]) -> Iterator[ParseResult]:
+        """parse_many, one sentence at a time"""
+        if self.cache is None:
+            for i, doc in enumerate(self.nlp.pipe(texts, batch_size=self.batch_size)):
+                yield from self._convert_doc(doc, i)
+            return
+        for start, batch in _chunks(texts, self.batch_size):
+            keys = [normalize_text(text) for text in batch]
+            cached = {}
+            for key in keys:
+                if key not in cached:
+                    cached[key] = self.cache.get(key, self._cache_config)
+            # texts missing from the cache are parsed once per batch
+            missing = {}
+            for key, text in zip(keys, batch):
+                if cached[key] is None:
+                    missing.setdefault(key, text)
+            docs = self.nlp.pipe(missing.values(), batch_size=self.batch_size) if missing else None
+            for i, key in enumerate(keys, start):
+                records = cached[key]
+                if records is None:
+                    results = list(self._convert_doc(next(docs), i))
+                    records = cached[key] = [(r.text, r.tokens, r.deptree, r.lambda_expr, r.formula, r.error)
+                                             for r in results]
+                    self.cache.put(key, self._cache_config, records)
+                    yield from results
+                    continue
+                for j, (text, tokens, deptree, lambda_expr, formula, error) in enumerate(records):
+                    yield ParseResult(i, j, text, tokens, deptree=deptree, lambda_expr=lambda_expr,
+                                      formula=formula, error=error)
+
+    def _convert_doc(self, doc: "spacy.tokens.Doc", i: int) -> Iterator[ParseResult]:
+        for j, sent in enumerate(doc.sents):
+            yield self.convert(sent.root, doc=i, sent=j, text=sent.text,
+                               tokens=[(t.text, t.dep_, t.pos_, t.ent_type_) for t in sent])
+
+    def parse_parallel(self, texts: Iterable[str], processes: int = None, chunksize: int = 64) -> Iterator[ParseResult]:
+        """
+        iter_parse with the texts spread over a process pool, results in the same order.
+        texts are sent to the workers in chunks of chunksize; at most 2 chunks per worker are
+        in flight, so texts can be a lazy iterable of any length.
+        An nlp given at construction is sent to the workers (pickled unless workers are forked),
+        each worker opens its own connection to the cache.
+        """
+        processes = processes or os.cpu_count() or 1
+        pending = deque()
+        with multiprocessing.Pool(processes, _init_worker, (self._config,)) as pool:
+            for chunk in _chunks(texts, chunksize):
+                pending.append(pool.apply_async(_parse_chunk, (chunk,)))
+                if len(pending) >= 2 * processes:
+                    yield from map(ParseResult.from_compact, pending.popleft().get())
+            while pending:
+                yield from map(ParseResult.from_compact, pending.popleft().get())
+
+    def iter_conllu(self, lines: Iterable[str]) -> Iterator[ParseResult]:
+        """Results for the sentences of CoNLL-U lines (read lazily), using their parses"""
+        for sentence in read_conllu(lines):
+            yield self.convert_conllu(sentence)
+
+    def convert_conllu(self, sentence: ConlluSentence) -> ParseResult:
+        build = sentence.array_tree if self.array_trees else sentence.deptree
+        return self._convert(build, sentence.doc, sentence.sent, sentence.text, sentence.tokens())
+
+    def convert(self, root: "spacy.tokens.Token", doc=0, sent=0, text="", tokens=None) -> ParseResult:
+        """Result for the sentence whose syntactic root is root"""
+        build = build_array_tree_from_spacy if self.array_trees else build_deptree_from_spacy
+        return self._convert(lambda: build(root), doc, sent, text, tokens)
+
+    def _convert(self, build: Callable[[], DepTree], doc: int, sent: int, text: str, tokens) -> ParseResult:
+        """Result for the sentence whose DepTree is built by build"""
+        res = ParseResult(doc, sent, text, tokens or [])
+        tf = self.transformer
+        try:
+            deptree = build()
+            DepTree.validate(deptree)
+            res = res._replace(deptree=deptree)
+            if self.quantifier:
+                preprocessed = tf.preprocess_quantifier(deptree)
+            else:
+                preprocessed = tf.preprocess(deptree)
+            DepTree.validate(preprocessed)
+            binarized = tf.binarize(preprocessed)
+            res = res._replace(preprocessed=preprocessed, binarized=binarized)
+            arena = tf.assign_lambda(binarized)
+            lambda_expr = pretty(tf.compose_semantics(binarized, arena=arena))
+            res = res._replace(lambda_expr=lambda_expr)
+            if self.quantifier:
+                formula = flatten(beta_reduce(Apply( # existential closure
+                    lambda_expr,
+                    Abstr([Var('e')], TRUE)
+                )))
+            else:
+                formula = self.postprocessor.process(lambda_expr)
+            return res._replace(formula=formula)
+        except Exception as e:
+            return res._replace(error=f"{type(e).__name__}: {e}")
+
+def _chunks(texts: Iterable[str], size: int) -> Iterator[Tuple[int, List[str]]]:
+    """(index of the first text, texts) chunks"""
+    it = iter(texts)
+    start = 0
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+# Text2Logic of a parse_parallel worker process
+_worker: Optional[Text2Logic] = None
+
+def _init_worker(config: dict) -> None:
+    global _worker
+    cache = config["cache"]
+    if cache is not None:
+        # a forked worker must not share the parent's connection
+        config = dict(config, cache=ResultCache(cache.path, cache.maxsize))
+    _worker = Text2Logic(**config)
+
+def _parse_chunk(chunk: Tuple[int, List[str]]) -> List[tuple]:
+    start, texts = chunk
+    return [res._replace(doc=res.doc + start).to_compact() for res in _worker.iter_parse(texts)]
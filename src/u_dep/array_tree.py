@@ -0,0 +1,375 @@
+"""
+Array-backed (struct-of-arrays) dependency trees.
+A tree is a set of parallel arrays indexed by node: label / pos / ent_type ids in the tree's string table,
+word flag, ontology, parent, first child and next sibling. Children are linked lists,
+so that merging a dependent into its head splices its dependents in place.
+Preprocessing runs in place on a copy of the arrays (a memcpy per array), binarization
+builds the arrays of the binary tree directly; no node objects are created.
+Nodes are accessed through ArrayNode views, with the DepTree API used by Transformer,
+Dep2Lambda, the converters and the serializers.
+"""
+from .dep_tree import DepTree, Ontology, WORD_PREFIX, DEP_PREFIX
+from .preprocesser import Merge, Rule
+from ..lambda_calculus.lambda_ast import LambdaExpr
+from ..lambda_calculus import compact
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+class _Strings:
+    """
+    Strings of a tree and of its copies (like a spaCy StringStore), freed with them.
+    The empty string is id 0
+    """
+    __slots__ = ("ids", "strings")
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self.intern("")
+
+    def intern(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+_NONE = -1
+_EMPTY = 0
+_ONTOLOGIES = list(Ontology)
+
+class ArrayDepTree:
+    """
+    Parallel arrays of the nodes of a tree; nodes unreachable from root (merged away) are ignored.
+    Copies and binarized trees share the string table of the tree they come from
+    """
+    __slots__ = ("label", "is_word", "pos", "ent_type", "ontology", "parent", "first", "next", "exprs", "root",
+                 "strings")
+    _ARRAYS = __slots__[:8]
+
+    def __init__(self, strings: _Strings = None) -> None:
+        self.strings = _Strings() if strings is None else strings
+        self.label = array("i")
+        self.is_word = array("b")
+        self.pos = array("i")
+        self.ent_type = array("i")
+        self.ontology = array("b") # Ontology value, -1 if not assigned
+        self.parent = array("i")
+        self.first = array("i") # first child
+        self.next = array("i") # next sibling
+        self.exprs: List[Optional[LambdaExpr]] = []
+        self.root = 0
+
+    def __len__(self) -> int:
+        return len(self.label)
+
+    def _add(self, label: int, is_word: int, pos: int = _EMPTY, ent_type: int = _EMPTY,
+             ontology: int = _NONE, expr: LambdaExpr = None) -> int:
+        self.label.append(label)
+        self.is_word.append(is_word)
+        self.pos.append(pos)
+        self.ent_type.append(ent_type)
+        self.ontology.append(ontology)
+        self.parent.append(_NONE)
+        self.first.append(_NONE)
+        self.next.append(_NONE)
+        self.exprs.append(expr)
+        return len(self.label) - 1
+
+    def _link(self, parent: int, children: Sequence[int]) -> None:
+        """Set the children of parent, in order"""
+        prev = _NONE
+        for c in children:
+            self.parent[c] = parent
+            if prev == _NONE:
+                self.first[parent] = c
+            else:
+                self.next[prev] = c
+            prev = c
+        if prev != _NONE:
+            self.next[prev] = _NONE
+
+    def children(self, i: int) -> List[int]:
+        kids = []
+        c = self.first[i]
+        while c != _NONE:
+            kids.append(c)
+            c = self.next[c]
+        return kids
+
+    def postorder(self, i: int) -> List[int]:
+        """Nodes of the subtree of i, children (left to right) before their parent"""
+        order = []
+        stack = [i]
+        while stack:
+            n = stack.pop()
+            order.append(n)
+            c = self.first[n]
+            while c != _NONE:
+                stack.append(c)
+                c = self.next[c]
+        order.reverse()
+        return order
+
+    def node(self, i: int) -> "ArrayNode":
+        return ArrayNode(self, i)
+
+    def copy(self) -> "ArrayDepTree":
+        t = ArrayDepTree(self.strings)
+        for name in ArrayDepTree._ARRAYS:
+            setattr(t, name, getattr(self, name)[:])
+        t.exprs = self.exprs[:]
+        t.root = self.root
+        return t
+
+    @staticmethod
+    def from_heads(words: Sequence[Tuple[str, str, str, str, int]]) -> "ArrayDepTree":
+        """
+        Tree of a sentence given as (text, deprel, pos, ent_type, head) words, head: 1-based index,
+        0 for the root. Same shape as pipeline_utils.build_from_heads: dependency node 2i
+        with word node 2i + 1 as first child, then the dependents of word i in order.
+        """
+        t = ArrayDepTree()
+        intern = t.strings.intern
+        kids: List[List[int]] = []
+        for text, deprel, pos, ent_type, _ in words:
+            t._add(intern(deprel), 0)
+            kids.append([t._add(intern(text), 1, intern(pos), intern(ent_type))])
+        root = None
+        for idx, (text, _, _, _, head) in enumerate(words):
+            if head == 0:
+                if root is not None:
+                    raise Exception(f"Several roots: {words[root][0]}, {text}")
+                root = idx
+            elif 0 < head <= len(words) and head != idx + 1:
+                kids[head - 1].append(2 * idx)
+            else:
+                raise Exception(f"Invalid head {head} of {text}")
+        if root is None:
+            raise Exception("No root.")
+        for idx, children in enumerate(kids):
+            t._link(2 * idx, children)
+        t.root = 2 * root
+        if len(t.postorder(t.root)) != len(t):
+            raise Exception("Words not attached to the root (cycle of heads).")
+        return t
+
+    @staticmethod
+    def from_deptree(root: DepTree) -> "ArrayDepTree":
+        t = ArrayDepTree()
+        intern = t.strings.intern
+        index: Dict[int, int] = {}
+        for node, _ in root.walk():
+            index[id(node)] = t._add(intern(node.label()), int(node.is_word()), intern(node.pos()),
+                                     intern(node.ent_type()),
+                                     _NONE if node._ontology is None else node._ontology.value, node._lambda_expr)
+        for node, _ in root.walk():
+            if node.children:
+                t._link(index[id(node)], [index[id(c)] for c in node.children])
+        return t
+
+    def merge(self, dep: str, rtl: bool) -> None:
+        """
+        In place merge_rtl / merge_ltr (see preprocesser): the word of a dependent labeled dep
+        is joined to its head's word, its dependents take its place among the head's children
+        """
+        strings = self.strings
+        dep_id = strings.ids.get(dep)
+        if dep_id is None:
+            return
+        label, first, nxt, parent = self.label, self.first, self.next, self.parent
+        for h in self.postorder(self.root):
+            w = first[h]
+            if w == _NONE:
+                continue
+            prev = w
+            c = nxt[w]
+            while c != _NONE:
+                following = nxt[c]
+                if label[c] != dep_id:
+                    prev = c
+                    c = following
+                    continue
+                cw = first[c]
+                a, b = (cw, w) if rtl else (w, cw)
+                label[w] = strings.intern(strings[label[a]] + "_" + strings[label[b]])
+                d = nxt[cw]
+                nxt[prev] = following if d == _NONE else d
+                while d != _NONE:
+                    parent[d] = h
+                    prev = d
+                    d = nxt[d]
+                nxt[prev] = following
+                c = following
+
+    def rewrite(self, rules: Sequence[Rule], ontology: bool = False) -> None:
+        """In place preprocesser.rewrite: each rule over the whole tree in turn, then assign_ontology"""
+        for rule in rules:
+            if isinstance(rule, Merge):
+                self.merge(rule.dep, rule.rtl)
+            else:
+                self.enrich_determiner(rule.universals, rule.existentials)
+        if ontology:
+            self.assign_ontology()
+
+    def enrich_determiner(self, universals: Sequence[str], existentials: Sequence[str]) -> None:
+        """In place enrich_determiner (see preprocesser)"""
+        intern = self.strings.intern
+        det, univ, exis = intern("det"), intern("det:univ"), intern("det:exis")
+        for n in self.postorder(self.root):
+            if not self.is_word[n] and self.label[n] == det:
+                word = self.strings[self.label[self.first[n]]].lower()
+                if word in universals:
+                    self.label[n] = univ
+                elif word in existentials:
+                    self.label[n] = exis
+
+    def assign_ontology(self) -> None:
+        """In place assign_ontology (see preprocesser)"""
+        intern = self.strings.intern
+        cop, propn, pron, verb = intern("cop"), intern("PROPN"), intern("PRON"), intern("VERB")
+        for n in self.postorder(self.root):
+            if self.first[n] != _NONE:
+                self.ontology[n] = Ontology.NA.value
+            elif self.pos[n] == propn or self.pos[n] == pron:
+                self.ontology[n] = Ontology.INDIVIDUAL.value
+            elif self.pos[n] == verb or any(self.label[c] == cop for c in self.children(self.parent[n])):
+                self.ontology[n] = Ontology.EVENT.value
+            else:
+                self.ontology[n] = Ontology.NA.value
+
+    def binarize(self, i: int, priority: Callable[[str], int]) -> Optional["ArrayDepTree"]:
+        """
+        Transformer.binarize of the subtree of i: for each node, its children ordered by priority
+        (0 for the word, priority(label) for dependents) are chained into binary nodes.
+        None if i is a leaf.
+        """
+        b = ArrayDepTree(self.strings)
+        priorities: Dict[int, int] = {}
+        def key(c: int) -> int:
+            if self.is_word[c]:
+                return 0
+            p = priorities.get(self.label[c])
+            if p is None:
+                p = priorities[self.label[c]] = priority(self.strings[self.label[c]])
+            return p
+        binarized: Dict[int, int] = {}
+        for n in self.postorder(i):
+            kids = self.children(n)
+            acc = _NONE
+            for c in sorted(kids, key=key):
+                t = b._add(self.label[c], self.is_word[c], self.pos[c], self.ent_type[c],
+                           self.ontology[c], self.exprs[c])
+                b._link(t, [x for x in (acc, binarized.get(c, _NONE)) if x != _NONE])
+                acc = t
+            if acc != _NONE:
+                binarized[n] = acc
+        if i not in binarized:
+            return None
+        b.root = binarized[i]
+        return b
+
+class ArrayNode:
+    """View of node i of an ArrayDepTree, with the DepTree API"""
+    __slots__ = ("tree", "i")
+
+    def __init__(self, tree: ArrayDepTree, i: int) -> None:
+        self.tree = tree
+        self.i = i
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ArrayNode) and other.tree is self.tree and other.i == self.i
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.i))
+
+    def is_word(self) -> bool:
+        return bool(self.tree.is_word[self.i])
+    def is_dep(self) -> bool:
+        return not self.tree.is_word[self.i]
+    def label(self) -> str:
+        return self.tree.strings[self.tree.label[self.i]]
+    def prefixed_label(self) -> str:
+        return (WORD_PREFIX if self.is_word() else DEP_PREFIX) + self.label()
+    def pos(self) -> str:
+        return self.tree.strings[self.tree.pos[self.i]]
+    def ent_type(self) -> str:
+        return self.tree.strings[self.tree.ent_type[self.i]]
+
+    @property
+    def _ontology(self) -> Optional[Ontology]:
+        value = self.tree.ontology[self.i]
+        return None if value == _NONE else _ONTOLOGIES[value]
+    @property
+    def _lambda_expr(self) -> Optional[LambdaExpr]:
+        return self.tree.exprs[self.i]
+
+    def set_lambda_expr(self, expr: LambdaExpr) -> None:
+        self.tree.exprs[self.i] = expr
+    def lambda_expr(self) -> LambdaExpr:
+        expr = self.tree.exprs[self.i]
+        if expr is None:
+            raise Exception("Lambda expression is not set for this TreeNode.")
+        return expr
+
+    def is_event(self) -> bool:
+        if self._ontology is None:
+            raise Exception("Node's ontology has not been assigned")
+        return self._ontology == Ontology.EVENT
+    def is_individual(self) -> bool:
+        if self._ontology is None:
+            raise Exception("Node's ontology has not been assigned")
+        return self._ontology == Ontology.INDIVIDUAL
+
+    @property
+    def parent(self) -> Optional["ArrayNode"]:
+        p = self.tree.parent[self.i]
+        return None if p == _NONE or self.i == self.tree.root else ArrayNode(self.tree, p)
+    @property
+    def children(self) -> List["ArrayNode"]:
+        return [ArrayNode(self.tree, c) for c in self.tree.children(self.i)]
+    def nth_child(self, idx: int) -> "ArrayNode":
+        return ArrayNode(self.tree, self.tree.children(self.i)[idx])
+    def num_children(self) -> int:
+        return len(self.tree.children(self.i))
+    def is_leaf(self) -> bool:
+        return self.tree.first[self.i] == _NONE
+
+    def walk(self) -> Iterator[Tuple["ArrayNode", int]]:
+        """Pre-order (node, depth) pairs, as DepTree.walk"""
+        tree = self.tree
+        stack = [(self.i, 0)]
+        while stack:
+            n, depth = stack.pop()
+            yield ArrayNode(tree, n), depth
+            kids = tree.children(n)
+            stack.extend([(c, depth + 1) for c in reversed(kids)])
+
+    def fold(self, leave: Callable):
+        """Bottom-up computation leave(node, results of its children), in the order of DepTree.fold"""
+        tree = self.tree
+        results: Dict[int, object] = {}
+        for n in tree.postorder(self.i):
+            results[n] = leave(ArrayNode(tree, n), [results.pop(c) for c in tree.children(n)])
+        return results[self.i]
+
+    def __repr__(self) -> str:
+        return "\n".join("\t" * depth + node.prefixed_label() for node, depth in self.walk())
+
+    def to_compact(self) -> tuple:
+        """Same flat form as DepTree.to_compact"""
+        tree = self.tree
+        strings = tree.strings
+        res = []
+        for node, _ in self.walk():
+            n = node.i
+            res.append((strings[tree.label[n]], bool(tree.is_word[n]), strings[tree.pos[n]],
+                        strings[tree.ent_type[n]], None if tree.ontology[n] == _NONE else tree.ontology[n],
+                        node.num_children(),
+                        None if tree.exprs[n] is None else compact.to_compact(tree.exprs[n])))
+        return tuple(res)
+
+    def to_deptree(self) -> DepTree:
+        return DepTree.from_compact(self.to_compact())
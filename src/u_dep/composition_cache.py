@@ -0,0 +1,86 @@
+"""
+Bounded LRU cache of composed subtrees, for incremental compose_semantics: re-deriving a tree
+whose parts did not change (an edited sentence, another priority table) only composes the subtrees
+on the paths from the changes to the root.
+A subtree is keyed by the converter, the data of its root (label, word or dependency, pos, entity type,
+ontology) and the entries of its children, so keys are built and compared in constant time.
+The priority table is not part of the key: it is reflected in the shape of the binarized tree.
+Composed expressions are in locally nameless form; their binders are named once, at the root.
+"""
+from ..lambda_calculus.lambda_ast import LambdaExpr, NamelessBinder
+from ..lambda_calculus.traversal import rewrite, rebuild
+from ..lambda_calculus.reduction_cache import CacheInfo
+from .dep_tree import DepTree
+from collections import OrderedDict
+from itertools import count
+from typing import Hashable, Optional, Tuple
+
+class Entry:
+    """Composed expression of a subtree; id identifies the subtree in the keys of its parents"""
+    __slots__ = ("id", "value")
+    def __init__(self, id: int, value: LambdaExpr) -> None:
+        self.id = id
+        self.value = value
+
+def node_data(node: DepTree) -> Tuple:
+    """What converters read from a node"""
+    return (node.label(), node.is_word(), node.pos(), node.ent_type(), node._ontology)
+
+def number_binders(expr: LambdaExpr) -> LambdaExpr:
+    """expr (locally nameless) whose binder hints are <1>, <2>, ... in pre-order"""
+    ids = count(1)
+    hints = [] # hints of the enclosing binders
+
+    def enter(expr: LambdaExpr):
+        if isinstance(expr, NamelessBinder):
+            hints.append(tuple(f"<{next(ids)}>" for _ in range(expr.arity)))
+        return expr
+
+    def leave(expr: LambdaExpr, results: list):
+        if not isinstance(expr, NamelessBinder):
+            return rebuild(expr, results)
+        return type(expr)(expr.arity, results[0], hints.pop())
+
+    return rewrite(expr, enter, leave)
+
+class CompositionCache:
+    """
+    Composed subtrees, least recently used entries are evicted beyond maxsize.
+    hits / misses / evictions count node lookups since creation (or clear).
+    """
+    def __init__(self, maxsize: int = 4096) -> None:
+        if maxsize <= 0:
+            raise Exception("Cache size must be positive.")
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._ids = count(1)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, value: LambdaExpr) -> Entry:
+        entry = self._entries[key] = Entry(next(self._ids), value)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        # ids are not reused: keys of evicted children never match again
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
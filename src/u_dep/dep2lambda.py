@@ -1,13 +1,33 @@
-from typing import Callable
+from typing import Callable, Iterator, Union
 from ..lambda_calculus.lambda_ast import LambdaExpr
+from ..lambda_calculus.lambda_processor import uniqueify_var_names
+from ..lambda_calculus.template import Template
 from ..u_dep.dep_tree import DepTree
 from ..dep2lambda_converter.default import default_converter
 class Dep2Lambda: 
-    def __init__(self, converter: Callable[[DepTree], LambdaExpr] = default_converter) -> None:
+    """
+    converter returns a lambda expression or a compiled Template for a node.
+    The compiled form of a converter (its _template attribute, e.g. default_converter) is used if it has one
+    """
+    def __init__(self, converter: Callable[[DepTree], Union[LambdaExpr, Template]] = default_converter) -> None:
         self.converter = converter
+        self._template = getattr(converter, "_template", None)
 
-    def get(self, node: DepTree):
-        res = self.converter(node)
-        if not isinstance(res, LambdaExpr):
+    def _convert(self, node: DepTree) -> Union[LambdaExpr, Template]:
+        res = self.converter(node) if self._template is None else self._template(node)
+        if not isinstance(res, (LambdaExpr, Template)):
             raise Exception("Unexpected errors occured in converter {}".format(self.converter.__name__))
-        return res
\ No newline at end of file
+        return res
+
+    def get(self, node: DepTree) -> LambdaExpr:
+        res = self._convert(node)
+        if isinstance(res, Template):
+            return res.instantiate()
+        return res
+
+    def get_unique(self, node: DepTree, id_incrementer: Iterator[str]) -> LambdaExpr:
+        """get with variables renamed by id_incrementer; templates are instantiated directly with the new names"""
+        res = self._convert(node)
+        if isinstance(res, Template):
+            return res.uniqueify(id_incrementer)
+        return uniqueify_var_names(res, id_incrementer)
@@ -1,4 +1,4 @@
-from ..lambda_calculus import lambda_processor
+from ..lambda_calculus import lambda_processor, compact
 from ..lambda_calculus.lambda_ast import LambdaExpr
 """
 basic tree node
@@ -10,7 +10,7 @@ label
 
 procedures: --assign lambda, build_lambda, 
 """
-from typing import List
+from typing import Callable, Iterator, List, Tuple
 
 class Tree:
     def __init__(self) -> None:
@@ -35,6 +35,31 @@ class Tree:
         return len(self.children) == 0
     def num_children(self) -> int:
         return len(self.children)
+    def walk(self) -> Iterator[Tuple["Tree", int]]:
+        """Pre-order (node, depth) pairs, with an explicit stack"""
+        stack = [(self, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            if node.children:
+                stack.extend([(c, depth + 1) for c in reversed(node.children)])
+    def fold(self, leave: Callable):
+        """Bottom-up (post-order) computation with an explicit stack: leave(node, results of its children)"""
+        frames = [(self, self.children, [])]
+        while True:
+            node, children, results = frames[-1]
+            if len(results) < len(children):
+                child = children[len(results)]
+                if child.children:
+                    frames.append((child, child.children, []))
+                else:
+                    results.append(leave(child, []))
+                continue
+            frames.pop()
+            value = leave(node, results)
+            if not frames:
+                return value
+            frames[-1][2].append(value)
     
 WORD_PREFIX = "w-"
 DEP_PREFIX = "l-"
@@ -109,27 +134,55 @@ class DepTree(Tree):
         return dt
     
     def __repr__(self) -> str:
-        s = self.prefixed_label()
-        for c in self.children:
-            ss: str = c.__repr__()
-            # split, indent each line, and rejoin
-            ss = ss.split('\n')
-            ss = "\n".join([f"\t{z}" for z in ss])
-            s += "\n" + ss
-        return s
+        # one line per node, indented by depth
+        return "\n".join("\t" * depth + node.prefixed_label() for node, depth in self.walk())
+
+    def to_compact(self) -> tuple:
+        """
+        Picklable flat form of the subtree: for each node in pre-order
+        (label, is_word, pos, ent_type, ontology, number of children, compact lambda expr or None)
+        """
+        return tuple(
+            (node._label, node._is_word, node._pos, node._ent_type, 
+             None if node._ontology is None else node._ontology.value,
+             len(node.children),
+             None if node._lambda_expr is None else compact.to_compact(node._lambda_expr))
+            for node, _ in self.walk()
+        )
+
+    @staticmethod
+    def from_compact(data: tuple) -> "DepTree":
+        """Inverse of to_compact"""
+        root = None
+        stack: List[List] = [] # [node, children still to add]
+        for label, is_word, pos, ent_type, ontology, num_children, expr in data:
+            node = DepTree(label, is_word=is_word, is_dep=not is_word, pos=pos, ent_type=ent_type)
+            if ontology is not None:
+                node._ontology = Ontology(ontology)
+            if expr is not None:
+                node.set_lambda_expr(compact.from_compact(expr))
+            if stack:
+                stack[-1][0].add_child(node)
+                stack[-1][1] -= 1
+                if stack[-1][1] == 0:
+                    stack.pop()
+            else:
+                root = node
+            if num_children:
+                stack.append([node, num_children])
+        return root
 
     @staticmethod
     def validate(root: "DepTree"):
         """ Assert the shape of the tree
         """
-        if root.is_leaf():
-            assert root.is_word() and root.pos() != ""
-            return True
-        assert root.is_dep()
-        for i, c in enumerate(root.children):
-            if i == 0: 
-                assert isinstance(c, DepTree) and c.is_leaf() and c.is_word()
-            DepTree.validate(c)
+        for node, _ in root.walk():
+            if node.is_leaf():
+                assert node.is_word() and node.pos() != ""
+                continue
+            assert node.is_dep()
+            c = node.nth_child(0)
+            assert c.is_leaf() and c.is_word()
         return True
     
     def is_event(self):
@@ -1,182 +1,286 @@
 from ..lambda_calculus.lambda_ast import LambdaExpr, Abstr, Apply, AndOpr, Const, Var, Exists
-from ..lambda_calculus.lambda_processor import flatten, used_vars
-from typing import List, Callable
-
-def _find_expr(ls: List[LambdaExpr], condition: Callable[[LambdaExpr], bool]):
-    for e in ls: 
-        if condition(e):
-            return e
-    return None
-
-def _find_expr_all(ls: List[LambdaExpr], condition: Callable[[LambdaExpr], bool]) -> List[LambdaExpr]: 
-    ret = []
-    for e in ls: 
-        if condition(e): 
-            ret.append(e)
-    return ret
-
-def _conj(ls: List[Apply]) -> List[Apply]: 
-    """Transform exactly one pair
+from ..lambda_calculus.lambda_processor import flatten
+from ..lambda_calculus.dispatch import Dispatch
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from collections import defaultdict
+from bisect import insort
+from heapq import heapify, heappop, heappush
+
+class _Conjuncts:
+    """
+    Operands of a flattened conjunction, indexed: predicate symbol -> positions,
+    first / second argument -> positions, (symbol, argument index, argument) -> positions,
+    atom -> positions (atoms are hash-consed). uses counts the occurrences of each variable.
+    Removed atoms leave None and new ones are appended, so positions keep the order of the list;
+    index lists are sorted by position.
+    """
+    def __init__(self, atoms: List[LambdaExpr]) -> None:
+        self.atoms: List[Optional[LambdaExpr]] = []
+        self.by_symbol: Dict[str, List[int]] = defaultdict(list)
+        self.by_arg = (defaultdict(list), defaultdict(list))
+        self.by_symbol_arg: Dict[Tuple[str, int, Var], List[int]] = defaultdict(list)
+        self.positions: Dict[LambdaExpr, List[int]] = defaultdict(list)
+        self.uses: Dict[Var, int] = defaultdict(int)
+        self.size = 0
+        self.rewritten = False
+        for a in atoms:
+            self._add(len(self.atoms), a)
+            self.atoms.append(a)
+
+    def _indexes(self, atom: LambdaExpr) -> List[List[int]]:
+        res = [self.positions[atom]]
+        if _is_predicate(atom):
+            symbol = atom.functor.symbol
+            res.append(self.by_symbol[symbol])
+            for i, (args, a) in enumerate(zip(self.by_arg, atom.arguments)):
+                res.append(args[a])
+                res.append(self.by_symbol_arg[(symbol, i, a)])
+        return res
+
+    def _add(self, pos: int, atom: LambdaExpr) -> None:
+        for index in self._indexes(atom):
+            insort(index, pos)
+        self._count(atom, 1)
+        self.size += 1
+
+    def _discard(self, pos: int, atom: LambdaExpr) -> None:
+        for index in self._indexes(atom):
+            index.remove(pos)
+        self._count(atom, -1)
+        self.size -= 1
+
+    def _count(self, atom: LambdaExpr, n: int) -> None:
+        if isinstance(atom, Apply):
+            for a in atom.arguments:
+                if isinstance(a, Var):
+                    self.uses[a] += n
+
+    def append(self, atom: LambdaExpr) -> int:
+        self.atoms.append(None)
+        self.replace(len(self.atoms) - 1, atom)
+        return len(self.atoms) - 1
+
+    def replace(self, pos: int, atom: LambdaExpr) -> None:
+        old = self.atoms[pos]
+        if old is not None:
+            self._discard(pos, old)
+        self.atoms[pos] = atom
+        self._add(pos, atom)
+        self.rewritten = True
+
+    def remove(self, atom: LambdaExpr) -> None:
+        """Remove every occurrence of atom"""
+        for pos in list(self.positions[atom]):
+            self._discard(pos, atom)
+            self.atoms[pos] = None
+        self.rewritten = True
+
+    def first(self, index: Sequence[int], condition: Callable[[LambdaExpr], bool] = None) -> Optional[Apply]:
+        for pos in index:
+            if condition is None or condition(self.atoms[pos]):
+                return self.atoms[pos]
+        return None
+
+    def operands(self) -> List[LambdaExpr]:
+        return [a for a in self.atoms if a is not None]
+
+def _is_predicate(e: LambdaExpr) -> bool:
+    return isinstance(e, Apply) and isinstance(e.functor, Const)
+
+def _is_arg(e: LambdaExpr) -> bool:
+    return e.functor.symbol.startswith("arg")
+
+class Rewrite(NamedTuple):
+    """
+    The matched atom and the removed ones are replaced by added: the first added atom
+    takes the position of the matched atom if in_place, else all are appended
     """
-    
-    target_old = []
-    target_transformed = []
-    for op in ls:
-        for op2 in ls:
-            op: Apply
-            op2: Apply
-            if op in target_old or op2 in target_old: 
-                assert op in target_old and op2 in target_old
-                continue
-            if isinstance(op, Apply) and isinstance(op.functor, Const) and op.functor.symbol == "conj" \
-                    and isinstance(op2, Apply) and isinstance(op2.functor, Const) and op2.functor.symbol.startswith("arg") and \
-                    op2.arguments[1] == op.arguments[0]:
-
-                target_transformed.extend([
-                    Apply(op2.functor, op2.arguments[0], op.arguments[1]),
-                    Apply(op2.functor, op2.arguments[0], op.arguments[2])
-                ])
-                postprocessed = [op for op in ls if op not in [op, op2]] + target_transformed
-                return postprocessed
-    raise Exception("No matching predicates found for \'conj or arg\'")
-
-def _preposition(ls: List[Apply]) -> List[Apply]: 
-    prep: Apply = _find_expr(ls, 
-                      lambda x: isinstance(x, Apply) and isinstance(x.functor, Const) and x.functor.symbol == "prep"
-                      )
-    pobj: Apply = _find_expr(ls, 
-                      lambda x: isinstance(x, Apply) and isinstance(x.functor, Const) and x.functor.symbol == "pobj"
-                      )
-    prep_word: Apply = _find_expr(ls,
-                        lambda x: isinstance(x, Apply) and isinstance(x.functor, Const) and x.arguments[0] == prep.arguments[1]
-                        )
-    if prep == None or pobj == None or prep_word == None: 
-        raise Exception(f"Cannot match \'prep, pboj, or prep_word\' in {expr}")
-    
-    ret = [op for op in ls if op not in [prep, pobj, prep_word]]
-    ret.append(Apply(
-        Const("prep." + prep_word.functor.symbol), 
-        prep.arguments[0], 
-        pobj.arguments[1]))
-    return ret
-
-def _args(ls: List[Apply]) -> List[Apply]:
-    # TODO: these two needs to be formalized
-    def _arg_idx(s: str):
-        if s == "arg1": 
-            return 0
-        elif s == "arg2":
-            return 1
-        elif s == "arg3":
-            return 2
-        raise Exception(f"{s} is not defined")
-    def _idx_to_arg(s: int):
-        return "arg" + str(s + 1)
-
-    root = None
-    root_idx = None
-    args = [None, None, None]
-    for i, op in enumerate(ls):
-        for op2 in ls:
-            op: Apply
-            op2: Apply
-            if isinstance(op, Apply) and isinstance(op.functor, Const) \
-                    and isinstance(op2, Apply) and isinstance(op2.functor, Const) and op2.functor.symbol.startswith("arg") and \
-                    op2.arguments[0] == op.arguments[0]:
-                if root == None: 
-                    root = op 
-                    root_idx = i
-                else: 
-                    assert root == op
-                
-                idx = _arg_idx(op2.functor.symbol)
-                if args[idx] != None: 
-                    raise Exception("Duplicate of {} in relation to {}".format(op2.functor.symbol, op))
-                args[idx] = op2            
-        if root != None: 
-            break
-    if root == None: 
-        raise Exception("No matching \'arg\' predicates found.")
-    for i in range(len(args)): 
-        for j in range(len(args)): 
-            if i < j and args[i] == None and args[j] != None:
-                raise Exception(f"Found {_idx_to_arg(j)} but not {_idx_to_arg(i)} for root {root}")
-                # TODO: allows for anonymous entities
-    
-    new_root = root
-    for n in args: 
-        if n == None:
-            break
-        args: List[Apply]
-        new_root = Apply(
-            new_root.functor, 
-            *[*new_root.arguments, n.arguments[1]]
-        )
-    postprocessed = [op for op in ls]
-    postprocessed[root_idx] = new_root
-    postprocessed = [op for op in postprocessed if op not in args]
-    return postprocessed
-    
+    removed: Sequence[Apply]
+    added: Sequence[Apply]
+    in_place: bool = False
+
+class Rule(NamedTuple):
+    """
+    Post-processing step for a dependency relation. match is tried on the atoms with predicate
+    symbol trigger (every predicate if None), first in order, until it matches none.
+    watches: (i, j) pairs, an added atom whose argument i is v makes the trigger atoms
+    whose argument j is v be tried again
+    """
+    name: str
+    trigger: Optional[str]
+    watches: Sequence[Tuple[int, int]]
+    match: Callable[[_Conjuncts, Apply], Optional[Rewrite]]
+
+def _match_conj(store: _Conjuncts, op: Apply) -> Optional[Rewrite]:
+    """conj(x, y, z) & argN(e, x) --> argN(e, y) & argN(e, z)"""
+    if len(op.arguments) != 3:
+        return None
+    arg = store.first(store.by_arg[1].get(op.arguments[0], ()), _is_arg)
+    if arg is None:
+        return None
+    return Rewrite((arg,), (
+        Apply(arg.functor, arg.arguments[0], op.arguments[1]),
+        Apply(arg.functor, arg.arguments[0], op.arguments[2]),
+    ))
+
+def _match_preposition(store: _Conjuncts, prep: Apply) -> Optional[Rewrite]:
+    """prep(x, y) & word(y, ...) & pobj(y, z) --> prep.word(x, z)"""
+    if len(prep.arguments) != 2:
+        return None
+    y = prep.arguments[1]
+    pobj = store.first(store.by_symbol_arg.get(("pobj", 0, y), ()), lambda a: len(a.arguments) == 2)
+    word = store.first(store.by_arg[0].get(y, ()), lambda a: a.functor.symbol != "pobj")
+    if pobj is None or word is None:
+        return None
+    return Rewrite((pobj, word), (Apply(Const("prep." + word.functor.symbol), prep.arguments[0], pobj.arguments[1]),))
+
+_ARG_INDEX = {"arg1": 0, "arg2": 1, "arg3": 2}
+
+def _match_args(store: _Conjuncts, root: Apply) -> Optional[Rewrite]:
+    """
+    root(e, ...) & arg1(e, x) & arg2(e, y) ... --> root(e, ..., x, y ...)
+    No match if an argN is repeated, undefined, or comes without the previous ones
+    """
+    # TODO: allows for anonymous entities
+    if _is_arg(root) or not root.arguments:
+        return None
+    args: List[Optional[Apply]] = [None] * len(_ARG_INDEX)
+    for pos in store.by_arg[0].get(root.arguments[0], ()):
+        op = store.atoms[pos]
+        if not _is_arg(op):
+            continue
+        idx = _ARG_INDEX.get(op.functor.symbol)
+        if idx is None or args[idx] is not None or len(op.arguments) != 2:
+            return None
+        args[idx] = op
+    n = args.index(None) if None in args else len(args)
+    if n == 0 or any(a is not None for a in args[n:]):
+        return None
+    args = args[:n]
+    return Rewrite(args, (Apply(root.functor, *root.arguments, *[a.arguments[1] for a in args]),), in_place=True)
+
+# in order, each runs until it matches no atom
+POSTPROCESS_RULES = (
+    Rule("conj", "conj", [(1, 0)], _match_conj),
+    Rule("preposition", "prep", [(0, 1)], _match_preposition),
+    Rule("args", None, [(0, 0)], _match_args),
+)
+
+def _triggers(store: _Conjuncts, rule: Rule) -> List[int]:
+    if rule.trigger is not None:
+        return list(store.by_symbol.get(rule.trigger, ()))
+    return [pos for pos, a in enumerate(store.atoms) if a is not None and _is_predicate(a)]
+
+def _watched(store: _Conjuncts, rule: Rule, added: LambdaExpr) -> List[int]:
+    """Positions of the trigger atoms that the added atom watches"""
+    res = []
+    if _is_predicate(added):
+        for i, j in rule.watches:
+            if i < len(added.arguments):
+                v = added.arguments[i]
+                if rule.trigger is not None:
+                    res.extend(store.by_symbol_arg.get((rule.trigger, j, v), ()))
+                else:
+                    res.extend(store.by_arg[j].get(v, ()))
+    return res
+
+def _rewrite(store: _Conjuncts, rule: Rule) -> int:
+    """
+    Apply rule until it matches no atom, return the number of rewrites.
+    The worklist holds the positions of the atoms to try, smallest first: all trigger atoms at first,
+    then the added atoms and the trigger atoms they watch.
+    Rewrites that would leave less than 2 atoms are not applied.
+    """
+    work = _triggers(store, rule)
+    heapify(work)
+    count = 0
+    while work:
+        pos = heappop(work)
+        atom = store.atoms[pos]
+        if atom is None or not _is_predicate(atom) or \
+                (rule.trigger is not None and atom.functor.symbol != rule.trigger):
+            continue
+        rewrite = rule.match(store, atom)
+        if rewrite is None:
+            continue
+        removed = {atom, *rewrite.removed}
+        if store.size - sum(len(store.positions[a]) for a in removed) + len(rewrite.added) < 2:
+            continue
+        added = list(rewrite.added)
+        positions = []
+        if rewrite.in_place and added:
+            removed.discard(atom)
+            store.replace(pos, added.pop(0))
+            positions.append(pos)
+        for a in removed:
+            store.remove(a)
+        positions.extend(store.append(a) for a in added)
+        for p in positions:
+            heappush(work, p)
+            for w in _watched(store, rule, store.atoms[p]):
+                heappush(work, w)
+        count += 1
+    return count
 
 class PostProcessor:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, rules: Sequence[Rule] = POSTPROCESS_RULES) -> None:
+        """rules: applied in order"""
+        self.rules = tuple(rules)
 
     def process(self, expr: Abstr) -> Abstr:
         expr = flatten(expr)
         self.validate(expr)
+        store = self._index(expr)
+        if store is None:
+            return expr
+        for rule in self.rules:
+            _rewrite(store, rule)
+        return self._rebuild(expr, store) if store.rewritten else expr
 
-        postproc_deps = ["conj", "preposition", "args"] # in order
-        for l in postproc_deps:
-            while True: 
-                t = None
-                try: 
-                    t = self.process_by_dep(l, expr)
-                except Exception as e: 
-                    print("Post processing for {} skipped.".format(l))
-                    print("Reason: ", e)
-                if t != None: 
-                    expr = t
-                else: 
-                    break
-        return expr
-    
-    def process_by_dep(self, dep_label: str, expr: LambdaExpr) -> Abstr: 
-        if isinstance(expr, Abstr):
-            return Abstr(expr.parameters, 
-                         self.process_by_dep(dep_label, expr.body)) 
-        elif isinstance(expr, Exists):
-            f = self.process_by_dep(dep_label, expr.formula)
-            in_use = [v for v in expr.vars if v.symbol in self._tmp_used_vars]
-            if len(in_use) == 0:
-                return f
-            return Exists(in_use, f)
-        elif isinstance(expr, AndOpr):
-            ret = AndOpr(*self._process_by_dep(dep_label, expr.operands))
-            self._tmp_used_vars = used_vars(ret)
-            return ret
-        
+    def process_by_dep(self, dep_label: str, expr: LambdaExpr) -> LambdaExpr:
+        rule = next((r for r in self.rules if r.name == dep_label), None)
+        if rule is None:
+            raise Exception("No post-processing step defined for depedency relation {}".format(dep_label))
+        store = self._index(expr)
+        if store is None:
+            raise Exception("Unexpected expression structure.")
+        _rewrite(store, rule)
+        return self._rebuild(expr, store) if store.rewritten else expr
+
+    def _index(self, expr: LambdaExpr) -> Optional[_Conjuncts]:
+        """Indexed operands of the conjunction under the lambdas and existentials, None if there is none"""
+        while isinstance(expr, (Abstr, Exists)):
+            expr = expr.body if isinstance(expr, Abstr) else expr.formula
+        return _Conjuncts(expr.operands) if isinstance(expr, AndOpr) else None
+
+    def _rebuild(self, expr: LambdaExpr, store: _Conjuncts) -> LambdaExpr:
+        return self._by_type[type(expr)](self, expr, store)
+    def _rebuild_abstr(self, expr: Abstr, store: _Conjuncts) -> Abstr:
+        return Abstr(expr.parameters,
+                     self._rebuild(expr.body, store))
+    def _rebuild_exists(self, expr: Exists, store: _Conjuncts) -> LambdaExpr:
+        f = self._rebuild(expr.formula, store)
+        in_use = [v for v in expr.vars if store.uses.get(v, 0) > 0]
+        if len(in_use) == 0:
+            return f
+        return Exists(in_use, f)
+    def _rebuild_and(self, expr: AndOpr, store: _Conjuncts) -> AndOpr:
+        return AndOpr(*store.operands())
+    def _unexpected_structure(self, expr: LambdaExpr, store: _Conjuncts):
         raise Exception("Unexpected expression structure.")
-    def _process_by_dep(self, dep_label: str, ls: List[Apply]) -> List[LambdaExpr]:
-        def case(l: str):
-            return dep_label == l
-        
-        if case("conj"): 
-            return _conj(ls)
-        elif case("preposition"):
-            return _preposition(ls)
-        elif case("args"): 
-            return _args(ls)
-        
-        raise Exception("No post-processing step defined for depedency relation {}".format(dep_label))
-    
+    _by_type = Dispatch({
+        Abstr: _rebuild_abstr,
+        Exists: _rebuild_exists,
+        AndOpr: _rebuild_and,
+    }, default=_unexpected_structure)
+
     """TODO: Ugly code
     """
-    def validate(self, expr: LambdaExpr): 
+    def validate(self, expr: LambdaExpr):
         """
         assert the shape of result expr that postprocessing steps
-        Shape of the result lambda expression: 
-            Le. ?xyz F(x) & F1(y) & ... 
+        Shape of the result lambda expression:
+            Le. ?xyz F(x) & F1(y) & ...
             a Lambda with one parameter, f-predicates are all grounded
         """
         assert isinstance(expr, Abstr)
@@ -185,14 +289,13 @@ class PostProcessor:
             return
         assert isinstance(expr.body, AndOpr) or \
             isinstance(expr.body, Exists)
-        
+
         expr = expr.body
         while isinstance(expr, Exists):
             expr = expr.formula
         assert isinstance(expr, AndOpr)
-        for b in expr.operands: 
+        for b in expr.operands:
             assert isinstance(b, Apply)
             assert isinstance(b.functor, Const)
             for arg in b.arguments:
                 assert isinstance(arg, Var)
-        
\ No newline at end of file
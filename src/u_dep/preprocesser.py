@@ -5,14 +5,15 @@ def merge_rtl(root: DepTree, dep:str) -> DepTree:
     # return root
     applicable = ["compound", "quantmod"]
     assert dep in applicable
-    if root.is_leaf():
-        return root.copy_node_data()
+    return root.fold(lambda node, merged: _merge_rtl(node, merged, dep))
+
+def _merge_rtl(root: DepTree, merged: list, dep: str) -> DepTree:
+    """merged: children of root, already merged"""
     fresh_root = root.copy_node_data()
-    for i, c in enumerate(root.children):
+    for c, x in zip(root.children, merged):
         c: DepTree
         if c.label() == dep:
             child0: DepTree = fresh_root.nth_child(0)
-            x = merge_rtl(c, dep)
             fresh_root.set_child(0, DepTree( 
                 label=x.nth_child(0).label() + "_" + child0.label(), 
                 is_word=True, 
@@ -22,7 +23,7 @@ def merge_rtl(root: DepTree, dep:str) -> DepTree:
             for j in range(1, x.num_children()):
                 fresh_root.add_child(x.nth_child(j))
         else: 
-            fresh_root.add_child(merge_rtl(c, dep))
+            fresh_root.add_child(x)
     return fresh_root
 
 def merge_ltr(root: DepTree, dep: str) -> DepTree: 
@@ -33,14 +34,15 @@ def merge_ltr(root: DepTree, dep: str) -> DepTree:
     """
     applicable = ["xcomp", "prt"]
     assert dep in applicable
-    if root.is_leaf():
-        return root.copy_node_data()
+    return root.fold(lambda node, merged: _merge_ltr(node, merged, dep))
+
+def _merge_ltr(root: DepTree, merged: list, dep: str) -> DepTree:
+    """merged: children of root, already merged"""
     fresh_root = root.copy_node_data()
-    for i, c in enumerate(root.children):
+    for c, x in zip(root.children, merged):
         c: DepTree
         if c.label() == dep:
             child0: DepTree = fresh_root.nth_child(0)
-            x = merge_ltr(c, dep)
             fresh_root.set_child(0, DepTree(
                 label=child0.label() + "_" + x.nth_child(0).label(), 
                 is_word=True,
@@ -50,14 +52,15 @@ def merge_ltr(root: DepTree, dep: str) -> DepTree:
             for j in range(1, x.num_children()):
                 fresh_root.add_child(x.nth_child(j))
         else: 
-            fresh_root.add_child(merge_ltr(c, dep))
+            fresh_root.add_child(x)
     return fresh_root
 
 universals = ["every", "all"]
 existentials = ["a", "some", "an"]
 def enrich_determiner(root: DepTree) -> DepTree:
-    if root.is_leaf():
-        return root.copy_node_data()
+    return root.fold(_enrich_determiner)
+
+def _enrich_determiner(root: DepTree, enriched: list) -> DepTree:
     r = root.copy_node_data()
     if r.is_dep() and r.label() == "det":
         c: DepTree = root.nth_child(0)
@@ -65,21 +68,156 @@ def enrich_determiner(root: DepTree) -> DepTree:
             r._label = "det:univ"
         elif c.label().lower() in existentials:
             r._label = "det:exis"
-    for c in root.children:
-        r.add_child(enrich_determiner(c))
+    for c in enriched:
+        r.add_child(c)
     return r
 
 from .dep_tree import Ontology
 def assign_ontology(root: DepTree): 
-    if root.is_leaf():
-        is_copula = next((x for x in root.parent.children if x.label() == "cop"), None)
-        if root.pos() == "PROPN" or root.pos() == "PRON":
-            root._ontology = Ontology.INDIVIDUAL
-        elif root.pos() == "VERB" or is_copula != None:
-            root._ontology = Ontology.EVENT
-        else: 
-            root._ontology = Ontology.NA
-        return 
-    root._ontology = Ontology.NA
-    for c in root.children: 
-        assign_ontology(c)
+    for node, _ in root.walk():
+        if node.is_leaf():
+            is_copula = next((x for x in node.parent.children if x.label() == "cop"), None)
+            if node.pos() == "PROPN" or node.pos() == "PRON":
+                node._ontology = Ontology.INDIVIDUAL
+            elif node.pos() == "VERB" or is_copula != None:
+                node._ontology = Ontology.EVENT
+            else: 
+                node._ontology = Ontology.NA
+        else:
+            node._ontology = Ontology.NA
+
+
+# Fused preprocessing: an ordered list of rules, applied as if each ran over the whole
+# tree in turn (merge_rtl, merge_ltr, enrich_determiner), in one traversal of one copy.
+from typing import Dict, List, NamedTuple, Sequence, Union
+
+class Merge(NamedTuple):
+    """merge_rtl (rtl) or merge_ltr of the dependents labeled dep"""
+    dep: str
+    rtl: bool
+
+class Determiners(NamedTuple):
+    """enrich_determiner: det dependents become det:univ / det:exis after their word"""
+    universals: Sequence[str] = tuple(universals)
+    existentials: Sequence[str] = tuple(existentials)
+
+Rule = Union[Merge, Determiners]
+
+PREPROCESS_RULES = (Merge("compound", True), Merge("quantmod", True), Merge("prt", False), Merge("xcomp", False))
+QUANTIFIER_RULES = (Determiners(),)
+
+def _applies(rule: Rule, node: DepTree) -> bool:
+    if isinstance(rule, Merge):
+        return node.label() == rule.dep
+    return node.label() == "det"
+
+def _relabel(rule: Determiners, node: DepTree) -> None:
+    word = node.nth_child(0).label().lower()
+    if word in rule.universals:
+        node._label = "det:univ"
+    elif word in rule.existentials:
+        node._label = "det:exis"
+
+def _annotate(node: DepTree) -> None:
+    """assign_ontology of node and of its leaf children (whose siblings are final)"""
+    children = node.children
+    if not children:
+        return
+    node._ontology = Ontology.NA
+    is_copula = None
+    for c in children:
+        if c.children:
+            continue
+        if c._pos == "PROPN" or c._pos == "PRON":
+            c._ontology = Ontology.INDIVIDUAL
+        elif c._pos == "VERB":
+            c._ontology = Ontology.EVENT
+        else:
+            if is_copula is None:
+                is_copula = any(x._label == "cop" for x in children)
+            c._ontology = Ontology.EVENT if is_copula else Ontology.NA
+
+def rewrite(root: DepTree, rules: Sequence[Rule], ontology: bool = False) -> DepTree:
+    """
+    Same tree as applying each rule to the whole tree in turn (then assign_ontology if ontology),
+    computed in a single traversal that copies each node once. A node is at stage s when rules[:s]
+    have been applied to its subtree: it is brought to stage s + 1 only when its head applies
+    rules[s] to it (the head then needs its word and dependents as of that stage), all others
+    are brought to the last stage directly, so most nodes are visited once.
+    """
+    last = len(rules)
+    stage: Dict[DepTree, int] = {} # copies -> stage, last + 1 when done; children are input nodes until visited
+
+    def visit(node: DepTree, parent: DepTree) -> DepTree:
+        copy = node.copy_node_data()
+        copy.parent = parent
+        copy.children = list(node.children)
+        stage[copy] = 0
+        return copy
+
+    # the root has no head: its own label is rewritten by the rules that are not merges
+    holder = DepTree("", is_dep=True)
+    root = visit(root, None)
+    holder.children = [None, root]
+    frames: List[list] = [[holder, last, 0, None, 0, None]] # [node, target stage, stage, children, index, new children]
+    while frames:
+        frame = frames[-1]
+        node, target, s, kids, i, new = frame
+        if kids is None:
+            if s == target:
+                frames.pop()
+                if s < last:
+                    stage[node] = s
+                    continue
+                stage[node] = last + 1 # done: children visited
+                kids = node.children
+                for i, c in enumerate(kids):
+                    if c is None:
+                        continue
+                    if c not in stage:
+                        c = kids[i] = visit(c, node)
+                    if not c.children:
+                        stage[c] = last + 1
+                    elif stage[c] <= last:
+                        frames.append([c, last, stage[c], None, 0, None])
+                if ontology and node is not holder:
+                    _annotate(node)
+                continue
+            kids = frame[3] = node.children
+            new = frame[5] = [kids[0]]
+            i = 1
+        rule = rules[s]
+        while i < len(kids):
+            c = kids[i]
+            if not _applies(rule, c) or (node is holder and isinstance(rule, Merge)):
+                new.append(c)
+                i += 1
+                continue
+            if c not in stage:
+                c = kids[i] = visit(c, node)
+            if stage[c] <= s:
+                frame[4] = i
+                frames.append([c, s + 1, stage[c], None, 0, None])
+                break
+            if isinstance(rule, Merge):
+                word, child_word = new[0], c.nth_child(0)
+                new[0] = DepTree(
+                    label=child_word.label() + "_" + word.label() if rule.rtl else word.label() + "_" + child_word.label(),
+                    is_word=True,
+                    pos=word.pos(),
+                    ent_type=word.ent_type()
+                )
+                new[0].parent = node
+                for x in c.children[1:]:
+                    if x in stage:
+                        x.parent = node
+                    new.append(x)
+            else:
+                _relabel(rule, c)
+                new.append(c)
+            i += 1
+        else:
+            node.children = new
+            frame[2:] = [s + 1, None, 0, None]
+    root.parent = None
+    return root
@@ -1,21 +1,49 @@
 from .dep_tree import DepTree
+from .array_tree import ArrayNode
 from  ..lambda_calculus.lambda_processor import beta_reduce, uniqueify_var_names
+from ..lambda_calculus.nameless import to_nameless, from_nameless, normalize
+from ..lambda_calculus.reduction_cache import ReductionCache
+from ..lambda_calculus.call_by_need import normalize_by_need
+from .composition_cache import CompositionCache, node_data, number_binders
+from ..lambda_calculus.fresh import VarArena
 from .relation_priority import RelationPriority
 from .dep2lambda import Dep2Lambda
 from ..lambda_calculus.lambda_ast import LambdaExpr, Apply
 
-from typing import Generator
-from .preprocesser import merge_ltr, merge_rtl, enrich_determiner, assign_ontology
+from typing import Iterator, Sequence
+from .preprocesser import rewrite, Rule, PREPROCESS_RULES, QUANTIFIER_RULES
 
 class Transformer: 
     """Transformer for Dependency tree
     """
     def __init__(self, 
                  relation_priority: RelationPriority,
-                 dep2lambda: Dep2Lambda
+                 dep2lambda: Dep2Lambda,
+                 nameless: bool = False,
+                 reduction_cache: ReductionCache = None,
+                 composition_cache: CompositionCache = None,
+                 lazy: bool = False,
+                 preprocess_rules: Sequence[Rule] = PREPROCESS_RULES,
+                 quantifier_rules: Sequence[Rule] = QUANTIFIER_RULES
                  ) -> None:
+        """nameless: compose semantics in locally nameless form (no alpha-renaming), 
+        named back once at the root
+        reduction_cache: reuse normal forms of alpha-equivalent redexes, implies nameless
+        composition_cache: reuse composed subtrees of previous derivations, implies nameless
+        lazy: build the application tree of the whole dep tree and normalize it once (call-by-need),
+        instead of normalizing at every node; implies nameless, not with the caches
+        preprocess_rules / quantifier_rules: rewrite rules of preprocess / preprocess_quantifier, in order"""
         self._relation_priority = relation_priority
         self._dep2lambda = dep2lambda
+        self._nameless = nameless or reduction_cache is not None or composition_cache is not None
+        self._reduction_cache = reduction_cache
+        self._composition_cache = composition_cache
+        if lazy and (reduction_cache is not None or composition_cache is not None):
+            raise Exception("Lazy composition does not use reduction or composition caches.")
+        self._lazy = lazy
+        self._nameless = self._nameless or lazy
+        self._preprocess_rules = tuple(preprocess_rules)
+        self._quantifier_rules = tuple(quantifier_rules)
 
 
     def _compare(self, node: DepTree):
@@ -33,89 +61,131 @@ class Transformer:
         Binarize a dep_tree. Require specific shape of deptree
         NOTE: still in development
         """
-        sorted_children: list[DepTree] = sorted(root.children, key=self._compare)
-        bin_tree: DepTree = None
-        for c in sorted_children: 
-            temp = c.copy_node_data()
-            l = bin_tree # left
-            r = self.binarize(c) # right
-            if l != None: 
-                temp.add_child(l)
-            if r != None:
-                temp.add_child(r)
-            bin_tree = temp
-        return bin_tree
+        if isinstance(root, ArrayNode):
+            tree = root.tree.binarize(root.i, self._relation_priority.get)
+            return None if tree is None else tree.node(tree.root)
+        def leave(node: DepTree, binarized: list) -> DepTree:
+            # (child, binarized child) pairs, ordered by the child's priority
+            pairs = sorted(zip(node.children, binarized), key=lambda p: self._compare(p[0]))
+            bin_tree: DepTree = None
+            for c, r in pairs: 
+                temp = c.copy_node_data()
+                l = bin_tree # left
+                if l != None: 
+                    temp.add_child(l)
+                if r != None: # right
+                    temp.add_child(r)
+                bin_tree = temp
+            return bin_tree
+        return root.fold(leave)
     
-    def _incrementer_generator(self) -> Generator[str, None, None]:
-        id = 0
-        while True: 
-            id += 1
-            nm = f"<{id}>"
-            yield nm
+    def _incrementer_generator(self) -> VarArena:
+        """Fresh names <1>, <2>, ... of one derivation"""
+        return VarArena()
     
-    def _assign_lambda(self, root: DepTree, incrementer: Generator[str, None,None]) -> None:
-        """Helper function for assign lambda"""
-        if root.num_children() != 0 and root.num_children() != 2:
-            raise Exception("DepTree has not been binarized.")
-        
-        expr = self._dep2lambda.get(root)
-        root.set_lambda_expr(uniqueify_var_names(expr, incrementer))
-        for c in root.children: 
-            self._assign_lambda(c, incrementer)
-    def assign_lambda(self, root: DepTree) -> None:
-        """Reassign variable names to int so that it is unique across the dep_tree"""
+    def _assign_lambda(self, root: DepTree, incrementer: Iterator[str]) -> None:
+        """Helper function for assign lambda. Nodes are numbered in pre-order"""
+        for node, _ in root.walk():
+            self._assert_binarized(node)
+            node.set_lambda_expr(self._dep2lambda.get_unique(node, incrementer))
+    def assign_lambda(self, root: DepTree) -> VarArena:
+        """Reassign variable names to int so that it is unique across the dep_tree.
+        Return the arena of the derivation, to be passed on to compose_semantics"""
         incrementer = self._incrementer_generator()
         self._assign_lambda(root, incrementer)
+        return incrementer
 
     def build_lambda_tree(self, root: DepTree) -> None: 
         """ Build lambda expression for the entire subtree
         """
-        if root.num_children() != 0 and root.num_children() != 2:
-            raise Exception("DepTree has not been binarized.")
-        if root.is_leaf():
-            return root.lambda_expr()
-        return Apply(
-            root.lambda_expr(),
-            self.build_lambda_tree(root.nth_child(0)),
-            self.build_lambda_tree(root.nth_child(1))
-        )
+        def leave(node: DepTree, results: list) -> LambdaExpr:
+            self._assert_binarized(node)
+            if node.is_leaf():
+                return node.lambda_expr()
+            return Apply(node.lambda_expr(), *results)
+        return root.fold(leave)
 
-    def compose_semantics(self, root: DepTree, show_step=False) -> LambdaExpr:
+    def compose_semantics(self, root: DepTree, show_step=False, arena: VarArena = None) -> LambdaExpr:
         """
         Compose semantics of dep tree using beta-reduction
+        arena: the one assign_lambda returned, alpha-renaming takes fresh variables from it
+        show_step and arena are ignored in nameless mode
+        With a composition cache, only the subtrees that are not cached are composed,
+        and the variables are named <1>, <2>, ... in order
         """
-        if root.num_children() != 0 and root.num_children() != 2:
+        if self._lazy:
+            return from_nameless(self._compose_lazy(root))
+        if self._composition_cache is not None:
+            return from_nameless(number_binders(self._compose_cached(root)))
+        if self._nameless:
+            return from_nameless(self._compose_nameless(root))
+        if arena is None:
+            arena = VarArena()
+        def leave(node: DepTree, results: list) -> LambdaExpr:
+            self._assert_binarized(node)
+            e = node.lambda_expr()
+            if node.is_leaf():
+                return e
+            return beta_reduce(Apply(e, *results), show_step=show_step, arena=arena)
+        return root.fold(leave)
+    
+    def _normalize(self, redex: LambdaExpr) -> LambdaExpr:
+        if self._reduction_cache is not None:
+            return self._reduction_cache.normalize(redex)
+        return normalize(redex)
+
+    def _compose_nameless(self, root: DepTree) -> LambdaExpr:
+        def leave(node: DepTree, results: list) -> LambdaExpr:
+            self._assert_binarized(node)
+            e = to_nameless(node.lambda_expr())
+            if node.is_leaf():
+                return e
+            return self._normalize(Apply(e, *results))
+        return root.fold(leave)
+
+    def _compose_lazy(self, root: DepTree) -> LambdaExpr:
+        """Normal form of the whole lambda tree; each argument is reduced at most once, when needed.
+        The iteration bound is that of per-node normalization, for every node"""
+        tree = to_nameless(self.build_lambda_tree(root))
+        return normalize_by_need(tree, max_iter=100 * sum(1 for _ in root.walk()))
+
+    def _compose_cached(self, root: DepTree) -> LambdaExpr:
+        """Bottom-up cache lookups; a node is composed only if its subtree is not cached,
+        from the entries of its children"""
+        cache = self._composition_cache
+        converter = self._dep2lambda.converter
+        def leave(node: DepTree, results: list):
+            self._assert_binarized(node)
+            key = (converter, node_data(node), *[r.id for r in results])
+            entry = cache.get(key)
+            if entry is None:
+                e = to_nameless(node.lambda_expr())
+                entry = cache.put(key, e if node.is_leaf() else self._normalize(Apply(e, *[r.value for r in results])))
+            return entry
+        return root.fold(leave).value
+    
+    def _assert_binarized(self, node: DepTree) -> None:
+        if node.num_children() != 0 and node.num_children() != 2:
             raise Exception("DepTree has not been binarized.")
-        e = root.lambda_expr()
-        if root.is_leaf():
-            return e
-        return beta_reduce(Apply(
-            e, 
-            self.compose_semantics(root.nth_child(0), show_step),
-            self.compose_semantics(root.nth_child(1), show_step)
-        ), show_step=show_step)
     
     def tree_repr_with_priority(self, root: DepTree) -> str:
-        s = f"({root.prefixed_label()}, {root.pos()}, {self._compare(root)})"
-        for c in root.children:
-            ss = self.tree_repr_with_priority(c)
-            ss = ss.split('\n')
-            ss = "\n".join([f"\t{z}" for z in ss])
-            s += "\n" + ss 
-        return s
+        return "\n".join(
+            "\t" * depth + f"({node.prefixed_label()}, {node.pos()}, {self._compare(node)})"
+            for node, depth in root.walk()
+        )
+
+    def _rewrite(self, root: DepTree, rules: Sequence[Rule], ontology: bool) -> DepTree:
+        if isinstance(root, ArrayNode):
+            tree = root.tree.copy()
+            tree.root = root.i
+            tree.rewrite(rules, ontology)
+            return tree.node(tree.root)
+        return rewrite(root, rules, ontology)
 
     def preprocess(self, root: DepTree) -> DepTree: 
         """ Preprocess dependency tree to make lambda composition easier
         """
-        rtl_order = ["compound", "quantmod"]
-        ltr_order = ["prt", "xcomp"]
-        for dep in rtl_order: 
-            root = merge_rtl(root, dep)
-        for dep in ltr_order: 
-            root = merge_ltr(root, dep)
-        return root
+        return self._rewrite(root, self._preprocess_rules, False)
     
     def preprocess_quantifier(self, root: DepTree) -> DepTree:
-        root = enrich_determiner(root)
-        assign_ontology(root)
-        return root
\ No newline at end of file
+        return self._rewrite(root, self._quantifier_rules, True)
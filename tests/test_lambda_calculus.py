@@ -1,11 +1,55 @@
 import unittest
 from src.lambda_calculus.lambda_ast import Abstr, Var, AndOpr, Const, Apply, Exists, ImpliesOpr,ForAll, Neg
-from src.lambda_calculus.lambda_processor import beta_reduce, alpha_reduce, free_vars, flatten, bound_vars
+from src.lambda_calculus.lambda_processor import beta_reduce, alpha_reduce, free_vars, flatten, bound_vars, beta_reduce_stepwise, used_vars, assert_unique_vars
+from src.lambda_calculus.nameless import to_nameless, from_nameless, alpha_equivalent, beta_reduce_nameless, normalize
+from src.lambda_calculus.lambda_ast import BoundVar, NamelessAbstr, NamelessExists
+from src.lambda_calculus.lambda_processor import uniqueify_var_names
+from src.lambda_calculus.traversal import children, rebuild, fold, register_node
+from src.lambda_calculus.dispatch import Dispatch
+from src.lambda_calculus.reduction_cache import ReductionCache
+from src.lambda_calculus.call_by_need import normalize_by_need
+from src.lambda_calculus.template import Template
+from src.lambda_calculus.fresh import VarArena, pretty, pretty_name
+from src.lambda_calculus.compact import to_compact, from_compact
+from src.lambda_calculus.parser import parse
+from src.lambda_calculus.lambda_ast import LambdaExpr
+from src.lambda_calculus.utils import TRUE
+import io
+import pickle
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from contextlib import redirect_stdout
 
 
 class TestLambdaAst(unittest.TestCase): 
     def test_AndOpr_constructor(self):
         self.assertRaises(Exception, AndOpr, Var('x'))
+    def test_interned(self):
+        e1 = Abstr([Var('x')], AndOpr(Apply(Const('P'), Var('x')), Neg(Var('x'))))
+        e2 = Abstr((Var('x'),), AndOpr(Apply(Const('P'), Var('x')), Neg(Var('x'))))
+        self.assertIs(e1, e2)
+        self.assertEqual(hash(e1), hash(e2))
+        self.assertIsNot(Var('x'), Const('x'))
+        self.assertNotEqual(Exists([Var('x')], Var('x')), ForAll([Var('x')], Var('x')))
+    def test_interned_across_threads(self):
+        barrier = Barrier(4)
+        def build():
+            barrier.wait()
+            return [Apply(Const(f"threaded{i}"), Var('x')) for i in range(2000)]
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: build(), range(4)))
+        for nodes in results[1:]:
+            self.assertTrue(all(a is b for a, b in zip(results[0], nodes)))
+    def test_immutable(self):
+        expr = Apply(Var('f'), Var('x'))
+        self.assertFalse(hasattr(expr, "__dict__"))
+        self.assertRaises(AttributeError, setattr, expr, "functor", Var('g'))
+        self.assertRaises(AttributeError, setattr, Var('x'), "symbol", 'y')
+    def test_copy(self):
+        expr = ForAll([Var('x')], ImpliesOpr(Apply(Const('P'), Var('x')), Exists([Var('y')], Var('y'))))
+        self.assertIs(deepcopy(expr), expr)
+        self.assertIs(pickle.loads(pickle.dumps(expr)), expr)
 
 class TestAlphaReduce(unittest.TestCase):
     def test_1(self):
@@ -152,6 +196,240 @@ class TestBetaReduce(unittest.TestCase):
         actual = beta_reduce(expr)
         self.assertEqual(actual, expected)
 
+class TestSinglePassBetaReduce(unittest.TestCase):
+    """beta_reduce must contract the same redexes in the same order as beta_reduce_stepwise"""
+    exprs = [
+        Apply(
+            Apply(
+                Abstr([Var('x'), Var('y')], Apply(Var('x'), Var('y'))), 
+                Abstr([Var('y')], Var('y'))
+            ), 
+            Var('w')
+        ),
+        Apply(
+            Abstr([Var('x'), Var('y'), Var('z')], Apply(Var('x'), Var('y'), Var('z'))),
+            Abstr([Var('x')], Apply(Var('x'), Var('x'))),
+            Abstr([Var('x')], Var('x')),
+            Var('x')
+        ),
+        Abstr([Var('u')], AndOpr(
+            Apply(Abstr([Var('f')], Exists([Var('y')], Apply(Var('f'), Var('y')))), Abstr([Var('x')], Apply(Const('P'), Var('x')))),
+            Neg(Apply(Abstr([Var('x')], Var('x')), Apply(Var('u'), Apply(Abstr([Var('y')], Var('y')), Const('Q')))))
+        )),
+    ]
+    def test_same_normal_form(self):
+        for expr in self.exprs:
+            self.assertEqual(beta_reduce(expr), beta_reduce_stepwise(expr))
+    def test_same_steps(self):
+        for expr in self.exprs:
+            actual, expected = io.StringIO(), io.StringIO()
+            with redirect_stdout(actual):
+                beta_reduce(expr, show_step=True)
+            with redirect_stdout(expected):
+                beta_reduce_stepwise(expr, show_step=True)
+            self.assertEqual(actual.getvalue(), expected.getvalue())
+    def test_max_iter(self):
+        expr = self.exprs[1] # 6 redexes
+        self.assertEqual(beta_reduce(expr, max_iter=7), Var('x'))
+        self.assertRaises(Exception, beta_reduce, expr, max_iter=6)
+        self.assertRaises(Exception, beta_reduce_stepwise, expr, max_iter=6)
+
+class TestNameless(unittest.TestCase):
+    def test_to_nameless(self):
+        expr = Abstr([Var('x'), Var('y')], Exists([Var('z')], Apply(Var('f'), Var('x'), Var('y'), Var('z'))))
+        expected = NamelessAbstr(2, NamelessExists(1, Apply(Var('f'), BoundVar(2), BoundVar(1), BoundVar(0))))
+        self.assertIs(to_nameless(expr, keep_names=False), expected)
+    def test_round_trip(self):
+        expr = Abstr([Var('f'), Var('g'), Var('z')], Exists([Var('x')], AndOpr(
+            Apply(Var('f'), Var('z')), Apply(Var('g'), Var('x')), Apply(Const('arg1'), Var('z'), Var('x'))
+        )))
+        self.assertIs(from_nameless(to_nameless(expr)), expr)
+        self.assertEqual(repr(from_nameless(to_nameless(expr))), repr(expr))
+    def test_alpha_equivalent(self):
+        self.assertTrue(alpha_equivalent(
+            Abstr([Var('x')], Exists([Var('y')], Apply(Var('x'), Var('y'), Var('z')))),
+            Abstr([Var('u')], Exists([Var('v')], Apply(Var('u'), Var('v'), Var('z'))))
+        ))
+        self.assertFalse(alpha_equivalent(
+            Abstr([Var('x')], Apply(Var('x'), Var('z'))),
+            Abstr([Var('z')], Apply(Var('z'), Var('z')))
+        ))
+    def test_beta_reduce(self):
+        for expr in TestSinglePassBetaReduce.exprs:
+            self.assertTrue(alpha_equivalent(beta_reduce_nameless(expr), beta_reduce(expr)))
+    def test_no_capture(self):
+        expr = Apply(Abstr([Var('x')], Abstr([Var('y'), Var('z')], Apply(Var('x'), Var('z')))), Var('z'))
+        expected = Abstr([Var('y'), Var('z1')], Apply(Var('z'), Var('z1')))
+        self.assertEqual(beta_reduce_nameless(expr), expected)
+    def test_no_capture_of_later_parameter(self):
+        x, y, z = Var('x'), Var('y'), Var('z')
+        for expr in [Apply(Abstr([z], Abstr([x, y], z)), y),
+                     Apply(Abstr([z], Exists([x, y], Apply(z, x, y))), y),
+                     Apply(Abstr([z], ForAll([x, y], Apply(z, x, y))), Apply(x, y))]:
+            self.assertTrue(alpha_equivalent(beta_reduce(expr), beta_reduce_nameless(expr)))
+        self.assertEqual(beta_reduce(Apply(Abstr([z], Abstr([x, y], z)), y)), Abstr([x, Var('<1>')], y))
+
+class TestReductionCache(unittest.TestCase):
+    def _redex(self, x: str, y: str):
+        return Apply(Abstr([Var(x)], Exists([Var(y)], Apply(Var(x), Var(y)))), Abstr([Var('z')], Apply(Const('P'), Var('z'))))
+    def test_alpha_equivalent_hit(self):
+        cache = ReductionCache()
+        first = cache.beta_reduce(self._redex('x', 'y'))
+        second = cache.beta_reduce(self._redex('u', 'v'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # named after the caller's own binders
+        self.assertEqual(first, beta_reduce_nameless(self._redex('x', 'y')))
+        self.assertEqual(second, Exists([Var('v')], Apply(Const('P'), Var('v'))))
+    def test_same_as_uncached(self):
+        cache = ReductionCache()
+        for _ in range(2):
+            for expr in TestSinglePassBetaReduce.exprs:
+                self.assertIs(cache.beta_reduce(expr), beta_reduce_nameless(expr))
+        self.assertEqual(cache.hits, len(TestSinglePassBetaReduce.exprs))
+    def test_eviction(self):
+        cache = ReductionCache(maxsize=2)
+        for c in ['P', 'Q', 'R', 'P']:
+            cache.beta_reduce(Apply(Abstr([Var('x')], Apply(Const(c), Var('x'))), Var('a')))
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.evictions, info.currsize), (0, 4, 2, 2))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+class TestCallByNeed(unittest.TestCase):
+    def test_same_as_normalize(self):
+        for expr in TestSinglePassBetaReduce.exprs:
+            self.assertIs(normalize_by_need(to_nameless(expr)), normalize(to_nameless(expr)))
+    def test_shared_argument(self):
+        # the argument is reduced once, not once per use of x
+        arg = Apply(Abstr([Var('y')], Apply(Const('P'), Var('y'))), Var('a'))
+        expr = to_nameless(Apply(Abstr([Var('x')], AndOpr(Var('x'), Var('x'), Var('x'))), arg))
+        self.assertIs(normalize_by_need(expr, max_iter=3), normalize(expr))
+        with self.assertRaises(Exception):
+            normalize_by_need(expr, max_iter=2)
+    def test_partial_application(self):
+        expr = to_nameless(Apply(Abstr([Var('x'), Var('y')], Apply(Var('y'), Var('x'))), Var('a')))
+        self.assertIs(from_nameless(normalize_by_need(expr)), Abstr([Var('y')], Apply(Var('y'), Var('a'))))
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.expr = Abstr([Var('f'), Var('z')], Exists([Var('x')], AndOpr(
+            Apply(Var('f'), Var('z')), Apply(Const('rel'), Var('z'), Var('x')), Apply(Const('P'), Var('x'))
+        )))
+        self.template = Template(self.expr, slots=['rel'])
+    def test_instantiate(self):
+        self.assertEqual(self.template.var_names, ('f', 'z', 'x'))
+        filled = self.template.fill(rel='arg1')
+        self.assertIs(filled.instantiate(), Abstr([Var('f'), Var('z')], Exists([Var('x')], AndOpr(
+            Apply(Var('f'), Var('z')), Apply(Const('arg1'), Var('z'), Var('x')), Apply(Const('P'), Var('x'))
+        ))))
+        renamed = filled.instantiate(['a', 'b', 'c'])
+        self.assertEqual(repr(renamed), "(Lab.?c[AND( (a b), (arg1 b c), (P c) )])")
+    def test_uniqueify(self):
+        def incrementer():
+            i = 0
+            while True:
+                i += 1
+                yield f"<{i}>"
+        filled = self.template.fill(rel='arg2')
+        self.assertIs(filled.uniqueify(incrementer()), uniqueify_var_names(filled.instantiate(), incrementer()))
+    def test_unfilled(self):
+        self.assertRaises(Exception, self.template.instantiate)
+        self.assertRaises(Exception, self.template.fill, word='dog')
+        self.assertRaises(Exception, self.template.fill(rel='arg1').instantiate, ['a'])
+    def test_closed(self):
+        closed = Apply(Const('P'), Const('a'))
+        self.assertIs(Template(closed).instantiate([]), closed)
+
+class TestFresh(unittest.TestCase):
+    def test_pretty_names(self):
+        self.assertEqual([pretty_name(i) for i in [0, 25, 26, 27, 52]], ['a', 'z', 'a1', 'b1', 'a2'])
+    def test_pretty_many_vars(self):
+        n = 60
+        expr = Exists([Var(f"<{i}>") for i in range(n)], AndOpr(*[Apply(Const('P'), Var(f"<{i}>")) for i in range(n)]))
+        res = pretty(expr)
+        self.assertEqual([v.symbol for v in res.vars][:3], ['a', 'b', 'c'])
+        self.assertEqual(res.vars[-1].symbol, 'h2')
+        self.assertEqual(len(bound_vars(res)), n)
+    def test_arena(self):
+        arena = VarArena()
+        expr = Abstr([Var('x')], Exists([Var('y')], Apply(Var('x'), Var('y'))))
+        self.assertEqual(uniqueify_var_names(expr, arena), Abstr([Var('<1>')], Exists([Var('<2>')], Apply(Var('<1>'), Var('<2>')))))
+        self.assertEqual(arena.fresh_id(), 3)
+        self.assertIs(arena.var(3), Var('<3>'))
+        self.assertEqual(len(arena), 3)
+        self.assertRaises(Exception, arena.var, 4)
+    def test_renaming_from_arena(self):
+        expr = Apply(Abstr([Var('y')], Abstr([Var('x')], Apply(Var('y'), Var('x'), Var('<1>')))), Var('x'))
+        self.assertEqual(beta_reduce(expr), Abstr([Var('<2>')], Apply(Var('x'), Var('<2>'), Var('<1>'))))
+        arena = VarArena()
+        arena.fresh_id()
+        self.assertEqual(beta_reduce(expr, arena=arena), Abstr([Var('<2>')], Apply(Var('x'), Var('<2>'), Var('<1>'))))
+        self.assertEqual(arena.fresh_id(), 3)
+
+class TestCompact(unittest.TestCase):
+    def test_round_trip(self):
+        for expr in TestSinglePassBetaReduce.exprs:
+            for e in [expr, to_nameless(expr), beta_reduce(expr)]:
+                data = to_compact(e)
+                self.assertIs(from_compact(pickle.loads(pickle.dumps(data))), e)
+    def test_form(self):
+        expr = Abstr([Var('x')], Apply(Const('P'), Var('x')))
+        self.assertEqual(to_compact(expr), (0, 'x', 1, 'P', 0, 'x', 4, 1, 3, 1))
+    def test_deep(self):
+        n = 5000
+        expr = Var('x')
+        for _ in range(n):
+            expr = Neg(expr)
+        data = pickle.dumps(to_compact(expr))
+        self.assertIs(from_compact(pickle.loads(data)), expr)
+
+class TestParser(unittest.TestCase):
+    def test_round_trip(self):
+        for expr in TestSinglePassBetaReduce.exprs:
+            for e in [expr, beta_reduce(expr), uniqueify_var_names(expr, VarArena())]:
+                self.assertIs(parse(repr(e), [v for v in free_vars(e)]), e)
+            nameless = to_nameless(expr)
+            self.assertEqual(repr(parse(repr(nameless))), repr(nameless))
+    def test_syntax(self):
+        expr = parse("(Lx'y.?<1>[AND( (P x' <1>), -((Q y)), @z[(R z) -> (S z y)] )])")
+        x, y, z, v = Var("x'"), Var('y'), Var('z'), Var('<1>')
+        self.assertIs(expr, Abstr([x, y], Exists([v], AndOpr(
+            Apply(Const('P'), x, v), Neg(Apply(Const('Q'), y)),
+            ForAll([z], ImpliesOpr(Apply(Const('R'), z), Apply(Const('S'), z, y)))
+        ))))
+        self.assertIs(parse("(f x)"), Apply(Const('f'), Const('x')))
+        self.assertIs(parse("(f x)", ['x']), Apply(Const('f'), Var('x')))
+        self.assertIs(parse("a -> b -> c"), ImpliesOpr(Const('a'), ImpliesOpr(Const('b'), Const('c'))))
+        self.assertIs(parse("(L:1.(?:1.(f #0 #1)))"), NamelessAbstr(1, NamelessExists(1, Apply(Const('f'), BoundVar(0), BoundVar(1)))))
+    def test_quoted_symbols(self):
+        x = Var('x')
+        for symbol in ["#1", ",", "(", "a,b", "New York", '"', 'say "hi"', "back\\slash", "->", "", "don't",
+                       "Ltd.", "Lt.", "LA.", "Lx.y", "L:1.x", "?x[", "@ab[", "?:1"]:
+            expr = Abstr([x], Apply(Const(symbol), x))
+            self.assertIs(parse(repr(expr)), expr)
+            self.assertIs(parse(repr(to_nameless(expr))), to_nameless(expr, keep_names=False))
+        self.assertEqual(repr(Const("New York")), '"New York"')
+        self.assertEqual(repr(Const("don't")), "don't")
+        # #n is an index only inside nameless binders
+        self.assertIs(parse("(f #1)"), Apply(Const('f'), Const('#1')))
+        self.assertIs(parse('(L:1.(f #0 "#0"))'), NamelessAbstr(1, Apply(Const('f'), BoundVar(0), Const('#0'))))
+        self.assertRaises(Exception, parse, '(f "x)')
+    def test_shadowing(self):
+        # a bound name shadows a constant of the same name; pretty never names a variable after a constant
+        expr = Abstr([Var('a')], Apply(Const('a'), Var('a')))
+        self.assertIs(parse(repr(expr)), Abstr([Var('a')], Apply(Var('a'), Var('a'))))
+        self.assertIs(parse(repr(pretty(expr))), Abstr([Var('b')], Apply(Const('a'), Var('b'))))
+    def test_invalid(self):
+        for text in ["", "(f x", "(f x))", "AND( a )", "AND( a, , b )", "?x[a)", "a b", "-> a", "(Lx.)"]:
+            with self.assertRaises(Exception):
+                parse(text)
+    def test_deep(self):
+        n = 5000
+        expr = Var('x')
+        for _ in range(n):
+            expr = Neg(expr)
+        self.assertIs(parse("-(" * n + "x" + ")" * n, ['x']), expr)
+
 class TestFreeBoundVars(unittest.TestCase):
     def test_free_vars(self):
         expr = Exists(
@@ -181,6 +459,20 @@ class TestFreeBoundVars(unittest.TestCase):
         self.assertTrue('x' in bound_vars(expr))
         self.assertTrue('x' not in bound_vars(expr.body))
 
+    def test_cached(self):
+        expr = Abstr([Var('x')], Exists([Var('y')], Apply(Var('f'), Var('x'), Var('y'))))
+        self.assertIs(free_vars(expr), free_vars(expr))
+        self.assertEqual(free_vars(expr), {'f'})
+        self.assertEqual(bound_vars(expr), {'x', 'y'})
+        self.assertEqual(used_vars(expr), {'f', 'x', 'y'})
+        self.assertIs(used_vars(expr.body.formula), used_vars(expr))
+
+    def test_assert_unique_vars(self):
+        siblings = AndOpr(Exists([Var('x')], Var('x')), Exists([Var('x')], Var('x')))
+        assert_unique_vars(siblings)
+        nested = Abstr([Var('x')], AndOpr(Var('y'), Exists([Var('x')], Var('x'))))
+        self.assertRaises(AssertionError, assert_unique_vars, nested)
+
 
 class TestFlatten(unittest.TestCase):
     def test_1(self):
@@ -237,8 +529,9 @@ class TestFlatten(unittest.TestCase):
             [Var('x'), Var('y')], 
             ForAll([Var('z')], Apply(Const('P'), Var('x'))),  
         ), Apply(Const("P"), Var('y')))
-        expected = ForAll([Var('z')], 
-                          Exists([Var('x'), Var('y')],
+        # the order of the quantifiers is kept
+        expected = Exists([Var('x'), Var('y')], 
+                          ForAll([Var('z')],
                                  AndOpr(Apply(Const('P'), Var('x')), Apply(Const("P"), Var('y'))) 
         ))
         actual = flatten(expr)
@@ -266,8 +559,96 @@ class TestFlatten(unittest.TestCase):
         )
         actual =  flatten(expr)
         self.assertEqual(actual, expr, msg="Should not change. B/c this has not been implemented.")
+        # premise quantifiers are flipped
+        expected = Exists([Var('x'), Var('y')], ImpliesOpr(Apply(Const("P"), Var('x')), Apply(Const("P"), Var("y"))))
+        self.assertEqual(flatten(expr, prenex=True), expected)
+
+    def test_neg_prenex(self):
+        expr = AndOpr(
+            Apply(Const("Q"), Var('u')),
+            Neg(Exists([Var('x')], AndOpr(Apply(Const("P"), Var('x')), ForAll([Var('y')], Apply(Const("R"), Var('y')))))),
+        )
+        expected = ForAll([Var('x')], Exists([Var('y')], AndOpr(
+            Apply(Const("Q"), Var('u')),
+            Neg(AndOpr(Apply(Const("P"), Var('x')), Apply(Const("R"), Var('y')))),
+        )))
+        self.assertEqual(flatten(expr), AndOpr(Apply(Const("Q"), Var('u')), Neg(Exists([Var('x')], ForAll([Var('y')],
+            AndOpr(Apply(Const("P"), Var('x')), Apply(Const("R"), Var('y'))))))))
+        self.assertEqual(flatten(expr, prenex=True), expected)
+        # nested quantifiers are merged
+        expr = Exists([Var('x')], Exists([Var('y')], Apply(Const("R"), Var('x'), Var('y'))))
+        self.assertEqual(flatten(expr), expr)
+        self.assertEqual(flatten(expr, prenex=True), Exists([Var('x'), Var('y')], Apply(Const("R"), Var('x'), Var('y'))))
+
+    def test_true(self):
+        P, Q = Apply(Const("P"), Var('x')), Apply(Const("Q"), Var('x'))
+        self.assertEqual(flatten(AndOpr(TRUE, P, AndOpr(Q, TRUE))), AndOpr(P, Q))
+        self.assertEqual(flatten(Exists([Var('x')], AndOpr(P, TRUE))), Exists([Var('x')], P))
+        self.assertIs(flatten(AndOpr(TRUE, TRUE)), TRUE)
+
+    def test_not_unique(self):
+        with self.assertRaises(AssertionError):
+            flatten(AndOpr(Exists([Var('x')], Var('x')), Exists([Var('y')], Exists([Var('y')], Var('y')))))
     
 
+class TestTraversal(unittest.TestCase):
+    def test_children_rebuild(self):
+        expr = Abstr([Var('x')], Apply(Const("P"), Var('x')))
+        self.assertEqual(children(expr), (Var('x'), Apply(Const("P"), Var('x'))))
+        self.assertIs(rebuild(expr, children(expr)), expr)
+        self.assertEqual(rebuild(expr, [Var('y'), Var('y')]), Abstr([Var('y')], Var('y')))
+
+    def test_fold(self):
+        expr = AndOpr(Var('x'), Neg(Var('y')), Exists([Var('z')], Var('z')))
+        size = fold(expr, lambda e, results: 1 + sum(results))
+        self.assertEqual(size, 7)
+
+    def test_deep(self):
+        """Passes are not limited by the recursion limit"""
+        n = 2000
+        expr = Apply(Var('f'), Var(f"x{n}"))
+        for i in range(n, 0, -1):
+            expr = Exists([Var(f"x{i}")], AndOpr(Apply(Var('f'), Var(f"x{i}")), expr))
+        expr = Abstr([Var('f')], expr)
+        self.assertEqual(free_vars(expr), frozenset())
+        self.assertEqual(len(bound_vars(expr)), n + 1)
+        assert_unique_vars(expr)
+        self.assertEqual(len(flatten(expr).body.formula.vars), n - 1)
+        self.assertEqual(from_nameless(to_nameless(expr)), expr)
+        ids = (f"v{i}" for i in range(1, n + 2))
+        self.assertEqual(bound_vars(uniqueify_var_names(expr, ids)), frozenset(f"v{i}" for i in range(1, n + 2)))
+        self.assertEqual(beta_reduce(Apply(expr, Const("P"))), beta_reduce_nameless(Apply(expr, Const("P"))))
+
+class OrOpr(LambdaExpr):
+    """Node type only known to the tests"""
+    __slots__ = _fields = ("operands",)
+    def __new__(cls, *args):
+        return cls._make(args)
+
+register_node(OrOpr, lambda e: e.operands, lambda e, c: OrOpr(*c))
+
+class TestDispatch(unittest.TestCase):
+    def test_subclass_default(self):
+        table = Dispatch({AndOpr: lambda e: "and"}, default=lambda e: "other")
+        class SubAnd(AndOpr):
+            __slots__ = ()
+        self.assertEqual(table[type(SubAnd(Var('x'), Var('y')))](None), "and")
+        self.assertEqual(table[Var](None), "other")
+        with self.assertRaises(Exception):
+            Dispatch()[Var](Var('x'))
+
+    def test_new_node_type(self):
+        """A node type registered once works with every pass"""
+        expr = Abstr([Var('x')], OrOpr(Apply(Const("P"), Var('x')), Var('y')))
+        self.assertEqual(free_vars(expr), frozenset(['y']))
+        self.assertEqual(bound_vars(expr), frozenset(['x']))
+        self.assertEqual(beta_reduce(Apply(expr, Const("c"))), OrOpr(Apply(Const("P"), Const("c")), Var('y')))
+        self.assertEqual(beta_reduce(Apply(Abstr([Var('y')], expr), Var('x'))), 
+                         Abstr([Var('<1>')], OrOpr(Apply(Const("P"), Var('<1>')), Var('x'))))
+        ids = (f"v{i}" for i in range(1, 10))
+        self.assertEqual(uniqueify_var_names(expr, ids), Abstr([Var('v1')], OrOpr(Apply(Const("P"), Var('v1')), Var('v2'))))
+        self.assertEqual(from_nameless(to_nameless(expr)), expr)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import unittest
+import os
+import tempfile
+from src.serialization import dumps, loads, BinaryReader, BinaryWriter
+from src.lambda_calculus.lambda_ast import Abstr, Var, AndOpr, Const, Apply, Exists, ForAll, ImpliesOpr, Neg, BoundVar
+from src.lambda_calculus.nameless import to_nameless
+from src.u_dep.dep_tree import DepTree, Ontology
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.expr = Abstr([Var('f'), Var('z')], Exists([Var('x')], AndOpr(
+            Apply(Var('f'), Var('z')), Apply(Const('arg1'), Var('z'), Var('x')),
+            ForAll([Var('y')], ImpliesOpr(Apply(Const('P'), Var('y')), Neg(Apply(Const('Q'), Var('x'), Var('y')))))
+        )))
+        self.tree = DepTree("ROOT", is_dep=True)
+        word = DepTree("ran", is_word=True, pos="VERB")
+        word._ontology = Ontology.EVENT
+        word.set_lambda_expr(self.expr)
+        subj = DepTree("nsubj", is_dep=True)
+        subj.add_child(DepTree("Jöhn", is_word=True, pos="PROPN", ent_type="PERSON"))
+        self.tree.add_children(word, subj)
+
+    def test_round_trip(self):
+        big = AndOpr(*[Apply(Const(f"P{i}"), Var(f"v{i}")) for i in range(300)])
+        exprs = [self.expr, to_nameless(self.expr), to_nameless(self.expr, keep_names=False), 
+                 big, Abstr([Var(f"x{i}") for i in range(40)], big), BoundVar(3000)]
+        back = loads(dumps(exprs + [self.tree]))
+        for e, b in zip(exprs, back):
+            self.assertIs(b, e)
+        tree = back[-1]
+        self.assertEqual(tree.to_compact(), self.tree.to_compact())
+        self.assertIs(tree.nth_child(1).parent, tree)
+
+    def test_smaller_than_text(self):
+        # symbols are written once, later records only refer to them
+        self.assertLess(len(dumps([self.expr] * 10)), 10 * len(repr(self.expr)) / 2)
+        self.assertLess(len(dumps([self.expr] * 10)), 7 * len(dumps([self.expr])))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "results.bin")
+            with open(path, "wb") as f:
+                writer = BinaryWriter(f)
+                for _ in range(3):
+                    writer.write(self.tree)
+                    writer.write(self.expr)
+            records = list(BinaryReader.open(path))
+        self.assertEqual(len(records), 6)
+        self.assertIs(records[5], self.expr)
+        self.assertEqual(repr(records[4]), repr(self.tree))
+
+    def test_deep(self):
+        expr = Var('x')
+        for _ in range(5000):
+            expr = Neg(expr)
+        self.assertIs(loads(dumps([expr]))[0], expr)
+
+    def test_invalid(self):
+        self.assertRaises(Exception, BinaryReader, b"not binary")
+        self.assertRaises(Exception, dumps, ["text"])
+
+if __name__ == "__main__":
+    unittest.main()
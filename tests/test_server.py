@@ -0,0 +1,69 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from src.server import Server, percentiles
+from src.client import Client
+from .test_text2logic import _nlp
+
+class TestServer(unittest.TestCase):
+    def _run(self, scenario, **kwargs):
+        """scenario(server, address), with the server listening on a Unix socket"""
+        async def main():
+            server = Server(nlp=_nlp(), **kwargs)
+            with tempfile.TemporaryDirectory() as d:
+                address = os.path.join(d, "t2l.sock")
+                listener = await server.start(address)
+                try:
+                    await scenario(server, address)
+                finally:
+                    listener.close()
+                    await listener.wait_closed()
+                    server.close()
+        asyncio.run(main())
+
+    def test_parse(self):
+        async def scenario(server, address):
+            loop = asyncio.get_running_loop()
+            def requests():
+                with Client(address) as client: # one connection, several requests
+                    return client.parse("Brutus ran"), client.parse("John kissed every girl", quantifier=True), client.stats()
+            [res], [quant], stats = await loop.run_in_executor(None, requests)
+            self.assertEqual(res["formula"]["str"], "La.?b.ran(a, b) & Brutus(b)")
+            self.assertEqual(quant["formula"]["str"], "@b.girl(b) -> ?c.kissed(c) & ag(c, John) & th(c, b)")
+            self.assertEqual(stats["requests"], 2)
+            self.assertGreater(stats["latency_ms"]["max"], 0)
+        self._run(scenario)
+
+    def test_concurrent(self):
+        async def scenario(server, address):
+            loop = asyncio.get_running_loop()
+            def request(text):
+                with Client(address) as client:
+                    return client.parse(text)
+            texts = ["Brutus ran", "Brutus stabbed Caesar . Caesar died ."] * 4
+            results = await asyncio.gather(*[loop.run_in_executor(None, request, t) for t in texts])
+            self.assertEqual([len(r) for r in results], [1, 2] * 4)
+            self.assertEqual(server.stats()["requests"], 8)
+        self._run(scenario, max_pending=2)
+
+    def test_errors(self):
+        async def scenario(server, address):
+            def requests():
+                with Client(address) as client:
+                    with self.assertRaises(Exception):
+                        client._request("POST", "/parse", {"txt": "Brutus ran"})
+                    with self.assertRaises(Exception):
+                        client._request("GET", "/nothing")
+                    return client.parse("Brutus ran") # the connection is still usable
+            [res] = await asyncio.get_running_loop().run_in_executor(None, requests)
+            self.assertIsNone(res["error"])
+            self.assertEqual(server.errors, 1)
+        self._run(scenario)
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles(range(1, 101)), {"p50": 50, "p90": 90, "p99": 99, "max": 100})
+        self.assertEqual(percentiles([]), {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+import spacy
+from spacy.language import Language
+from src.text2logic import Text2Logic, ParseResult
+from src.__main__ import stream, read_texts
+from src.result_cache import ResultCache
+from src.pipeline_utils import load_model, read_conllu, build_deptree_from_spacy
+import subprocess
+import sys
+import pickle
+import json
+import os
+import tempfile
+
+# text -> (heads, deps, pos) of its tokens: stands in for a trained parser
+PARSES = {
+    "Brutus stabbed Caesar . Caesar died .": (
+        [1, 1, 1, 1, 5, 5, 5], 
+        ["nsubj", "ROOT", "dobj", "punct", "nsubj", "ROOT", "punct"], 
+        ["PROPN", "VERB", "PROPN", "PUNCT", "PROPN", "VERB", "PUNCT"]),
+    "Brutus ran": ([1, 1], ["nsubj", "ROOT"], ["PROPN", "VERB"]),
+    "John kissed every girl": ([1, 1, 3, 1], ["nsubj", "ROOT", "det", "obj"], ["PROPN", "VERB", "DET", "NOUN"]),
+}
+
+@Language.component("fixed_parse")
+def fixed_parse(doc):
+    heads, deps, pos = PARSES[doc.text]
+    for token, head, dep, p in zip(doc, heads, deps, pos):
+        token.head = doc[head]
+        token.dep_ = dep
+        token.pos_ = p
+    return doc
+
+def _nlp():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("fixed_parse")
+    return nlp
+
+def _nlp_tree(text):
+    return build_deptree_from_spacy(next(_nlp()(text).sents).root)
+
+class TestText2Logic(unittest.TestCase):
+    def test_parse_many(self):
+        t2l = Text2Logic(nlp=_nlp())
+        out = io.StringIO()
+        with redirect_stdout(out):
+            results = t2l.parse_many(["Brutus stabbed Caesar . Caesar died .", "Brutus ran"])
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual([(r.doc, r.sent) for r in results], [(0, 0), (0, 1), (1, 0)])
+        self.assertEqual(results[1].tokens[0], ("Caesar", "nsubj", "PROPN", ""))
+        self.assertEqual(str(results[0].formula), "La.?b.?c.stabbed(a, b, c) & Caesar(c) & Brutus(b)")
+        self.assertEqual(str(results[2].formula), "La.?b.ran(a, b) & Brutus(b)")
+        for r in results:
+            self.assertIsNone(r.error)
+            self.assertEqual(r.binarized.num_children(), 2)
+
+    def test_quantifier(self):
+        t2l = Text2Logic(nlp=_nlp(), quantifier=True)
+        [res] = t2l.parse("John kissed every girl")
+        self.assertIsNone(res.error)
+        self.assertEqual(str(res.formula), "@b.girl(b) -> ?c.kissed(c) & ag(c, John) & th(c, b)")
+
+    def test_error(self):
+        t2l = Text2Logic(nlp=_nlp(), quantifier=True)
+        results = t2l.parse_many(["Brutus stabbed Caesar . Caesar died .", "Brutus ran"])
+        self.assertEqual(len(results), 3)
+        self.assertIn("dobj", results[0].error)
+        self.assertIsNone(results[0].formula)
+        self.assertIsNotNone(results[0].deptree)
+
+    def test_compact(self):
+        [res, _] = Text2Logic(nlp=_nlp()).parse("Brutus stabbed Caesar . Caesar died .")
+        back = ParseResult.from_compact(pickle.loads(pickle.dumps(res.to_compact())))
+        self.assertIs(back.formula, res.formula)
+        self.assertIs(back.lambda_expr, res.lambda_expr)
+        self.assertEqual(repr(back.binarized), repr(res.binarized))
+        self.assertEqual(back.to_compact(), res.to_compact())
+
+    def test_array_trees(self):
+        texts = ["Brutus stabbed Caesar . Caesar died .", "Brutus ran"]
+        expected = Text2Logic(nlp=_nlp()).parse_many(texts)
+        results = Text2Logic(nlp=_nlp(), array_trees=True).parse_many(texts)
+        self.assertEqual([r.to_compact() for r in results], [e.to_compact() for e in expected])
+        self.assertEqual([r.to_json() for r in results], [e.to_json() for e in expected])
+        conllu = list(Text2Logic(model=None, array_trees=True).iter_conllu(io.StringIO(CONLLU)))
+        self.assertEqual([r.formula for r in conllu[:2]], [e.formula for e in expected[:2]])
+
+    def test_parallel(self):
+        t2l = Text2Logic(nlp=_nlp())
+        texts = ["Brutus stabbed Caesar . Caesar died .", "Brutus ran"] * 5
+        expected = t2l.parse_many(texts)
+        results = list(t2l.parse_parallel(texts, processes=2, chunksize=3))
+        self.assertEqual([(r.doc, r.sent) for r in results], [(r.doc, r.sent) for r in expected])
+        for r, e in zip(results, expected):
+            self.assertIs(r.formula, e.formula)
+
+class TestLazyImports(unittest.TestCase):
+    def test_no_spacy_at_import(self):
+        code = "import sys, src.lambda_calculus.lambda_processor, src.__main__; print('spacy' in sys.modules)"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+    def test_model_cache(self):
+        nlp = load_model("blank:en")
+        self.assertIs(load_model("blank:en"), nlp)
+        self.assertIs(Text2Logic("blank:en").nlp, nlp)
+
+CONLLU = """# newdoc id = d1
+# text = Brutus stabbed Caesar. Caesar died.
+1\tBrutus\tBrutus\tPROPN\tNNP\t_\t2\tnsubj\t_\t_
+2\tstabbed\tstab\tVERB\tVBD\t_\t0\troot\t_\t_
+3\tCaesar\tCaesar\tPROPN\tNNP\t_\t2\tdobj\t_\t_
+4\t.\t.\tPUNCT\t.\t_\t2\tpunct\t_\t_
+
+1\tCaesar\tCaesar\tPROPN\tNNP\t_\t2\tnsubj\t_\t_
+2-3\tdied.\t_\t_\t_\t_\t_\t_\t_\t_
+2\tdied\tdie\tVERB\tVBD\t_\t0\troot\t_\t_
+3\t.\t.\tPUNCT\t.\t_\t2\tpunct\t_\t_
+
+# newdoc id = d2
+1\tBrutus\tBrutus\tPROPN\tNNP\t_\t2\tnsubj\t_\t_
+2\tran\trun\tVERB\tVBD\t_\t2\troot\t_\t_
+"""
+
+class TestConllu(unittest.TestCase):
+    def test_read(self):
+        sents = list(read_conllu(io.StringIO(CONLLU)))
+        self.assertEqual([(s.doc, s.sent, s.text) for s in sents], 
+                         [(0, 0, "Brutus stabbed Caesar. Caesar died."), (0, 1, "Caesar died ."), (1, 0, "Brutus ran")])
+        self.assertEqual(sents[1].tokens()[1], ("died", "root", "VERB", ""))
+        self.assertEqual(repr(sents[0].deptree()), repr(_nlp_tree("Brutus stabbed Caesar . Caesar died .")))
+
+    def test_convert_without_model(self):
+        t2l = Text2Logic(model=None)
+        self.assertIsNone(t2l.nlp)
+        results = list(t2l.iter_conllu(io.StringIO(CONLLU)))
+        expected = Text2Logic(nlp=_nlp()).parse("Brutus stabbed Caesar . Caesar died .")
+        self.assertEqual([r.formula for r in results[:2]], [e.formula for e in expected])
+        self.assertIn("Invalid head", results[2].error) # ran is its own head
+
+class TestStream(unittest.TestCase):
+    def test_jsonl(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "corpus.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("Brutus stabbed Caesar . Caesar died .\n\nBrutus ran\n")
+            out = io.StringIO()
+            stream(Text2Logic(nlp=_nlp()), read_texts([path]), out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r["doc"], r["sent"]) for r in records], [(0, 0), (0, 1), (1, 0)])
+        last = records[-1]
+        self.assertEqual(last["tokens"][0], {"text": "Brutus", "dep": "nsubj", "pos": "PROPN", "ent_type": ""})
+        self.assertEqual([(n["label"], n["parent"]) for n in last["deptree"]], 
+                         [("ROOT", -1), ("ran", 0), ("nsubj", 0), ("Brutus", 2)])
+        self.assertEqual(last["formula"]["str"], "La.?b.ran(a, b) & Brutus(b)")
+        self.assertEqual(last["formula"]["repr"], "(La.?b[AND( (ran a b), (Brutus b) )])")
+        self.assertIsNone(last["error"])
+
+class TestResultCache(unittest.TestCase):
+    texts = ["Brutus stabbed Caesar . Caesar died .", "Brutus ran", "Brutus ran"]
+
+    def test_warm_run(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "cache.sqlite")
+            with ResultCache(path) as cache:
+                expected = Text2Logic(nlp=_nlp(), cache=cache).parse_many(self.texts)
+                self.assertEqual(cache.info()[:3], (0, 2, 0)) # the repeated text is parsed once
+            with ResultCache(path) as cache:
+                nlp = _nlp()
+                nlp.pipe = None # warm run: nothing is parsed
+                results = Text2Logic(nlp=nlp, cache=cache).parse_many([" Brutus  stabbed Caesar . Caesar died ."] + self.texts[1:])
+                self.assertEqual(cache.info()[:3], (2, 0, 0))
+        self.assertEqual([(r.doc, r.sent, r.text, r.tokens) for r in results], 
+                         [(r.doc, r.sent, r.text, r.tokens) for r in expected])
+        for r, e in zip(results, expected):
+            self.assertIs(r.formula, e.formula)
+            self.assertIs(r.lambda_expr, e.lambda_expr)
+            self.assertEqual(repr(r.deptree), repr(e.deptree))
+            self.assertIsNone(r.binarized)
+
+    def test_same_json(self):
+        for array_trees in [False, True]:
+            with tempfile.TemporaryDirectory() as d:
+                with ResultCache(os.path.join(d, "cache.sqlite")) as cache:
+                    t2l = Text2Logic(nlp=_nlp(), cache=cache, array_trees=array_trees)
+                    cold = [r.to_json() for r in t2l.parse_many(self.texts[:2])]
+                    warm = [r.to_json() for r in t2l.parse_many(self.texts[:2])]
+                    self.assertEqual(cache.hits, 2)
+            self.assertEqual(warm, cold)
+            self.assertTrue(all(r["deptree"] for r in warm))
+
+    def test_config(self):
+        with tempfile.TemporaryDirectory() as d:
+            with ResultCache(os.path.join(d, "cache.sqlite")) as cache:
+                Text2Logic(nlp=_nlp(), cache=cache).parse_many(self.texts)
+                res = Text2Logic(nlp=_nlp(), cache=cache, quantifier=True).parse(self.texts[0])
+                self.assertEqual(cache.misses, 3)
+                self.assertIn("dobj", res[0].error) # errors are cached too
+                hit = Text2Logic(nlp=_nlp(), cache=cache, quantifier=True).parse(self.texts[0])
+                self.assertEqual(cache.hits, 1)
+                self.assertEqual([r.error for r in hit], [r.error for r in res])
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as d:
+            with ResultCache(os.path.join(d, "cache.sqlite"), maxsize=1) as cache:
+                t2l = Text2Logic(nlp=_nlp(), cache=cache, batch_size=1)
+                t2l.parse_many(self.texts + self.texts[:1])
+                self.assertEqual(cache.info(), (1, 3, 2, 1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
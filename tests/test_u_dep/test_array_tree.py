@@ -0,0 +1,83 @@
+import unittest
+from src.u_dep.array_tree import ArrayDepTree, ArrayNode
+from src.u_dep.dep_tree import DepTree
+from src.u_dep.transformer import Transformer
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from src.dep2lambda_converter.quantificational import quant_converter
+from src.dep_priority.quantificational import quant_priority
+from src.pipeline_utils import build_from_heads
+from src.serialization import dumps, loads
+import warnings
+
+# John picked up every hot dog quickly: compound, prt and xcomp are merged by preprocess
+WORDS = [
+    ("John", "nsubj", "PROPN", "PERSON", 2),
+    ("picked", "ROOT", "VERB", "", 0),
+    ("up", "prt", "ADP", "", 2),
+    ("every", "det", "DET", "", 6),
+    ("hot", "compound", "NOUN", "", 6),
+    ("dog", "dobj", "NOUN", "", 2),
+    ("quickly", "xcomp", "ADV", "", 2),
+]
+
+def _trees():
+    deptree = build_from_heads([(t, d, p, h) for t, d, p, _, h in WORDS])
+    deptree.nth_child(1).nth_child(0)._ent_type = "PERSON"
+    tree = ArrayDepTree.from_heads(WORDS)
+    return deptree, tree.node(tree.root)
+
+class TestArrayTree(unittest.TestCase):
+    def test_view(self):
+        deptree, root = _trees()
+        self.assertEqual(repr(root), repr(deptree))
+        self.assertEqual(root.to_compact(), deptree.to_compact())
+        self.assertEqual(repr(ArrayDepTree.from_deptree(deptree).node(0)), repr(deptree))
+        self.assertTrue(DepTree.validate(root))
+        subj = root.nth_child(1)
+        self.assertEqual((subj.label(), subj.nth_child(0).ent_type()), ("nsubj", "PERSON"))
+        self.assertEqual(subj.parent, root)
+        self.assertIsNone(root.parent)
+        self.assertEqual(root.num_children(), 5)
+        self.assertEqual(root.fold(lambda node, results: 1 + sum(results)), 2 * len(WORDS))
+        self.assertEqual([d for _, d in root.walk()], [d for _, d in deptree.walk()])
+        self.assertEqual(repr(root.to_deptree()), repr(deptree))
+        self.assertEqual(repr(loads(dumps([root]))[0]), repr(deptree))
+        self.assertRaises(Exception, ArrayDepTree.from_heads, [("a", "ROOT", "X", "", 0), ("b", "ROOT", "X", "", 0)])
+        self.assertRaises(Exception, ArrayDepTree.from_heads, [("a", "ROOT", "X", "", 0), ("b", "x", "X", "", 2)])
+
+    def test_strings_per_tree(self):
+        _, root = _trees()
+        merged = Transformer(RelationPriority(), Dep2Lambda()).preprocess(root)
+        self.assertIn("picked_up", merged.tree.strings.ids)
+        self.assertIs(merged.tree.strings, root.tree.strings) # copies share the table of their tree
+        other = ArrayDepTree.from_heads([("a", "ROOT", "X", "", 0)])
+        self.assertNotIn("picked_up", other.strings.ids)
+        self.assertNotIn("John", other.strings.ids)
+
+    def test_same_as_deptree(self):
+        warnings.simplefilter("ignore")
+        for tf in [Transformer(RelationPriority(), Dep2Lambda()),
+                   Transformer(RelationPriority(priority_dt=quant_priority), Dep2Lambda(quant_converter))]:
+            for preprocess in [tf.preprocess, tf.preprocess_quantifier]:
+                deptree, root = _trees()
+                before = repr(root)
+                expected, preprocessed = preprocess(deptree), preprocess(root)
+                self.assertEqual(repr(root), before) # the input tree is not modified
+                self.assertEqual(preprocessed.to_compact(), expected.to_compact())
+                expected, binarized = tf.binarize(expected), tf.binarize(preprocessed)
+                self.assertIsInstance(binarized, ArrayNode)
+                self.assertEqual(binarized.to_compact(), expected.to_compact())
+                try:
+                    tf.assign_lambda(expected)
+                    formula = tf.compose_semantics(expected)
+                except Exception as e:
+                    self.assertRaisesRegex(Exception, str(e), tf.assign_lambda, binarized)
+                    continue
+                tf.assign_lambda(binarized)
+                self.assertIs(tf.compose_semantics(binarized), formula)
+                self.assertEqual(binarized.to_compact(), expected.to_compact())
+        self.assertIn("w-picked_up_quickly", repr(Transformer(RelationPriority(), Dep2Lambda()).preprocess(root)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from src.u_dep.dep_tree import DepTree, DEP_PREFIX, WORD_PREFIX, Tree
+from src.u_dep.dep_tree import DepTree, DEP_PREFIX, WORD_PREFIX, Tree, Ontology
+from src.lambda_calculus.lambda_ast import Abstr, Apply, Const, Var
+import pickle
 from src.u_dep.transformer import Transformer
 
 class TestDepTree(unittest.TestCase):
@@ -45,5 +47,43 @@ class TestTreeDS(unittest.TestCase):
         self.assertEqual(c3.parent, root)
         self.assertEqual(c2.parent, None)
 
+    def test_walk_fold(self):
+        root = Tree()
+        c0, c1, c2 = Tree(), Tree(), Tree()
+        root.add_children(c0, c1)
+        c0.add_child(c2)
+        self.assertEqual(list(root.walk()), [(root, 0), (c0, 1), (c2, 2), (c1, 1)])
+        self.assertEqual(root.fold(lambda node, results: 1 + sum(results)), 4)
+
+    def test_deep(self):
+        """Traversals are not limited by the recursion limit"""
+        n = 5000
+        root = DepTree("pobj", is_dep=True)
+        root.add_child(DepTree("dog", is_word=True, pos="NOUN"))
+        for _ in range(n):
+            node = DepTree("pobj", is_dep=True)
+            node.add_child(DepTree("dog", is_word=True, pos="NOUN"))
+            node.add_child(root)
+            root = node
+        self.assertTrue(DepTree.validate(root))
+        self.assertEqual(len(repr(root).split("\n")), 2 * (n + 1))
+        self.assertEqual(root.fold(lambda node, depths: 1 + max(depths, default=0)), n + 2)
+        self.assertEqual(repr(DepTree.from_compact(pickle.loads(pickle.dumps(root.to_compact())))), repr(root))
+
+    def test_compact(self):
+        root = DepTree("ROOT", is_dep=True)
+        word = DepTree("ran", is_word=True, pos="VERB")
+        word._ontology = Ontology.EVENT
+        word.set_lambda_expr(Abstr([Var('x')], Apply(Const('ran'), Var('x'))))
+        subj = DepTree("nsubj", is_dep=True)
+        subj.add_child(DepTree("John", is_word=True, pos="PROPN", ent_type="PERSON"))
+        root.add_children(word, subj)
+        back = DepTree.from_compact(root.to_compact())
+        self.assertEqual(repr(back), repr(root))
+        self.assertIs(back.nth_child(0).lambda_expr(), word.lambda_expr())
+        self.assertTrue(back.nth_child(0).is_event())
+        self.assertEqual(back.nth_child(1).nth_child(0).ent_type(), "PERSON")
+        self.assertIs(back.nth_child(1).parent, back)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
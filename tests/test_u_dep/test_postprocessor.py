@@ -0,0 +1,42 @@
+import unittest
+from src.lambda_calculus.parser import parse
+from src.u_dep.postprocessor import PostProcessor
+
+class TestPostProcessor(unittest.TestCase):
+    def setUp(self):
+        self.postprocessor = PostProcessor()
+
+    def test_conj(self):
+        expr = parse("(Lx.?abc[AND( (saw x), (conj a b c), (arg2 x a), (dog b), (cat c) )])")
+        self.assertEqual(repr(self.postprocessor.process_by_dep("conj", expr)),
+                         repr(parse("(Lx.?bc[AND( (saw x), (dog b), (cat c), (arg2 x b), (arg2 x c) )])")))
+
+    def test_conj_chain(self):
+        # every conjunct is kept, including those of a conj introduced by a previous rewrite
+        n = 30
+        atoms = ["(saw x)", "(arg2 x a0)"] + [f"(conj a{i} b{i} a{i + 1})" for i in range(n)] + \
+            [f"(dog b{i})" for i in range(n)] + [f"(cat a{n})"]
+        exists = "".join([f"a{i}" for i in range(n + 1)] + [f"b{i}" for i in range(n)])
+        res = self.postprocessor.process_by_dep("conj", parse(f"(Lx.?{exists}[AND( {', '.join(atoms)} )])"))
+        self.assertEqual(sum(str(a).startswith("arg2(") for a in res.body.formula.operands), n + 1)
+
+    def test_process(self):
+        expr = parse("(Lx.?abd[AND( (saw x), (John a), (arg1 x a), (dog b), (arg2 x b), (prep x d), (in d), (pobj d b) )])")
+        self.assertEqual(repr(self.postprocessor.process(expr)),
+                         repr(parse("(Lx.?ab[AND( (saw x a b), (John a), (dog b), (prep.in x b) )])")))
+
+    def test_args(self):
+        # a root that cannot take its arguments does not stop the others
+        expr = parse("(Lx.?abcd[AND( (saw x), (arg2 x a), (arg2 x b), (dog a), (cat b), (ran c), (arg1 c d), (John d) )])")
+        self.assertEqual(repr(self.postprocessor.process(expr)),
+                         repr(parse("(Lx.?abcd[AND( (saw x), (arg2 x a), (arg2 x b), (dog a), (cat b), (ran c d), (John d) )])")))
+        # argN predicates are not roots
+        expr = parse("(Lx.?a[AND( (arg1 x a), (dog a) )])")
+        self.assertIs(self.postprocessor.process(expr), expr)
+
+    def test_unchanged(self):
+        expr = parse("(Lx.?a[AND( (saw x), (dog a) )])")
+        self.assertIs(self.postprocessor.process(expr), expr)
+        self.assertIs(self.postprocessor.process_by_dep("args", expr), expr)
+        with self.assertRaises(Exception):
+            self.postprocessor.process_by_dep("nmod", expr)
@@ -1,7 +1,20 @@
 import unittest
 from src.u_dep.dep_tree import DepTree, DEP_PREFIX, WORD_PREFIX
 from src.u_dep.transformer import Transformer
-from src.pipeline_utils import build_deptree_from_spacy
+from src.u_dep.relation_priority import RelationPriority
+from src.u_dep.dep2lambda import Dep2Lambda
+from src.dep2lambda_converter.default import default_converter
+from src.lambda_calculus.lambda_ast import LambdaExpr, Abstr, Apply, Var, Const
+from src.lambda_calculus.lambda_processor import uniqueify_var_names
+from src.lambda_calculus.fresh import VarArena
+from src.lambda_calculus.reduction_cache import ReductionCache
+from src.lambda_calculus.nameless import alpha_equivalent
+from src.u_dep.composition_cache import CompositionCache
+from src.dep_priority.default import default as default_priority
+from src.u_dep.preprocesser import rewrite, merge_rtl, merge_ltr, enrich_determiner, assign_ontology, Merge, \
+    Determiners
+from src.pipeline_utils import build_deptree_from_spacy, build_from_stanza, build_from_heads
+from types import SimpleNamespace
 import spacy
 
 class TestTransformer(unittest.TestCase):
@@ -18,5 +31,95 @@ class TestTransformer(unittest.TestCase):
         self.assertEqual(DepTree.validate(dtree), True)
         
 
+def _stanza_words(*words):
+    """(text, upos, head, deprel) -> stanza-like words"""
+    return [SimpleNamespace(id=i + 1, text=t, upos=p, head=h, deprel=d) for i, (t, p, h, d) in enumerate(words)]
+
+class TestComposeSemantics(unittest.TestCase):
+    def setUp(self):
+        # Brutus stabbed Caesar with a knife
+        self.deptree = build_from_stanza(_stanza_words(
+            ("Brutus", "PROPN", 2, "nsubj"),
+            ("stabbed", "VERB", 0, "ROOT"),
+            ("Caesar", "PROPN", 2, "dobj"),
+            ("with", "ADP", 2, "prep"),
+            ("a", "DET", 6, "det"),
+            ("knife", "NOUN", 4, "pobj"),
+        ))
+    def _compose(self, tf: Transformer):
+        binarized = tf.binarize(tf.preprocess(self.deptree))
+        tf.assign_lambda(binarized)
+        return tf.compose_semantics(binarized)
+    def test_nameless(self):
+        named = self._compose(Transformer(RelationPriority(), Dep2Lambda()))
+        nameless = self._compose(Transformer(RelationPriority(), Dep2Lambda(), nameless=True))
+        self.assertEqual(named, nameless)
+        self.assertEqual(str(named), str(nameless))
+    def test_reduction_cache(self):
+        cache = ReductionCache()
+        tf = Transformer(RelationPriority(), Dep2Lambda(), reduction_cache=cache)
+        first = self._compose(tf)
+        misses = cache.misses
+        second = self._compose(tf)
+        self.assertEqual(cache.misses, misses)
+        self.assertGreater(cache.hits, 0)
+        self.assertIs(first, second)
+        self.assertIs(first, self._compose(Transformer(RelationPriority(), Dep2Lambda(), nameless=True)))
+
+    def test_composition_cache(self):
+        cache = CompositionCache()
+        first = self._compose(Transformer(RelationPriority(), Dep2Lambda(), composition_cache=cache))
+        self.assertTrue(alpha_equivalent(first, self._compose(Transformer(RelationPriority(), Dep2Lambda()))))
+        misses = cache.misses
+        self.assertIs(self._compose(Transformer(RelationPriority(), Dep2Lambda(), composition_cache=cache)), first)
+        self.assertEqual(cache.misses, misses)
+        # prep before dobj: the subtrees of the dependents are reused
+        priority = RelationPriority(priority_dt={**default_priority, "prep": 1})
+        reordered = self._compose(Transformer(priority, Dep2Lambda(), composition_cache=cache))
+        self.assertTrue(alpha_equivalent(reordered, self._compose(Transformer(priority, Dep2Lambda()))))
+        self.assertLessEqual(cache.misses - misses, 3)
+    def test_lazy(self):
+        lazy = self._compose(Transformer(RelationPriority(), Dep2Lambda(), lazy=True))
+        self.assertIs(lazy, self._compose(Transformer(RelationPriority(), Dep2Lambda(), nameless=True)))
+        with self.assertRaises(Exception):
+            Transformer(RelationPriority(), Dep2Lambda(), lazy=True, reduction_cache=ReductionCache())
+
+class TestDep2Lambda(unittest.TestCase):
+    def test_converter_returns_expr(self):
+        word, dep = DepTree("dog", is_word=True, pos="NOUN"), DepTree("nsubj", is_dep=True)
+        self.assertIs(default_converter(word), Abstr([Var('x')], Apply(Const('dog'), Var('x'))))
+        for node in [word, dep]:
+            expr = default_converter(node)
+            self.assertIsInstance(expr, LambdaExpr)
+            # Dep2Lambda instantiates the compiled form directly, with the same result
+            self.assertIs(Dep2Lambda(default_converter).get(node), expr)
+            self.assertIs(Dep2Lambda().get_unique(node, VarArena()), uniqueify_var_names(expr, VarArena()))
+
+class TestPreprocess(unittest.TestCase):
+    def setUp(self):
+        # a compound with a prt dependent: merged into dog before the prt pass, which then sees up as dog's
+        self.deptree = build_from_heads([
+            ("every", "det", "DET", 4), ("hot", "compound", "ADJ", 4), ("up", "prt", "ADP", 2),
+            ("dog", "ROOT", "NOUN", 0), ("is", "cop", "AUX", 4), ("John", "nsubj", "PROPN", 4),
+        ])
+    def test_same_as_passes(self):
+        before = self.deptree.to_compact()
+        expected = merge_ltr(merge_rtl(self.deptree, "compound"), "prt")
+        fused = rewrite(self.deptree, [Merge("compound", True), Merge("prt", False)])
+        self.assertEqual(fused.to_compact(), expected.to_compact())
+        self.assertIn("w-hot_dog_up", repr(fused))
+        expected = enrich_determiner(self.deptree)
+        assign_ontology(expected)
+        fused = rewrite(self.deptree, [Determiners()], ontology=True)
+        self.assertEqual(fused.to_compact(), expected.to_compact())
+        self.assertEqual(self.deptree.to_compact(), before)
+        for node, _ in fused.walk():
+            self.assertTrue(all(c.parent is node for c in node.children))
+    def test_rules(self):
+        tf = Transformer(RelationPriority(), Dep2Lambda(), preprocess_rules=[Merge("prt", True)])
+        self.assertIn("w-up_hot", repr(tf.preprocess(self.deptree)))
+        self.assertIn("w-hot", repr(tf.preprocess_quantifier(self.deptree)))
+        self.assertIn("l-det:univ", repr(tf.preprocess_quantifier(self.deptree)))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file